@@ -0,0 +1,29 @@
+import argparse, asyncio, logging, os
+import uvicorn
+from app.config import settings
+log = logging.getLogger("app")
+async def _migrate():
+    from app.database import engine, migrate
+    await migrate()
+    await engine.dispose()
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=settings.web_concurrency)
+    parser.add_argument("--graceful-timeout", type=float, default=settings.graceful_timeout_s)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper())
+    # Migrate once here so workers don't race alembic; they inherit the env below.
+    if settings.db_migrate_on_start: asyncio.run(_migrate())
+    os.environ["DB_MIGRATE_ON_START"] = "false"
+    settings.db_migrate_on_start = False
+    if args.workers > 1:
+        os.environ.setdefault("LEADER_ELECTION", "redis")
+        os.environ.setdefault("KEM_WORKERS", str(max(1, settings.kem_workers // args.workers)))
+        if settings.database_url.startswith("sqlite"): log.warning("%d workers on SQLite serialise on the write lock", args.workers)
+    settings.leader_election = os.getenv("LEADER_ELECTION", settings.leader_election)
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers, timeout_graceful_shutdown=args.graceful_timeout, log_level=args.log_level)
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,113 @@
-﻿import os
+import json, os
 from pydantic import BaseModel
 from dotenv import load_dotenv
 load_dotenv()
 class Settings(BaseModel):
-database_url: str = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./qa.db")
-redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-jwt_secret: str = os.getenv("JWT_SECRET", "dev-secret")
-jwt_issuer: str = os.getenv("JWT_ISSUER", "quantum-aegis")
-jwt_audience: str = os.getenv("JWT_AUDIENCE", "quantum-aegis-clients")
-jwt_expire_min: int = int(os.getenv("JWT_EXPIRE_MIN", "60"))
-vt_api_key: str | None = os.getenv("VT_API_KEY") or None
-shodan_api_key: str | None = os.getenv("SHODAN_API_KEY") or None
-abuse_api_key: str | None = os.getenv("ABUSEIPDB_API_KEY") or None
-demo_mode: bool = os.getenv("DEMO_MODE", "true").lower() == "true"
-pqc_enable: bool = os.getenv("PQC_ENABLE", "true").lower() == "true"
-key_rotation_min: int = int(os.getenv("KEY_ROTATION_MIN", "15"))
+    database_url: str = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./qa.db")
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    db_pool_timeout_s: float = float(os.getenv("DB_POOL_TIMEOUT_S", "10"))
+    db_pool_recycle_s: int = int(os.getenv("DB_POOL_RECYCLE_S", "1800"))
+    db_statement_cache_size: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "1024"))
+    db_statement_timeout_ms: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    db_migrate_on_start: bool = os.getenv("DB_MIGRATE_ON_START", "true").lower() == "true"
+    sqlite_busy_timeout_ms: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    sqlite_cache_kb: int = int(os.getenv("SQLITE_CACHE_KB", "65536"))
+    sqlite_mmap_mb: int = int(os.getenv("SQLITE_MMAP_MB", "256"))
+    log_retention_days: int = int(os.getenv("LOG_RETENTION_DAYS", "90"))
+    log_partitions_ahead: int = int(os.getenv("LOG_PARTITIONS_AHEAD", "3"))
+    log_prune_batch: int = int(os.getenv("LOG_PRUNE_BATCH", "10000"))
+    log_maintenance_s: float = float(os.getenv("LOG_MAINTENANCE_S", "3600"))
+    rollup_minute_retention_s: int = int(os.getenv("ROLLUP_MINUTE_RETENTION_S", "172800"))
+    dashboard_cache_s: float = float(os.getenv("DASHBOARD_CACHE_S", "10"))
+    history_page_max: int = int(os.getenv("HISTORY_PAGE_MAX", "500"))
+    redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    jwt_secret: str = os.getenv("JWT_SECRET", "dev-secret")
+    jwt_issuer: str = os.getenv("JWT_ISSUER", "quantum-aegis")
+    jwt_audience: str = os.getenv("JWT_AUDIENCE", "quantum-aegis-clients")
+    jwt_expire_min: int = int(os.getenv("JWT_EXPIRE_MIN", "60"))
+    api_key_pepper: str = os.getenv("API_KEY_PEPPER") or os.getenv("JWT_SECRET", "dev-secret")
+    vt_api_key: str | None = os.getenv("VT_API_KEY") or None
+    shodan_api_key: str | None = os.getenv("SHODAN_API_KEY") or None
+    abuse_api_key: str | None = os.getenv("ABUSEIPDB_API_KEY") or None
+    vt_base_url: str = os.getenv("VT_BASE_URL", "https://www.virustotal.com")
+    shodan_base_url: str = os.getenv("SHODAN_BASE_URL", "https://api.shodan.io")
+    abuse_base_url: str = os.getenv("ABUSEIPDB_BASE_URL", "https://api.abuseipdb.com")
+    vt_rate_per_min: float = float(os.getenv("VT_RATE_PER_MIN", "4"))
+    vt_burst: int = int(os.getenv("VT_BURST", "4"))
+    shodan_rate_per_min: float = float(os.getenv("SHODAN_RATE_PER_MIN", "60"))
+    shodan_burst: int = int(os.getenv("SHODAN_BURST", "1"))
+    abuse_rate_per_min: float = float(os.getenv("ABUSEIPDB_RATE_PER_MIN", "60"))
+    abuse_burst: int = int(os.getenv("ABUSEIPDB_BURST", "10"))
+    provider_timeout_s: float = float(os.getenv("PROVIDER_TIMEOUT_S", "15"))
+    provider_max_connections: int = int(os.getenv("PROVIDER_MAX_CONNECTIONS", "20"))
+    provider_keepalive_s: float = float(os.getenv("PROVIDER_KEEPALIVE_S", "60"))
+    provider_max_retries: int = int(os.getenv("PROVIDER_MAX_RETRIES", "2"))
+    provider_deadline_s: float = float(os.getenv("PROVIDER_DEADLINE_S", "2.0"))
+    provider_hedge_after_s: float = float(os.getenv("PROVIDER_HEDGE_AFTER_S", "0"))
+    request_deadline_s: float = float(os.getenv("REQUEST_DEADLINE_S", "3.0"))
+    breaker_failures: int = int(os.getenv("BREAKER_FAILURES", "5"))
+    breaker_cooldown_s: float = float(os.getenv("BREAKER_COOLDOWN_S", "30"))
+    demo_mode: bool = os.getenv("DEMO_MODE", "true").lower() == "true"
+    pqc_enable: bool = os.getenv("PQC_ENABLE", "true").lower() == "true"
+    key_rotation_min: int = int(os.getenv("KEY_ROTATION_MIN", "15"))
+    key_retention_min: int = int(os.getenv("KEY_RETENTION_MIN", "60"))
+    keypool_size: int = int(os.getenv("KEYPOOL_SIZE", "8"))
+    keygen_workers: int = int(os.getenv("KEYGEN_WORKERS", "1"))
+    kem_workers: int = int(os.getenv("KEM_WORKERS", str(os.cpu_count() or 1)))
+    kem_chunk_min: int = int(os.getenv("KEM_CHUNK_MIN", "16"))
+    kem_batch_max: int = int(os.getenv("KEM_BATCH_MAX", "1000"))
+    keygen_processes: bool = os.getenv("KEYGEN_PROCESSES", "false").lower() == "true"
+    kem_active_ttl_s: float = float(os.getenv("KEM_ACTIVE_TTL_S", "30"))
+    kem_keys_max: int = int(os.getenv("KEM_KEYS_MAX", "64"))
+    web_concurrency: int = int(os.getenv("WEB_CONCURRENCY", str(len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1)))
+    graceful_timeout_s: float = float(os.getenv("GRACEFUL_TIMEOUT_S", "30"))
+    leader_election: str = os.getenv("LEADER_ELECTION", "off")
+    leader_ttl_s: float = float(os.getenv("LEADER_TTL_S", "15"))
+    warm_ips: int = int(os.getenv("WARM_IPS", "10000"))
+    warm_window_s: int = int(os.getenv("WARM_WINDOW_S", "3600"))
+    cache_local_max: int = int(os.getenv("CACHE_LOCAL_MAX", "100000"))
+    cache_local_ttl_s: float = float(os.getenv("CACHE_LOCAL_TTL_S", "60"))
+    vt_signal_ttl_s: float = float(os.getenv("VT_SIGNAL_TTL_S", "43200"))
+    shodan_signal_ttl_s: float = float(os.getenv("SHODAN_SIGNAL_TTL_S", "604800"))
+    abuse_signal_ttl_s: float = float(os.getenv("ABUSEIPDB_SIGNAL_TTL_S", "3600"))
+    negative_ttl_s: int = int(os.getenv("NEGATIVE_TTL_S", "900"))
+    signal_stale_factor: float = float(os.getenv("SIGNAL_STALE_FACTOR", "4"))
+    signal_refresh_lock_s: int = int(os.getenv("SIGNAL_REFRESH_LOCK_S", "300"))
+    scoring_policy_path: str | None = os.getenv("SCORING_POLICY_PATH") or None
+    scoring_policy_reload_s: float = float(os.getenv("SCORING_POLICY_RELOAD_S", "5"))
+    counters_flush_s: float = float(os.getenv("COUNTERS_FLUSH_S", "2"))
+    counters_retention_s: int = int(os.getenv("COUNTERS_RETENTION_S", str(7 * 86400)))
+    log_queue_max: int = int(os.getenv("LOG_QUEUE_MAX", "200000"))
+    log_batch_size: int = int(os.getenv("LOG_BATCH_SIZE", "2000"))
+    log_flush_s: float = float(os.getenv("LOG_FLUSH_S", "0.5"))
+    log_write_retries: int = int(os.getenv("LOG_WRITE_RETRIES", "3"))
+    profile_sample_hz: float = float(os.getenv("PROFILE_SAMPLE_HZ", "0"))
+    reputation_allow_private: bool = os.getenv("REPUTATION_ALLOW_PRIVATE", "true").lower() == "true"
+    reputation_egress_cidrs: str | None = os.getenv("REPUTATION_EGRESS_CIDRS") or None
+    reputation_allowlist_paths: str | None = os.getenv("REPUTATION_ALLOWLIST_PATHS") or None
+    reputation_blocklist_paths: str | None = os.getenv("REPUTATION_BLOCKLIST_PATHS") or None
+    reputation_reload_s: float = float(os.getenv("REPUTATION_RELOAD_S", "300"))
+    auth_required: bool = os.getenv("AUTH_REQUIRED", "true").lower() == "true"
+    auth_cache_ttl_s: float = float(os.getenv("AUTH_CACHE_TTL_S", "60"))
+    auth_negative_ttl_s: float = float(os.getenv("AUTH_NEGATIVE_TTL_S", "5"))
+    auth_cache_max: int = int(os.getenv("AUTH_CACHE_MAX", "50000"))
+    plan_limits: dict[str, dict[str, int]] = json.loads(os.getenv("PLAN_LIMITS", '{"essential": {"rate_per_min": 600, "daily_quota": 100000}, "pro": {"rate_per_min": 6000, "daily_quota": 5000000}, "enterprise": {"rate_per_min": 0, "daily_quota": 0}}'))
+    enrich_async: bool = os.getenv("ENRICH_ASYNC", "false").lower() == "true"
+    job_batch_ips: int = int(os.getenv("JOB_BATCH_IPS", "500"))
+    job_chunk_ips: int = int(os.getenv("JOB_CHUNK_IPS", "100"))
+    job_concurrency: int = int(os.getenv("JOB_CONCURRENCY", "32"))
+    job_timeout_s: int = int(os.getenv("JOB_TIMEOUT_S", "1800"))
+    job_result_ttl_s: int = int(os.getenv("JOB_RESULT_TTL_S", "86400"))
+    rescan_scan_count: int = int(os.getenv("RESCAN_SCAN_COUNT", "1000"))
+    worker_processes: int = int(os.getenv("WORKER_PROCESSES", "1"))
+    response_cache_s: float = float(os.getenv("RESPONSE_CACHE_S", "5"))
+    response_cache_max: int = int(os.getenv("RESPONSE_CACHE_MAX", "100000"))
+    stream_concurrency: int = int(os.getenv("STREAM_CONCURRENCY", "64"))
+    stream_queue_size: int = int(os.getenv("STREAM_QUEUE_SIZE", "1024"))
+    stream_dedupe_window: int = int(os.getenv("STREAM_DEDUPE_WINDOW", "10000"))
+    stream_max_line: int = int(os.getenv("STREAM_MAX_LINE", "4096"))
+    stream_flush_lines: int = int(os.getenv("STREAM_FLUSH_LINES", "256"))
+    batch_max_ips: int = int(os.getenv("BATCH_MAX_IPS", "50000"))
+    batch_concurrency: int = int(os.getenv("BATCH_CONCURRENCY", "64"))
 settings = Settings()
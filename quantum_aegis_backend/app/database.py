@@ -1,9 +1,54 @@
-﻿from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import asyncio
+from pathlib import Path
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 from app.config import settings
-engine = create_async_engine(settings.database_url, echo=False, future=True)
+from app.services import telemetry
+def engine_options(url: str) -> dict:
+    if url.startswith("sqlite"): return {}
+    opts = {"pool_size": settings.db_pool_size, "max_overflow": settings.db_max_overflow, "pool_timeout": settings.db_pool_timeout_s, "pool_recycle": settings.db_pool_recycle_s, "pool_pre_ping": True}
+    if "+asyncpg" in url:
+        server_settings = {"application_name": "quantum-aegis"}
+        if settings.db_statement_timeout_ms: server_settings["statement_timeout"] = str(settings.db_statement_timeout_ms)
+        opts["connect_args"] = {"statement_cache_size": settings.db_statement_cache_size, "prepared_statement_cache_size": settings.db_statement_cache_size, "server_settings": server_settings}
+    return opts
+def sqlite_pragmas(dbapi_conn, _record):
+    cur = dbapi_conn.cursor()
+    for pragma in ("journal_mode=WAL", "synchronous=NORMAL", f"busy_timeout={settings.sqlite_busy_timeout_ms}", f"cache_size=-{settings.sqlite_cache_kb}",
+                   "temp_store=MEMORY", f"mmap_size={settings.sqlite_mmap_mb * 1024 * 1024}"):
+        cur.execute(f"PRAGMA {pragma}")
+    cur.close()
+engine = create_async_engine(settings.database_url, echo=False, future=True, **engine_options(settings.database_url))
+if engine.dialect.name == "sqlite": event.listen(engine.sync_engine, "connect", sqlite_pragmas)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 class Base(DeclarativeBase): pass
+def pool_stats() -> dict:
+    pool = engine.sync_engine.pool
+    stats = {"size": getattr(pool, "size", None), "checked_out": getattr(pool, "checkedout", None), "checked_in": getattr(pool, "checkedin", None), "overflow": getattr(pool, "overflow", None)}
+    return {k: fn() for k, fn in stats.items() if callable(fn)}
+telemetry.Gauge("qa_db_pool_connections", "SQLAlchemy connection pool state", ("state",), fn=pool_stats)
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+def alembic_config():
+    from alembic.config import Config
+    cfg = Config(str(ALEMBIC_INI))
+    cfg.set_main_option("script_location", str(ALEMBIC_INI.parent / "migrations"))
+    return cfg
+def _unversioned_revision(conn) -> str | None:
+    from alembic.autogenerate import compare_metadata
+    from alembic.migration import MigrationContext
+    from app import models  # noqa: F401  (fills Base.metadata)
+    tables = set(inspect(conn).get_table_names())
+    if "orgs" not in tables or "alembic_version" in tables: return None
+    # create_all of the current models already matches head; anything older is the 0001 baseline.
+    return "0001" if compare_metadata(MigrationContext.configure(conn), Base.metadata) else "head"
+async def migrate():
+    from alembic import command
+    async with engine.connect() as conn:
+        revision = await conn.run_sync(_unversioned_revision)
+    cfg = alembic_config()
+    if revision: await asyncio.to_thread(command.stamp, cfg, revision)
+    await asyncio.to_thread(command.upgrade, cfg, "head")
 async def get_db() -> AsyncSession:
-async with SessionLocal() as session:
-yield session
+    async with SessionLocal() as session:
+        yield session
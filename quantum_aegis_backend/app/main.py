@@ -1,14 +1,47 @@
-﻿from fastapi import FastAPI
-from app.database import engine, Base
-from app.routers import metrics, intel
-from app.scheduler import start_scheduler
-app = FastAPI(title="Quantum Aegis Backend", version="1.0.0")
-@app.on_event("startup")
-async def on_start():
-async with engine.begin() as conn:
-await conn.run_sync(Base.metadata.create_all)
-start_scheduler()
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from app.database import migrate
+from app.routers import metrics, decisions, intel, jobs, keys, kem as kem_router, orgs, policy, reputation as reputation_router
+from app import scheduler
+from app.config import settings
+from app.services import auth, cache, counters, decision_engine, kem, leader, log_writer, providers, reputation, retention, signals, telemetry, warmup
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.db_migrate_on_start: await migrate()
+    decision_engine.reload()
+    await reputation.start()
+    await providers.startup()
+    await auth.start()
+    await counters.start()
+    log_writer.start()
+    kem.start()
+    await warmup.run()
+    await leader.start(scheduler, retention)
+    if settings.profile_sample_hz > 0:
+        telemetry.profiler = telemetry.SamplingProfiler(settings.profile_sample_hz)
+        telemetry.profiler.start()
+    yield
+    if telemetry.profiler: telemetry.profiler.stop()
+    await leader.stop()
+    await kem.stop()
+    await reputation.stop()
+    await signals.drain(settings.graceful_timeout_s)
+    await log_writer.stop()
+    await counters.stop()
+    await auth.stop()
+    await providers.shutdown()
+    await cache.close()
+app = FastAPI(title="Quantum Aegis Backend", version="1.0.0", lifespan=lifespan)
+app.add_middleware(telemetry.InstrumentMiddleware)
 app.include_router(metrics.router)
 app.include_router(intel.router)
+app.include_router(decisions.router)
+app.include_router(orgs.router)
+app.include_router(jobs.router)
+app.include_router(policy.router)
+app.include_router(keys.router)
+app.include_router(kem_router.router)
+app.include_router(reputation_router.router)
 @app.get("/healthz")
-async def healthz(): return {"ok": True}
+async def healthz(): return {"ok": True, "pid": os.getpid(), "leader": leader.is_leader()}
@@ -1,48 +1,79 @@
-﻿from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, ForeignKey, DateTime, Boolean, JSON, BigInteger, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import String, Integer, ForeignKey, DateTime, Boolean, JSON, BigInteger, Float, Index, UniqueConstraint, func
 from app.database import Base
 class Org(Base):
-tablename = "orgs"
-id: Mapped[int] = mapped_column(primary_key=True)
-name: Mapped[str] = mapped_column(String(120), unique=True, index=True)
-plan: Mapped[str] = mapped_column(String(50), default="essential")
-api_keys = relationship("APIKey", back_populates="org")
+    __tablename__ = "orgs"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String(120), unique=True, index=True)
+    plan: Mapped[str] = mapped_column(String(50), default="essential")
+    api_keys = relationship("APIKey", back_populates="org")
 class APIKey(Base):
-tablename = "api_keys"
-id: Mapped[int] = mapped_column(primary_key=True)
-org_id: Mapped[int] = mapped_column(ForeignKey("orgs.id", ondelete="CASCADE"))
-key: Mapped[str] = mapped_column(String(64), unique=True, index=True)
-active: Mapped[bool] = mapped_column(Boolean, default=True)
-created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), default=func.now())
-org = relationship("Org", back_populates="api_keys")
+    __tablename__ = "api_keys"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    org_id: Mapped[int] = mapped_column(ForeignKey("orgs.id", ondelete="CASCADE"), index=True)
+    key_hash: Mapped[str] = mapped_column(String(64), unique=True, index=True)
+    active: Mapped[bool] = mapped_column(Boolean, default=True)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), default=func.now())
+    org = relationship("Org", back_populates="api_keys")
 class QuantumKey(Base):
-tablename = "quantum_keys"
-id: Mapped[int] = mapped_column(primary_key=True)
-alg: Mapped[str] = mapped_column(String(50))
-pub: Mapped[str] = mapped_column(String(4096))
-priv: Mapped[str] = mapped_column(String(4096))
-rotated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    __tablename__ = "quantum_keys"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    alg: Mapped[str] = mapped_column(String(50))
+    pub: Mapped[str] = mapped_column(String(4096))
+    priv: Mapped[str] = mapped_column(String(4096))
+    rotated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    retired_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True, index=True)
 class ThreatCheck(Base):
-tablename = "threat_checks"
-id: Mapped[int] = mapped_column(primary_key=True)
-org_id: Mapped[int] = mapped_column(ForeignKey("orgs.id", ondelete="CASCADE"))
-subject: Mapped[str] = mapped_column(String(256))
-subject_type: Mapped[str] = mapped_column(String(30))
-result: Mapped[dict] = mapped_column(JSON)
-malicious: Mapped[bool] = mapped_column(Boolean, default=False)
-created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
-table_args = (UniqueConstraint("org_id", "subject", "subject_type", "created_at"),)
+    __tablename__ = "threat_checks"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    org_id: Mapped[int] = mapped_column(ForeignKey("orgs.id", ondelete="CASCADE"))
+    subject: Mapped[str] = mapped_column(String(256))
+    subject_type: Mapped[str] = mapped_column(String(30))
+    result: Mapped[dict] = mapped_column(JSON)
+    malicious: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    __table_args__ = (UniqueConstraint("org_id", "subject", "subject_type", "created_at"), Index("ix_threat_checks_org_id_created_at", "org_id", "created_at"), Index("ix_threat_checks_created_at", "created_at"))
 class DecisionLog(Base):
-tablename = "decision_logs"
-id: Mapped[int] = mapped_column(primary_key=True)
-org_id: Mapped[int] = mapped_column(ForeignKey("orgs.id", ondelete="CASCADE"))
-action: Mapped[str] = mapped_column(String(30))
-reason: Mapped[dict] = mapped_column(JSON)
-created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    __tablename__ = "decision_logs"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    org_id: Mapped[int] = mapped_column(ForeignKey("orgs.id", ondelete="CASCADE"))
+    action: Mapped[str] = mapped_column(String(30))
+    ip: Mapped[str | None] = mapped_column(String(45), nullable=True)
+    risk_score: Mapped[float | None] = mapped_column(Float, nullable=True)
+    reason: Mapped[dict] = mapped_column(JSON)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    __table_args__ = (
+        Index("ix_decision_logs_org_id_created_at", "org_id", "created_at"), Index("ix_decision_logs_created_at", "created_at"),
+        Index("ix_decision_logs_org_id_ip_created_at", "org_id", "ip", "created_at"), Index("ix_decision_logs_org_id_action_created_at", "org_id", "action", "created_at"),
+    )
+class DecisionRollup(Base):
+    __tablename__ = "decision_rollups"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    org_id: Mapped[int] = mapped_column(Integer)
+    granularity: Mapped[str] = mapped_column(String(8))
+    dimension: Mapped[str] = mapped_column(String(16))
+    bucket_start: Mapped[int] = mapped_column(BigInteger)
+    key: Mapped[str] = mapped_column(String(64))
+    value: Mapped[float] = mapped_column(Float, default=0.0)
+    __table_args__ = (UniqueConstraint("org_id", "granularity", "dimension", "bucket_start", "key"),)
 class Counters(Base):
-tablename = "counters"
-id: Mapped[int] = mapped_column(primary_key=True)
-live_threats: Mapped[int] = mapped_column(BigInteger, default=302928)
-threats_blocked_today: Mapped[int] = mapped_column(BigInteger, default=298193)
-ai_decisions_hour: Mapped[int] = mapped_column(BigInteger, default=2495)
-quantum_keys_active: Mapped[int] = mapped_column(Integer, default=855)
+    __tablename__ = "counters"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    live_threats: Mapped[int] = mapped_column(BigInteger, default=302928)
+    threats_blocked_today: Mapped[int] = mapped_column(BigInteger, default=298193)
+    ai_decisions_hour: Mapped[int] = mapped_column(BigInteger, default=2495)
+    quantum_keys_active: Mapped[int] = mapped_column(Integer, default=855)
+class CounterRollup(Base):
+    __tablename__ = "counter_rollups"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String(50))
+    window_start: Mapped[int] = mapped_column(BigInteger)
+    value: Mapped[int] = mapped_column(BigInteger, default=0)
+    __table_args__ = (UniqueConstraint("name", "window_start"),)
+class ReputationRule(Base):
+    __tablename__ = "reputation_rules"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    cidr: Mapped[str] = mapped_column(String(64))
+    action: Mapped[str] = mapped_column(String(10))
+    source: Mapped[str] = mapped_column(String(60), default="manual")
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
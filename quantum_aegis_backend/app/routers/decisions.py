@@ -0,0 +1,77 @@
+import base64, time
+from datetime import datetime, timezone
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import or_, and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import get_db
+from app.models import DecisionLog
+from app.schemas import normalize_ip, DecisionPage, DecisionRecord, DeniedIP, ProviderContribution, TimelineBucket
+from app.services import auth, decision_engine, rollups
+router = APIRouter(prefix="/decisions", tags=["decisions"])
+def _org(principal: auth.Principal, org_id: int | None) -> int:
+    if org_id is None or org_id == principal.org_id:
+        if principal.org_id is None: raise HTTPException(422, "org_id is required for admin tokens")
+        return principal.org_id
+    if "admin" not in principal.scopes: raise HTTPException(403, "admin scope required to read another org")
+    return org_id
+async def _principal(principal: auth.Principal | None = Depends(auth.optional)) -> auth.Principal:
+    return principal if principal and "admin" in principal.scopes else await auth.require(principal)
+def _utc(dt: datetime | None) -> datetime | None:
+    if dt is None: return None
+    return dt.astimezone(timezone.utc) if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+def encode_cursor(created_at: datetime, id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{id}".encode()).decode().rstrip("=")
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        at, _, id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().partition("|")
+        return _utc(datetime.fromisoformat(at)), int(id)
+    except ValueError: raise HTTPException(400, "invalid cursor")
+def _window(since: datetime | None, until: datetime | None, default_s: int) -> tuple[float, float]:
+    end = _utc(until).timestamp() if until else time.time()
+    start = _utc(since).timestamp() if since else end - default_s
+    if start > end: raise HTTPException(422, "since must be before until")
+    return start, end
+@router.get("", response_model=DecisionPage)
+async def history(ip: str | None = None, decision: Literal["allow", "flag", "deny"] | None = None, since: datetime | None = None, until: datetime | None = None,
+                  limit: int = Query(100, ge=1), cursor: str | None = None, include_signals: bool = False, org_id: int | None = None,
+                  principal: auth.Principal = Depends(_principal), db: AsyncSession = Depends(get_db)):
+    cols = [DecisionLog.id, DecisionLog.ip, DecisionLog.action, DecisionLog.risk_score, DecisionLog.created_at] + ([DecisionLog.reason] if include_signals else [])
+    q = select(*cols).where(DecisionLog.org_id == _org(principal, org_id))
+    since, until = _utc(since), _utc(until)
+    if ip:
+        try: q = q.where(DecisionLog.ip == normalize_ip(ip))
+        except ValueError: raise HTTPException(422, "invalid ip")
+    if decision: q = q.where(DecisionLog.action == decision)
+    if since: q = q.where(DecisionLog.created_at >= since)
+    if until: q = q.where(DecisionLog.created_at < until)
+    if cursor:
+        at, last_id = decode_cursor(cursor)
+        q = q.where(or_(DecisionLog.created_at < at, and_(DecisionLog.created_at == at, DecisionLog.id < last_id)))
+    limit = min(limit, settings.history_page_max)
+    rows = (await db.execute(q.order_by(DecisionLog.created_at.desc(), DecisionLog.id.desc()).limit(limit + 1))).all()
+    more, rows = len(rows) > limit, rows[:limit]
+    results = []
+    for r in rows:
+        reason = (r.reason or {}) if include_signals else {}
+        results.append(DecisionRecord(id=r.id, ip=r.ip, decision=r.action, risk_score=r.risk_score, policy_version=reason.get("policy_version"),
+                                      signals=reason.get("signals"), created_at=_utc(r.created_at)))
+    return DecisionPage(count=len(results), next_cursor=encode_cursor(rows[-1].created_at, rows[-1].id) if more else None, results=results)
+@router.get("/stats/timeline", response_model=list[TimelineBucket])
+async def timeline(granularity: Literal["minute", "hour"] = "minute", since: datetime | None = None, until: datetime | None = None, org_id: int | None = None,
+                   principal: auth.Principal = Depends(_principal), db: AsyncSession = Depends(get_db)):
+    start, end = _window(since, until, 3600 if granularity == "minute" else 86400)
+    return await rollups.timeline(db, _org(principal, org_id), granularity, start, end)
+@router.get("/stats/top-denied", response_model=list[DeniedIP])
+async def top_denied(since: datetime | None = None, until: datetime | None = None, limit: int = Query(20, ge=1, le=500), org_id: int | None = None,
+                     principal: auth.Principal = Depends(_principal), db: AsyncSession = Depends(get_db)):
+    start, end = _window(since, until, 86400)
+    return await rollups.top_denied(db, _org(principal, org_id), start, end, limit)
+@router.get("/stats/providers", response_model=ProviderContribution)
+async def providers(since: datetime | None = None, until: datetime | None = None, org_id: int | None = None,
+                    principal: auth.Principal = Depends(_principal), db: AsyncSession = Depends(get_db)):
+    start, end = _window(since, until, 86400)
+    policy = decision_engine.current()
+    weights = {"vt": policy.vt_weight, "shodan": policy.shodan_weight, "abuse": policy.abuse_weight}
+    return await rollups.providers(db, _org(principal, org_id), start, end, weights)
@@ -1,36 +1,157 @@
-﻿from fastapi import APIRouter, Depends
-from app.schemas import IPCheckRequest, DecisionResponse
-from app.services import cache, intel_vt, intel_shodan, intel_abuse, decision_engine
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.database import get_db
-from app.models import DecisionLog, Counters
 import asyncio
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+import orjson
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import Response, StreamingResponse
+from app.schemas import IPCheckRequest, IPBatchRequest, DecisionResponse, BatchDecisionResponse, normalize_ip
+from app.services import signals as signal_cache, auth, cache, counters, decision_engine, jobs, log_writer, reputation, telemetry
+from app.config import settings
 router = APIRouter(prefix="/intel", tags=["intel"])
+RESPONSES = telemetry.Counter("qa_response_cache_total", "Pre-serialized ip-check responses by outcome", ("event",))
+_responses = cache.LRU(settings.response_cache_max, settings.response_cache_s)
+def _json(body: bytes) -> Response:
+    return Response(body, media_type="application/json")
+def _local(match: reputation.Match) -> dict:
+    return {"decision": match.action, "risk_score": 1.0 if match.action == "deny" else 0.0, "signals": {"reputation": match._asdict()}, "cached": False, "policy_version": None}
+async def _record_local(local: dict[str, dict], org_id: int):
+    if local:
+        counters.record_decisions([r["decision"] for r in local.values()])
+        await log_writer.record_decisions(org_id, local)
+async def _provisional(ip: str, org_id: int) -> dict:
+    signals, missing = (await signal_cache.peek_many([ip]))[ip]
+    with telemetry.stage("scoring"): resp = decision_engine.decide(signals, cached=True)
+    if missing: resp |= {"provisional": True, "job_id": await jobs.enrich_later(org_id, ip)}
+    return resp
+async def _decide_one(ip: str, org_id: int, wait: bool = True) -> dict:
+    match = reputation.lookup(ip)
+    if match:
+        resp = _local(match)
+        await _record_local({ip: resp}, org_id)
+        return resp
+    if not wait: return await _provisional(ip, org_id)
+    signals, fresh = await signal_cache.fetch(ip)
+    with telemetry.stage("scoring"): resp = decision_engine.decide(signals, cached=not fresh)
+    if fresh:
+        counters.record_decisions([resp["decision"]])
+        with telemetry.stage("log_enqueue"): await log_writer.record_decisions(org_id, {ip: resp})
+    return resp
+async def _respond_one(ip: str, org_id: int, wait: bool) -> bytes:
+    key = f"{decision_engine.current().version}:{ip}"
+    if reputation.lookup(ip) is None:
+        hit = _responses.get(key)
+        if hit is not None:
+            RESPONSES.inc("hit")
+            return hit
+    resp = await _decide_one(ip, org_id, wait)
+    if resp["policy_version"] and not resp.get("missing") and not resp.get("provisional"):
+        RESPONSES.inc("store")
+        _responses.set(key, orjson.dumps({**resp, "cached": True}), settings.response_cache_s)
+    return orjson.dumps(resp)
 @router.post("/ip-check", response_model=DecisionResponse)
-async def ip_check(payload: IPCheckRequest, db: AsyncSession = Depends(get_db)):
-ck = f"ipcache:{payload.ip}"
-cached = cache.get(ck)
-if cached:
-return DecisionResponse(**cached, cached=True)
-vt, sh, ab = await asyncio.gather(
-intel_vt.ip_report(payload.ip),
-intel_shodan.ip_report(payload.ip),
-intel_abuse.ip_report(payload.ip),
-)
-signals = {"virustotal": vt, "shodan": sh, "abuseipdb": ab}
-risk, reasons, decision = decision_engine.score(signals)
-res = await db.execute(select(Counters).limit(1))
-row = res.scalar_one_or_none()
-if not row:
-row = Counters()
-db.add(row)
-row.ai_decisions_hour += 1
-if decision == "deny":
-row.threats_blocked_today += 1
-await db.commit()
-resp = DecisionResponse(decision=decision, risk_score=risk, signals={"reasons": reasons, **signals}, cached=False).model_dump()
-cache.setex(ck, resp, ttl=86400)
-db.add(DecisionLog(org_id=1, action=decision, reason=resp))
-await db.commit()
-return DecisionResponse(**resp)
+async def ip_check(payload: IPCheckRequest, wait: bool | None = None, principal: auth.Principal | None = Depends(auth.optional)):
+    principal = await auth.require(principal, payload.org_key)
+    await auth.enforce(principal)
+    return _json(await _respond_one(payload.ip, principal.org_id, not settings.enrich_async if wait is None else wait))
+@router.post("/ip-check/batch", response_model=BatchDecisionResponse)
+async def ip_check_batch(payload: IPBatchRequest, principal: auth.Principal | None = Depends(auth.optional)):
+    principal = await auth.require(principal, payload.org_key)
+    ips = list(dict.fromkeys(payload.ips))
+    await auth.enforce(principal, len(ips))
+    local = {}
+    for ip in ips:
+        match = reputation.lookup(ip)
+        if match: local[ip] = _local(match)
+    fetched = await signal_cache.fetch_many([ip for ip in ips if ip not in local], settings.batch_concurrency)
+    with telemetry.stage("scoring"): scored = decision_engine.decide_many(fetched) if fetched else {}
+    fresh = {ip: r for ip, r in scored.items() if not r["cached"]}
+    await _record_local(local, principal.org_id)
+    results = {ip: local.get(ip) or scored[ip] for ip in ips}
+    if fresh:
+        counters.record_decisions([r["decision"] for r in fresh.values()])
+        with telemetry.stage("log_enqueue"): await log_writer.record_decisions(principal.org_id, fresh)
+    return _json(orjson.dumps({"count": len(ips), "cached": len(scored) - len(fresh), "results": results}))
+class _DuplexResponse(StreamingResponse):
+    media_type = "application/x-ndjson"
+    async def __call__(self, scope, receive, send):
+        # The request body is still being read by the generator, so don't race it for receive().
+        await self.stream_response(send)
+def _parse_line(line: bytes) -> str:
+    if line[:1] in (b"{", b'"'):
+        obj = orjson.loads(line)
+        ip = obj.get("ip") if isinstance(obj, dict) else obj
+    else:
+        ip = line.decode()
+    if not isinstance(ip, str): raise ValueError("line has no ip")
+    return normalize_ip(ip)
+async def _lines(body: AsyncIterator[bytes]) -> AsyncIterator[list[bytes]]:
+    buf = b""
+    async for chunk in body:
+        if b"\n" in chunk:
+            # Only the new chunk is split; the unterminated tail is carried into the next one.
+            head, *lines, tail = chunk.split(b"\n")
+            lines = [line.strip() for line in (buf + head, *lines)]
+            buf = tail
+            yield [line for line in lines if line]
+        else: buf += chunk
+        if len(buf) > settings.stream_max_line: raise ValueError(f"line exceeds {settings.stream_max_line} bytes")
+    if buf.strip(): yield [buf.strip()]
+async def _stream(body: AsyncIterator[bytes], principal: auth.Principal) -> AsyncIterator[bytes]:
+    workers = settings.stream_concurrency
+    inq: asyncio.Queue = asyncio.Queue(settings.stream_queue_size)
+    outq: asyncio.Queue = asyncio.Queue(settings.stream_queue_size)
+    window: OrderedDict[str, asyncio.Future] = OrderedDict()
+    loop = asyncio.get_running_loop()
+    async def produce():
+        seq = 0
+        try:
+            async for lines in _lines(body):
+                await auth.charge(principal, len(lines))
+                for line in lines:
+                    seq += 1
+                    try: ip = _parse_line(line)
+                    except (ValueError, UnicodeDecodeError) as e:
+                        await outq.put({"seq": seq, "error": str(e)})
+                        continue
+                    fut = window.get(ip)
+                    if fut is None:
+                        fut = window[ip] = loop.create_future()
+                        if len(window) > settings.stream_dedupe_window: window.popitem(last=False)
+                        await inq.put((seq, ip, fut, True))
+                    elif fut.done() and not fut.exception():
+                        window.move_to_end(ip)
+                        await outq.put({"seq": seq, "ip": ip, **fut.result(), "cached": True})
+                    else:
+                        await inq.put((seq, ip, fut, False))
+        except Exception as e:
+            await outq.put({"seq": seq + 1, "error": str(e)})
+        finally:
+            for _ in range(workers): await inq.put(None)
+    async def work():
+        while (item := await inq.get()) is not None:
+            seq, ip, fut, owner = item
+            if owner:
+                try: fut.set_result(await _decide_one(ip, principal.org_id))
+                except Exception as e:
+                    fut.set_exception(e)
+                    fut.exception()
+            try: await outq.put({"seq": seq, "ip": ip, **await asyncio.shield(fut)})
+            except Exception as e: await outq.put({"seq": seq, "ip": ip, "error": str(e)})
+        await outq.put(None)
+    tasks = [asyncio.create_task(produce()), *(asyncio.create_task(work()) for _ in range(workers))]
+    try:
+        finished = 0
+        while finished < workers:
+            out = []
+            item = await outq.get()
+            while True:
+                if item is None: finished += 1
+                else: out.append(orjson.dumps(item))
+                if outq.empty() or len(out) >= settings.stream_flush_lines: break
+                item = outq.get_nowait()
+            if out: yield b"\n".join(out) + b"\n"
+    finally:
+        for task in tasks: task.cancel()
+@router.post("/ip-check/stream")
+async def ip_check_stream(request: Request, principal: auth.Principal = Depends(auth.tenant)):
+    return _DuplexResponse(_stream(request.stream(), principal))
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.schemas import IPBatchRequest, JobInfo, JobsSubmitted
+from app.services import auth, jobs
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+async def _submit(kind: str, payload: IPBatchRequest, principal: auth.Principal | None) -> JobsSubmitted:
+    principal = await auth.require(principal, payload.org_key)
+    ips = list(dict.fromkeys(payload.ips))
+    await auth.enforce(principal, len(ips))
+    return JobsSubmitted(count=len(ips), jobs=await jobs.submit(kind, principal.org_id, ips))
+@router.post("/enrich", response_model=JobsSubmitted, status_code=202)
+async def submit_enrich(payload: IPBatchRequest, principal: auth.Principal | None = Depends(auth.optional)):
+    return await _submit("enrich", payload, principal)
+@router.post("/backfill", response_model=JobsSubmitted, status_code=202)
+async def submit_backfill(payload: IPBatchRequest, principal: auth.Principal | None = Depends(auth.optional)):
+    return await _submit("backfill", payload, principal)
+@router.post("/rescan", response_model=JobsSubmitted, status_code=202, dependencies=[Depends(auth.admin)])
+async def submit_rescan():
+    return JobsSubmitted(count=0, jobs=[await jobs.rescan()])
+@router.get("/{job_id}", response_model=JobInfo)
+async def job_status(job_id: str, principal: auth.Principal | None = Depends(auth.optional)):
+    info = await jobs.status(job_id)
+    if principal is None or "admin" not in principal.scopes:
+        principal = await auth.require(principal)
+        if info and info["org_id"] != principal.org_id: info = None
+    if info is None: raise HTTPException(404, "unknown job")
+    return JobInfo(**info)
@@ -0,0 +1,33 @@
+import base64, binascii
+from fastapi import APIRouter, Depends, HTTPException
+from app.schemas import KemEncapsulateRequest, KemEncapsulateBatchRequest, KemEncapsulation, KemDecapsulateRequest, KemDecapsulateBatchRequest, KemDecapsulation
+from app.services import auth, kem
+router = APIRouter(prefix="/kem", tags=["kem"], dependencies=[Depends(auth.kem)])
+def _b64(raw: bytes) -> str: return base64.b64encode(raw).decode()
+def _unb64(value: str) -> bytes:
+    try: return base64.b64decode(value, validate=True)
+    except binascii.Error: raise HTTPException(422, "invalid base64")
+async def _encapsulate(count: int, public_key: str | None) -> list[KemEncapsulation]:
+    if public_key: _unb64(public_key)
+    try: key_id, alg, results = await kem.encapsulate(count, public_key)
+    except kem.UnknownKey: raise HTTPException(503, "no active key yet")
+    except ValueError as e: raise HTTPException(422, str(e))
+    return [KemEncapsulation(key_id=key_id, alg=alg, ciphertext=_b64(ct), shared_secret=_b64(ss)) for ct, ss in results]
+async def _decapsulate(items: list[KemDecapsulateRequest]) -> list[KemDecapsulation]:
+    try: secrets = await kem.decapsulate([(i.key_id, _unb64(i.ciphertext)) for i in items])
+    except kem.UnknownKey as e: raise HTTPException(404, f"unknown or purged key {e.args[0]}")
+    return [KemDecapsulation(key_id=i.key_id, shared_secret=_b64(ss) if ss else None) for i, ss in zip(items, secrets)]
+@router.post("/encapsulate", response_model=KemEncapsulation)
+async def encapsulate(payload: KemEncapsulateRequest):
+    return (await _encapsulate(1, payload.public_key))[0]
+@router.post("/encapsulate/batch", response_model=list[KemEncapsulation])
+async def encapsulate_batch(payload: KemEncapsulateBatchRequest):
+    return await _encapsulate(payload.count, payload.public_key)
+@router.post("/decapsulate", response_model=KemDecapsulation)
+async def decapsulate(payload: KemDecapsulateRequest):
+    res = (await _decapsulate([payload]))[0]
+    if res.shared_secret is None: raise HTTPException(422, "ciphertext does not match key algorithm")
+    return res
+@router.post("/decapsulate/batch", response_model=list[KemDecapsulation])
+async def decapsulate_batch(payload: KemDecapsulateBatchRequest):
+    return await _decapsulate(payload.items)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import scheduler
+from app.database import get_db
+from app.models import QuantumKey
+from app.services import auth
+router = APIRouter(prefix="/keys", tags=["keys"])
+def _public(qk: QuantumKey) -> dict:
+    return {"id": qk.id, "alg": qk.alg, "pub": qk.pub, "rotated_at": qk.rotated_at, "retired_at": qk.retired_at}
+@router.get("/active")
+async def active_key(db: AsyncSession = Depends(get_db)):
+    qk = (await db.execute(select(QuantumKey).where(QuantumKey.retired_at.is_(None)).order_by(QuantumKey.rotated_at.desc()).limit(1))).scalar_one_or_none()
+    if qk is None: raise HTTPException(503, "no active key yet")
+    return _public(qk)
+@router.post("/rotate", dependencies=[Depends(auth.admin)])
+async def rotate():
+    return _public(await scheduler.rotate_keys())
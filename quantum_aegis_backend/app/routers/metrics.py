@@ -1,17 +1,23 @@
-﻿from fastapi import APIRouter, Depends
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
-from app.models import Counters
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
 from app.schemas import Metrics
+from app.services import auth, cache, counters, log_writer, telemetry
 router = APIRouter(prefix="/metrics", tags=["metrics"])
 @router.get("", response_model=Metrics)
-async def get_metrics(db: AsyncSession = Depends(get_db)):
-res = await db.execute(select(Counters).limit(1))
-row = res.scalar_one_or_none()
-if not row:
-row = Counters()
-db.add(row)
-await db.commit()
-await db.refresh(row)
-return Metrics(live_threats=row.live_threats, threats_blocked_today=row.threats_blocked_today, ai_decisions_hour=row.ai_decisions_hour, quantum_keys_active=row.quantum_keys_active)
+async def get_metrics():
+    return Metrics(**counters.snapshot())
+@router.get("/cache")
+async def get_cache_stats():
+    return cache.snapshot()
+@router.get("/log-writer")
+async def get_log_writer_stats():
+    return log_writer.snapshot()
+@router.get("/prometheus", response_class=PlainTextResponse)
+async def get_prometheus():
+    return PlainTextResponse(telemetry.render(), media_type="text/plain; version=0.0.4")
+@router.get("/profile", response_class=PlainTextResponse, dependencies=[Depends(auth.admin)])
+async def get_profile(top: int = 200, reset: bool = False):
+    if telemetry.profiler is None: raise HTTPException(404, "sampling profiler disabled (set PROFILE_SAMPLE_HZ)")
+    out = telemetry.profiler.collapsed(top)
+    if reset: telemetry.profiler.reset()
+    return out
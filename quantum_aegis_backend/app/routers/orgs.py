@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import get_db
+from app.models import APIKey, Org
+from app.schemas import APIKeyCreated, OrgIn, OrgOut, TokenResponse
+from app.security import create_api_key, hash_api_key, jwt_encode
+from app.services import auth
+router = APIRouter(tags=["orgs"])
+@router.post("/orgs", response_model=OrgOut, dependencies=[Depends(auth.admin)])
+async def create_org(payload: OrgIn, db: AsyncSession = Depends(get_db)):
+    org = Org(name=payload.name, plan=payload.plan)
+    db.add(org)
+    try: await db.commit()
+    except IntegrityError: raise HTTPException(409, f"org {payload.name!r} exists")
+    return OrgOut(id=org.id, name=org.name, plan=org.plan)
+@router.post("/orgs/{org_id}/api-keys", response_model=APIKeyCreated, dependencies=[Depends(auth.admin)])
+async def create_key(org_id: int, db: AsyncSession = Depends(get_db)):
+    if await db.get(Org, org_id) is None: raise HTTPException(404, "unknown org")
+    key = create_api_key()
+    row = APIKey(org_id=org_id, key_hash=hash_api_key(key))
+    db.add(row)
+    await db.commit()
+    return APIKeyCreated(id=row.id, org_id=org_id, key=key)
+@router.delete("/orgs/{org_id}/api-keys/{key_id}", status_code=204, dependencies=[Depends(auth.admin)])
+async def revoke_key(org_id: int, key_id: int):
+    if not await auth.revoke(key_id, org_id): raise HTTPException(404, "unknown or already revoked key")
+@router.post("/auth/token", response_model=TokenResponse)
+async def issue_token(principal: auth.Principal = Depends(auth.tenant)):
+    return TokenResponse(access_token=jwt_encode(str(principal.org_id), list(principal.scopes)), expires_in=60 * settings.jwt_expire_min)
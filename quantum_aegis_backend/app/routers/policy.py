@@ -0,0 +1,40 @@
+import time
+from collections import Counter
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
+from app.models import DecisionLog
+from app.schemas import RescoreSummary
+from app.services import auth, decision_engine
+from app.services.decision_engine import Policy
+router = APIRouter(prefix="/policy", tags=["policy"])
+RESCORE_CHUNK = 50000
+def _policy(version: str | None) -> Policy:
+    try: return decision_engine.get_policy(version)
+    except KeyError: raise HTTPException(404, f"unknown policy version {version}")
+@router.get("", response_model=Policy)
+async def get_policy(version: str | None = None):
+    return _policy(version)
+@router.get("/versions")
+async def list_versions():
+    return {"active": decision_engine.current().version, "versions": decision_engine.versions()}
+@router.post("/reload", response_model=Policy, dependencies=[Depends(auth.admin)])
+async def reload_policy():
+    try: return decision_engine.reload(force=True)
+    except (OSError, ValueError) as e: raise HTTPException(422, f"policy not loaded: {e}")
+@router.post("/rescore", response_model=RescoreSummary, dependencies=[Depends(auth.admin)])
+async def rescore(version: str | None = None, db: AsyncSession = Depends(get_db)):
+    policy = _policy(version)
+    t0 = time.perf_counter()
+    transitions, scored, last_id = Counter(), 0, 0
+    while True:
+        res = await db.execute(select(DecisionLog.id, DecisionLog.action, DecisionLog.reason).where(DecisionLog.id > last_id).order_by(DecisionLog.id).limit(RESCORE_CHUNK))
+        rows = res.all()
+        if not rows: break
+        last_id = rows[-1].id
+        cols = decision_engine.columns([(r.reason or {}).get("signals", {}) for r in rows])
+        _, _, decisions = decision_engine.score_batch(cols, policy)
+        transitions.update(f"{r.action}->{d}" for r, d in zip(rows, decisions.tolist()) if r.action != d)
+        scored += len(rows)
+    return RescoreSummary(policy_version=policy.version, scored=scored, changed=sum(transitions.values()), transitions=dict(transitions), seconds=time.perf_counter() - t0)
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
+from app.models import ReputationRule
+from app.schemas import ReputationRuleIn, normalize_ip
+from app.services import auth, reputation
+router = APIRouter(prefix="/reputation", tags=["reputation"])
+def _status() -> dict:
+    index = reputation.current()
+    return {"rules": index.size, "segments_v4": len(index.v4.starts), "segments_v6": len(index.v6.starts), "loaded_at": index.loaded_at}
+@router.get("")
+async def get_status():
+    return _status()
+@router.get("/lookup")
+async def lookup(ip: str):
+    try: match = reputation.lookup(normalize_ip(ip))
+    except ValueError: raise HTTPException(422, f"invalid ip {ip!r}")
+    return {"ip": ip, "match": match._asdict() if match else None}
+@router.post("/reload", dependencies=[Depends(auth.admin)])
+async def reload():
+    await reputation.reload()
+    return _status()
+@router.post("/rules", dependencies=[Depends(auth.admin)])
+async def add_rule(rule: ReputationRuleIn, db: AsyncSession = Depends(get_db)):
+    db.add(ReputationRule(cidr=rule.cidr, action=rule.action, source=rule.source))
+    await db.commit()
+    await reputation.reload()
+    return _status()
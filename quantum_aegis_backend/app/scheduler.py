@@ -1,26 +1,77 @@
-﻿from apscheduler.schedulers.background import BackgroundScheduler
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+import asyncio, logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, update, delete, func
 from app.database import SessionLocal
-from app.models import QuantumKey, Counters
+from app.models import QuantumKey
+from app.services import counters, kem
 from app.services.pqc import generate_keypair
 from app.config import settings
-sched = BackgroundScheduler()
-def rotate_keys():
-async def _run():
-async with SessionLocal() as db:
-alg, pub, priv = generate_keypair()
-qk = QuantumKey(alg=alg, pub=pub, priv=priv)
-db.add(qk)
-res = await db.execute(select(Counters).limit(1))
-row = res.scalar_one_or_none()
-if not row:
-row = Counters()
-db.add(row)
-row.quantum_keys_active += 1
-await db.commit()
-import asyncio
-asyncio.get_event_loop().create_task(_run())
-def start_scheduler():
-sched.add_job(rotate_keys, "interval", minutes=settings.key_rotation_min, id="key_rotation", replace_existing=True)
-if not sched.running: sched.start()
+log = logging.getLogger(__name__)
+_executor: Executor | None = None
+_pool: asyncio.Queue | None = None
+_tasks: list[asyncio.Task] = []
+def _utc(dt: datetime) -> datetime:
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+async def generate() -> tuple[str, str, str]:
+    # Non-leaders never start(), but /keys/rotate can still land on them; keep keygen off the event loop.
+    if _executor is None: return await asyncio.to_thread(generate_keypair)
+    return await asyncio.get_running_loop().run_in_executor(_executor, generate_keypair)
+async def take_keypair() -> tuple[str, str, str]:
+    if _pool is not None:
+        try: return _pool.get_nowait()
+        except asyncio.QueueEmpty: pass
+    return await generate()
+async def _refill():
+    while True:
+        try: await _pool.put(await generate())
+        except asyncio.CancelledError: raise
+        except Exception:
+            log.exception("keypair generation failed")
+            await asyncio.sleep(5)
+async def refresh_active() -> int:
+    async with SessionLocal() as db:
+        n = (await db.execute(select(func.count(QuantumKey.id)).where(QuantumKey.retired_at.is_(None)))).scalar_one()
+    counters.set_gauge("quantum_keys_active", n)
+    return n
+async def rotate_keys() -> QuantumKey:
+    alg, pub, priv = await take_keypair()
+    now = datetime.now(timezone.utc)
+    async with SessionLocal() as db:
+        await db.execute(update(QuantumKey).where(QuantumKey.retired_at.is_(None)).values(retired_at=now))
+        qk = QuantumKey(alg=alg, pub=pub, priv=priv, rotated_at=now)
+        db.add(qk)
+        await db.execute(delete(QuantumKey).where(QuantumKey.retired_at < now - timedelta(minutes=settings.key_retention_min)))
+        await db.commit()
+    kem.invalidate()
+    await refresh_active()
+    return qk
+async def _next_rotation_in() -> float:
+    async with SessionLocal() as db:
+        last = (await db.execute(select(func.max(QuantumKey.rotated_at)).where(QuantumKey.retired_at.is_(None)))).scalar_one_or_none()
+    if last is None: return 0.0
+    due = _utc(last) + timedelta(minutes=settings.key_rotation_min)
+    return max(0.0, (due - datetime.now(timezone.utc)).total_seconds())
+async def _rotation_loop():
+    while True:
+        try:
+            await asyncio.sleep(await _next_rotation_in())
+            await rotate_keys()
+        except asyncio.CancelledError: raise
+        except Exception:
+            log.exception("key rotation failed")
+            await asyncio.sleep(30)
+async def start():
+    global _executor, _pool
+    if settings.keygen_processes: _executor = ProcessPoolExecutor(settings.keygen_workers)
+    else: _executor = ThreadPoolExecutor(settings.keygen_workers, thread_name_prefix="keygen")
+    _pool = asyncio.Queue(maxsize=settings.keypool_size)
+    await refresh_active()
+    _tasks.extend([asyncio.create_task(_refill()), asyncio.create_task(_rotation_loop())])
+async def stop():
+    global _executor, _pool
+    for task in _tasks: task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    if _executor: _executor.shutdown(wait=False, cancel_futures=True)
+    _executor, _pool = None, None
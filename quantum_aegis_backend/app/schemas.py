@@ -1,14 +1,145 @@
-﻿from pydantic import BaseModel, Field
+import ipaddress
+from datetime import datetime
+from pydantic import BaseModel, Field, field_validator
+from app.config import settings
+def normalize_ip(v: str) -> str:
+    return str(ipaddress.ip_address(v.strip()))
 class IPCheckRequest(BaseModel):
-ip: str
-org_key: str | None = None
+    ip: str
+    org_key: str | None = None
+    _ip = field_validator("ip")(normalize_ip)
+class IPBatchRequest(BaseModel):
+    ips: list[str] = Field(min_length=1, max_length=settings.batch_max_ips)
+    org_key: str | None = None
+    @field_validator("ips")
+    @classmethod
+    def _ips(cls, v: list[str]) -> list[str]: return [normalize_ip(ip) for ip in v]
+class ProviderSignal(BaseModel):
+    source: str
+    error: str | None = None
+    status: int | None = None
+class VirusTotalSignal(ProviderSignal):
+    malicious: int = 0
+    harmless: int = 0
+    suspicious: int = 0
+    undetected: int = 0
+class ShodanSignal(ProviderSignal):
+    open_ports: list[int] = []
+    vuln_count: int = 0
+class AbuseIPDBSignal(ProviderSignal):
+    confidence_score: int = 0
+    total_reports: int = 0
+class Reasons(BaseModel):
+    vt: float
+    shodan: float
+    abuse: float
+class ReputationSignal(BaseModel):
+    action: str
+    cidr: str
+    source: str
+PROVIDER_SIGNALS: dict[str, type[ProviderSignal]] = {"virustotal": VirusTotalSignal, "shodan": ShodanSignal, "abuseipdb": AbuseIPDBSignal}
+class Signals(BaseModel):
+    reasons: Reasons | None = None
+    virustotal: VirusTotalSignal | None = None
+    shodan: ShodanSignal | None = None
+    abuseipdb: AbuseIPDBSignal | None = None
+    reputation: ReputationSignal | None = None
 class DecisionResponse(BaseModel):
-decision: str
-risk_score: float = Field(ge=0, le=1)
-signals: dict
-cached: bool = False
+    decision: str
+    risk_score: float = Field(ge=0, le=1)
+    signals: Signals
+    cached: bool = False
+    policy_version: str | None = None
+    provisional: bool = False
+    job_id: str | None = None
+    missing: list[str] = []
+    degraded: bool = False
+class BatchDecisionResponse(BaseModel):
+    count: int
+    cached: int
+    results: dict[str, DecisionResponse]
 class Metrics(BaseModel):
-live_threats: int
-threats_blocked_today: int
-ai_decisions_hour: int
-quantum_keys_active: int
+    live_threats: int
+    threats_blocked_today: int
+    ai_decisions_hour: int
+    quantum_keys_active: int
+class ReputationRuleIn(BaseModel):
+    cidr: str
+    action: str = Field(pattern="^(allow|deny)$")
+    source: str = "manual"
+    @field_validator("cidr")
+    @classmethod
+    def _cidr(cls, v: str) -> str: return str(ipaddress.ip_network(v.strip(), strict=False))
+class KemEncapsulateRequest(BaseModel):
+    public_key: str | None = None
+class KemEncapsulateBatchRequest(KemEncapsulateRequest):
+    count: int = Field(ge=1, le=settings.kem_batch_max)
+class KemEncapsulation(BaseModel):
+    key_id: int | None
+    alg: str
+    ciphertext: str
+    shared_secret: str
+class KemDecapsulateRequest(BaseModel):
+    key_id: int
+    ciphertext: str
+class KemDecapsulateBatchRequest(BaseModel):
+    items: list[KemDecapsulateRequest] = Field(min_length=1, max_length=settings.kem_batch_max)
+class KemDecapsulation(BaseModel):
+    key_id: int
+    shared_secret: str | None
+class RescoreSummary(BaseModel):
+    policy_version: str
+    scored: int
+    changed: int
+    transitions: dict[str, int]
+    seconds: float
+class OrgIn(BaseModel):
+    name: str = Field(min_length=1, max_length=120)
+    plan: str = Field(default="essential", pattern="^(essential|pro|enterprise)$")
+class OrgOut(OrgIn):
+    id: int
+class APIKeyCreated(BaseModel):
+    id: int
+    org_id: int
+    key: str
+class TokenResponse(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
+class JobsSubmitted(BaseModel):
+    count: int
+    jobs: list[str]
+class JobInfo(BaseModel):
+    id: str
+    kind: str | None
+    status: str
+    done: int | None = None
+    total: int | None = None
+    result: dict | None = None
+    error: str | None = None
+    enqueued_at: datetime | None = None
+    ended_at: datetime | None = None
+class DecisionRecord(BaseModel):
+    id: int
+    ip: str | None
+    decision: str
+    risk_score: float | None
+    policy_version: str | None = None
+    signals: dict | None = None
+    created_at: datetime
+class DecisionPage(BaseModel):
+    count: int
+    next_cursor: str | None
+    results: list[DecisionRecord]
+class TimelineBucket(BaseModel):
+    bucket_start: int
+    allow: int = 0
+    flag: int = 0
+    deny: int = 0
+class DeniedIP(BaseModel):
+    ip: str
+    count: int
+class ProviderContribution(BaseModel):
+    decisions: int
+    mean_score: dict[str, float]
+    share: dict[str, float]
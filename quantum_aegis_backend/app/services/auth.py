@@ -0,0 +1,149 @@
+import asyncio, logging, time
+from typing import NamedTuple
+import jwt
+from fastapi import HTTPException, Request
+from redis.exceptions import RedisError
+from sqlalchemy import select, update
+from app.config import settings
+from app.database import SessionLocal
+from app.models import APIKey, Org
+from app.security import hash_api_key, jwt_decode
+from app.services import cache, telemetry
+log = logging.getLogger(__name__)
+CHANNEL = "auth:invalidate"
+class Principal(NamedTuple):
+    org_id: int | None
+    plan: str
+    key_id: int | None
+    scopes: tuple[str, ...]
+class QuotaExceeded(Exception):
+    def __init__(self, limit: str, retry_after: int):
+        super().__init__(f"{limit} exceeded")
+        self.limit, self.retry_after = limit, retry_after
+ANONYMOUS = Principal(1, "enterprise", None, ("intel",))
+AUTH_EVENTS = telemetry.Counter("qa_auth_events_total", "Authentication lookups by outcome", ("event",))
+_cache = cache.LRU(settings.auth_cache_max, settings.auth_cache_ttl_s)
+_task: asyncio.Task | None = None
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(401, detail, headers={"WWW-Authenticate": "Bearer"})
+async def _load_key(digest: str) -> Principal | None:
+    async with SessionLocal() as db:
+        row = (await db.execute(select(APIKey.id, APIKey.org_id, Org.plan).join(Org, Org.id == APIKey.org_id).where(APIKey.key_hash == digest, APIKey.active.is_(True)))).first()
+    return Principal(row.org_id, row.plan, row.id, ("intel",)) if row else None
+async def _load_org(org_id: int) -> str | None:
+    async with SessionLocal() as db:
+        return (await db.execute(select(Org.plan).where(Org.id == org_id))).scalar_one_or_none()
+async def warm(limit: int) -> int:
+    async with SessionLocal() as db:
+        rows = (await db.execute(select(APIKey.id, APIKey.org_id, APIKey.key_hash, Org.plan).join(Org, Org.id == APIKey.org_id).where(APIKey.active.is_(True)).order_by(APIKey.id.desc()).limit(limit))).all()
+    for r in rows: _cache.set(f"key:{r.key_hash}", Principal(r.org_id, r.plan, r.id, ("intel",)), settings.auth_cache_ttl_s)
+    return len(rows)
+async def _cached(key: str, loader, ttl: float):
+    hit = _cache.get(key)
+    if hit is not None:
+        AUTH_EVENTS.inc("cache_hit")
+        return hit or None
+    AUTH_EVENTS.inc("cache_miss")
+    val = await loader()
+    _cache.set(key, val or False, ttl if val else settings.auth_negative_ttl_s)
+    return val
+async def from_api_key(key: str) -> Principal:
+    digest = hash_api_key(key)
+    principal = await _cached(f"key:{digest}", lambda: _load_key(digest), settings.auth_cache_ttl_s)
+    if principal is None: raise _unauthorized("invalid api key")
+    return principal
+async def from_jwt(token: str) -> Principal:
+    hit = _cache.get(f"jwt:{token}")
+    if hit: return hit
+    try: claims = jwt_decode(token)
+    except jwt.PyJWTError as e: raise _unauthorized(f"invalid token: {e}")
+    scopes = tuple(claims.get("scopes") or ())
+    org_id = int(claims["sub"]) if str(claims["sub"]).isdigit() else None
+    plan = "enterprise"
+    if org_id is not None:
+        plan = await _cached(f"org:{org_id}", lambda: _load_org(org_id), settings.auth_cache_ttl_s)
+        if plan is None: raise _unauthorized("unknown org")
+    principal = Principal(org_id, plan, None, scopes)
+    _cache.set(f"jwt:{token}", principal, max(0.0, min(settings.auth_cache_ttl_s, claims["exp"] - time.time())))
+    return principal
+def _credentials(request: Request) -> str | None:
+    header = request.headers.get("authorization")
+    if header:
+        scheme, _, token = header.partition(" ")
+        if scheme.lower() != "bearer" or not token: raise _unauthorized("expected a Bearer token")
+        return token.strip()
+    return request.headers.get("x-api-key")
+async def authenticate(token: str) -> Principal:
+    return await (from_jwt(token) if token.count(".") == 2 else from_api_key(token))
+async def optional(request: Request) -> Principal | None:
+    token = _credentials(request)
+    return await authenticate(token) if token else None
+async def require(principal: Principal | None, org_key: str | None = None) -> Principal:
+    if principal is None and org_key: principal = await authenticate(org_key)
+    if principal is None:
+        if not settings.auth_required: return ANONYMOUS
+        raise _unauthorized("missing credentials")
+    if principal.org_id is None or "intel" not in principal.scopes: raise HTTPException(403, "token is not scoped to an org")
+    return principal
+async def tenant(request: Request) -> Principal:
+    return await require(await optional(request))
+def scoped(*scopes: str):
+    async def dependency(request: Request) -> Principal:
+        principal = await optional(request)
+        if principal is None: raise _unauthorized("missing credentials")
+        if not set(scopes) & set(principal.scopes): raise HTTPException(403, f"{' or '.join(scopes)} scope required")
+        return principal
+    return dependency
+kem = scoped("kem", "admin")
+admin = scoped("admin")
+async def charge(principal: Principal, cost: int = 1):
+    limits = settings.plan_limits.get(principal.plan) or {}
+    rate, daily = limits.get("rate_per_min", 0), limits.get("daily_quota", 0)
+    if not (rate or daily) or cost <= 0: return
+    now = int(time.time())
+    minute, day = now // 60, now // 86400
+    pipe = cache.client().pipeline(transaction=False)
+    pipe.incrby(f"rl:{principal.org_id}:{minute}", cost).expire(f"rl:{principal.org_id}:{minute}", 120)
+    pipe.incrby(f"quota:{principal.org_id}:{day}", cost).expire(f"quota:{principal.org_id}:{day}", 2 * 86400)
+    try: used_min, _, used_day, _ = await pipe.execute()
+    except RedisError:
+        AUTH_EVENTS.inc("quota_unavailable")
+        return
+    if rate and used_min > rate:
+        AUTH_EVENTS.inc("rate_limited")
+        raise QuotaExceeded("rate limit", 60 - now % 60)
+    if daily and used_day > daily:
+        AUTH_EVENTS.inc("quota_exceeded")
+        raise QuotaExceeded("daily quota", 86400 - now % 86400)
+async def enforce(principal: Principal, cost: int = 1):
+    try: await charge(principal, cost)
+    except QuotaExceeded as e: raise HTTPException(429, str(e), headers={"Retry-After": str(e.retry_after)})
+def invalidate(digest: str):
+    _cache.delete(f"key:{digest}")
+async def revoke(key_id: int, org_id: int) -> bool:
+    async with SessionLocal() as db:
+        digest = (await db.execute(update(APIKey).where(APIKey.id == key_id, APIKey.org_id == org_id, APIKey.active.is_(True)).values(active=False).returning(APIKey.key_hash))).scalar_one_or_none()
+        await db.commit()
+    if digest is None: return False
+    invalidate(digest)
+    try: await cache.client().publish(CHANNEL, digest)
+    except RedisError: log.warning("revocation broadcast failed; peers fall back to the %ss cache ttl", settings.auth_cache_ttl_s)
+    return True
+async def _listen():
+    while True:
+        try:
+            async with cache.client().pubsub() as pubsub:
+                await pubsub.subscribe(CHANNEL)
+                async for msg in pubsub.listen():
+                    if msg["type"] == "message": invalidate(msg["data"].decode())
+        except RedisError:
+            _cache.clear()
+            await asyncio.sleep(5)
+async def start():
+    global _task
+    _task = asyncio.create_task(_listen())
+async def stop():
+    global _task
+    if _task:
+        _task.cancel()
+        _task = None
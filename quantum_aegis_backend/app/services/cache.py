@@ -1,10 +1,121 @@
-﻿import redis, json
+import asyncio, time, msgpack
+from collections import OrderedDict
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
 from app.config import settings
-_redis = redis.from_url(settings.redis_url, decode_responses=True)
-def get(key: str):
-val = _redis.get(key)
-if not val: return None
-try: return json.loads(val)
-except Exception: return val
-def setex(key: str, value, ttl: int):
-_redis.setex(key, ttl, json.dumps(value))
+from app.services import telemetry
+_redis = aioredis.from_url(settings.redis_url)
+MGET_CHUNK = 1000
+stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "redis_errors": 0}
+class LRU:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+    def get(self, key: str):
+        item = self._data.get(key)
+        if item is None: return None
+        if item[0] < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return item[1]
+    def set(self, key: str, value, ttl: float):
+        self._data[key] = (time.monotonic() + min(ttl, self.ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            stats["evictions"] += 1
+    def delete(self, key: str):
+        self._data.pop(key, None)
+    def clear(self):
+        self._data.clear()
+    def __len__(self): return len(self._data)
+local = LRU(settings.cache_local_max, settings.cache_local_ttl_s)
+_inflight: dict[str, asyncio.Future] = {}
+def client() -> aioredis.Redis: return _redis
+def pack(value) -> bytes: return msgpack.packb(value, use_bin_type=True)
+def unpack(raw: bytes): return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+def _local_get(key: str):
+    val = local.get(key)
+    if val is not None: stats["local_hits"] += 1
+    return val
+async def _remote_get(key: str):
+    try: raw = await _redis.get(key)
+    except RedisError:
+        stats["redis_errors"] += 1
+        raw = None
+    if raw is None:
+        stats["misses"] += 1
+        return None
+    stats["redis_hits"] += 1
+    val = unpack(raw)
+    local.set(key, val, settings.cache_local_ttl_s)
+    return val
+async def get(key: str):
+    val = _local_get(key)
+    if val is not None: return val
+    return await _remote_get(key)
+async def setex(key: str, value, ttl: int):
+    local.set(key, value, ttl)
+    try: await _redis.setex(key, ttl, pack(value))
+    except RedisError: stats["redis_errors"] += 1
+async def delete(key: str):
+    local.delete(key)
+    try: await _redis.delete(key)
+    except RedisError: stats["redis_errors"] += 1
+async def claim(key: str, ttl: int) -> bool:
+    try: return bool(await _redis.set(key, b"1", nx=True, ex=ttl))
+    except RedisError:
+        stats["redis_errors"] += 1
+        return True
+async def mget(keys: list[str]) -> list:
+    out = [_local_get(k) for k in keys]
+    missing = [i for i, v in enumerate(out) if v is None]
+    if not missing: return out
+    pipe = _redis.pipeline(transaction=False)
+    for i in range(0, len(missing), MGET_CHUNK): pipe.mget([keys[j] for j in missing[i:i + MGET_CHUNK]])
+    try: raws = [v for chunk in await pipe.execute() for v in chunk]
+    except RedisError:
+        stats["redis_errors"] += 1
+        raws = [None] * len(missing)
+    for i, raw in zip(missing, raws):
+        if raw is None:
+            stats["misses"] += 1
+            continue
+        stats["redis_hits"] += 1
+        out[i] = unpack(raw)
+        local.set(keys[i], out[i], settings.cache_local_ttl_s)
+    return out
+async def coalesce(key: str, fn):
+    fut = _inflight.get(key)
+    if fut is not None:
+        stats["coalesced"] += 1
+        val, _ = await asyncio.shield(fut)
+        return val, False
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[key] = fut
+    try:
+        res = await fn()
+        fut.set_result(res)
+        return res
+    except Exception as e:
+        fut.set_exception(e)
+        fut.exception()
+        raise
+    except BaseException:
+        fut.cancel()
+        raise
+    finally:
+        _inflight.pop(key, None)
+def snapshot() -> dict:
+    lookups = stats["local_hits"] + stats["redis_hits"] + stats["misses"]
+    hits = stats["local_hits"] + stats["redis_hits"]
+    return {**stats, "inflight": len(_inflight), "local_size": len(local), "hit_ratio": hits / lookups if lookups else 0.0}
+async def disconnect():
+    await _redis.connection_pool.disconnect()
+telemetry.Counter("qa_cache_events_total", "Two-tier cache events", ("event",), fn=lambda: dict(stats))
+telemetry.Gauge("qa_cache_hit_ratio", "Share of cache lookups served from the local or Redis tier", fn=lambda: {(): snapshot()["hit_ratio"]})
+telemetry.Gauge("qa_cache_entries", "Cache entries held in the local tier or in flight", ("tier",), fn=lambda: {"local": len(local), "inflight": len(_inflight)})
+async def close():
+    await _redis.aclose()
@@ -0,0 +1,91 @@
+import asyncio, logging, time
+from collections import defaultdict
+from sqlalchemy import select, update, delete, and_, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.models import Counters, CounterRollup
+from app.services import telemetry
+log = logging.getLogger(__name__)
+WINDOWS = {"ai_decisions_hour": 3600, "threats_blocked_today": 86400}
+TOTALS = ("live_threats", "quantum_keys_active")
+_pending: defaultdict[tuple[str, int], int] = defaultdict(int)
+_snapshot: dict[str, int] = {}
+_windows: dict[str, int] = {}
+_flushing: dict[tuple[str, int], int] = {}
+_gauges: dict[str, int] = {}
+_task: asyncio.Task | None = None
+def window_start(name: str, now: float | None = None) -> int:
+    size = WINDOWS.get(name)
+    if not size: return 0
+    now = time.time() if now is None else now
+    return int(now // size * size)
+def incr(name: str, n: int = 1):
+    if n: _pending[(name, window_start(name))] += n
+def set_gauge(name: str, value: int):
+    # Written to the shared row by the next flush only, so a process that never measured it can't overwrite it with a stale value.
+    _gauges[name] = value
+def record_decisions(decisions: list[str]):
+    incr("ai_decisions_hour", len(decisions))
+    incr("threats_blocked_today", decisions.count("deny"))
+def _unflushed(key: tuple[str, int]) -> int:
+    return _pending.get(key, 0) + _flushing.get(key, 0)
+def snapshot() -> dict[str, int]:
+    out = dict(_snapshot)
+    for name in WINDOWS:
+        start = window_start(name)
+        out[name] = (out.get(name, 0) if _windows.get(name) == start else 0) + _unflushed((name, start))
+    for name in TOTALS: out[name] = out.get(name, 0) + _unflushed((name, 0))
+    return out | _gauges
+def _insert():
+    return postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert
+def _upsert(rows: list[dict]):
+    stmt = _insert()(CounterRollup).values(rows)
+    return stmt.on_conflict_do_update(index_elements=["name", "window_start"], set_={"value": CounterRollup.value + stmt.excluded.value})
+async def _ensure_row(db):
+    if (await db.execute(select(Counters.id).limit(1))).scalar_one_or_none() is None:
+        await db.execute(_insert()(Counters).values(id=1).on_conflict_do_nothing())
+async def flush():
+    with telemetry.stage("counters_flush"): await _flush()
+async def _flush():
+    global _snapshot, _windows, _flushing
+    pending = _flushing = dict(_pending)
+    gauges = dict(_gauges)
+    _pending.clear()
+    try:
+        async with SessionLocal() as db:
+            await _ensure_row(db)
+            rollups = [{"name": k, "window_start": s, "value": n} for (k, s), n in pending.items() if k in WINDOWS]
+            if rollups: await db.execute(_upsert(rollups))
+            totals = {k: Counters.__table__.c[k] + n for (k, _), n in pending.items() if k in TOTALS}
+            windows = {k: window_start(k) for k in WINDOWS}
+            res = await db.execute(select(CounterRollup.name, CounterRollup.value).where(or_(*(and_(CounterRollup.name == k, CounterRollup.window_start == s) for k, s in windows.items()))))
+            current = {k: 0 for k in WINDOWS} | dict(res.all())
+            await db.execute(update(Counters).values(**(totals | current | gauges)))
+            await db.execute(delete(CounterRollup).where(CounterRollup.window_start < time.time() - settings.counters_retention_s))
+            row = (await db.execute(select(Counters).limit(1))).scalar_one()
+            await db.commit()
+    except Exception:
+        for key, n in pending.items(): _pending[key] += n
+        raise
+    finally:
+        _flushing = {}
+    _snapshot = {"live_threats": row.live_threats, "threats_blocked_today": row.threats_blocked_today, "ai_decisions_hour": row.ai_decisions_hour, "quantum_keys_active": row.quantum_keys_active}
+    _windows = windows
+    for name, value in gauges.items():
+        if _gauges.get(name) == value: del _gauges[name]
+async def _loop():
+    while True:
+        await asyncio.sleep(settings.counters_flush_s)
+        try: await flush()
+        except Exception: log.exception("counter flush failed; deltas kept for next flush")
+async def start():
+    global _task
+    await flush()
+    _task = asyncio.create_task(_loop())
+async def stop():
+    global _task
+    if _task:
+        _task.cancel()
+        _task = None
+    await flush()
@@ -1,15 +1,130 @@
-﻿def score(signals: dict):
-vt = signals.get("virustotal", {})
-sh = signals.get("shodan", {})
-ab = signals.get("abuseipdb", {})
-vt_bad = float(vt.get("malicious", 0))
-vt_total = max(1.0, vt_bad + float(vt.get("harmless", 0)))
-vt_score = vt_bad / vt_total
-sh_score = 0.0
-if 445 in sh.get("open_ports", []): sh_score = 0.5
-sh_score += min(0.5, 0.1 * float(sh.get("vuln_count", 0)))
-ab_score = float(ab.get("confidence_score", 0)) / 100.0
-risk = min(1.0, 0.5 * vt_score + 0.3 * sh_score + 0.2 * ab_score)
-decision = "deny" if risk >= 0.6 else "flag" if risk >= 0.3 else "allow"
-reasons = {"vt": vt_score, "shodan": sh_score, "abuse": ab_score}
-return risk, reasons, decision
+import json, logging, os, time
+from typing import Literal, NamedTuple
+import numpy as np
+from pydantic import BaseModel
+from app.config import settings
+log = logging.getLogger(__name__)
+DECISIONS = np.array(["allow", "flag", "deny"])
+PROVIDERS = ("virustotal", "shodan", "abuseipdb")
+class Policy(BaseModel):
+    version: str
+    vt_weight: float = 0.5
+    shodan_weight: float = 0.3
+    abuse_weight: float = 0.2
+    port_penalties: dict[int, float] = {445: 0.5}
+    vuln_step: float = 0.1
+    vuln_cap: float = 0.5
+    flag_threshold: float = 0.3
+    deny_threshold: float = 0.6
+    # Used when no provider answered: failing open to "allow" would let an outage (or an attacker stalling providers) wave everything through.
+    degraded_decision: Literal["allow", "flag", "deny"] = "flag"
+    def degraded_risk(self) -> float:
+        return {"allow": 0.0, "flag": self.flag_threshold, "deny": self.deny_threshold}[self.degraded_decision]
+class SignalColumns(NamedTuple):
+    vt_malicious: np.ndarray
+    vt_harmless: np.ndarray
+    vuln_count: np.ndarray
+    abuse_confidence: np.ndarray
+    port_rows: np.ndarray
+    port_values: np.ndarray
+    present: np.ndarray | None = None
+DEFAULT_POLICY = Policy(version="builtin-1")
+_versions: dict[str, Policy] = {DEFAULT_POLICY.version: DEFAULT_POLICY}
+_active = DEFAULT_POLICY
+_mtime: float | None = None
+_checked = 0.0
+def activate(policy: Policy) -> Policy:
+    global _active
+    _versions[policy.version] = policy
+    _active = policy
+    return policy
+def reload(force: bool = False) -> Policy:
+    global _mtime
+    path = settings.scoring_policy_path
+    if not path: return _active
+    mtime = os.stat(path).st_mtime
+    if force or mtime != _mtime:
+        with open(path) as f: policy = Policy.model_validate(json.load(f))
+        activate(policy)
+        _mtime = mtime
+    return _active
+def current() -> Policy:
+    global _checked
+    now = time.monotonic()
+    if settings.scoring_policy_path and now - _checked >= settings.scoring_policy_reload_s:
+        _checked = now
+        try: reload()
+        except (OSError, ValueError): log.exception("keeping scoring policy %s", _active.version)
+    return _active
+def get_policy(version: str | None = None) -> Policy:
+    return current() if version is None else _versions[version]
+def versions() -> list[str]: return list(_versions)
+def _present(sig) -> bool: return bool(sig) and "error" not in sig
+def missing(signals: dict) -> list[str]:
+    return [k for k in PROVIDERS if not _present(signals.get(k))]
+def _outcome(signals: dict) -> dict:
+    gone = missing(signals)
+    return {"missing": gone, "degraded": len(gone) == len(PROVIDERS)}
+def score(signals: dict, policy: Policy | None = None):
+    p = policy or current()
+    vt = signals.get("virustotal", {})
+    sh = signals.get("shodan", {})
+    ab = signals.get("abuseipdb", {})
+    vt_bad = float(vt.get("malicious", 0))
+    vt_total = max(1.0, vt_bad + float(vt.get("harmless", 0)))
+    vt_score = vt_bad / vt_total
+    sh_score = max((p.port_penalties.get(port, 0.0) for port in sh.get("open_ports", [])), default=0.0)
+    sh_score += min(p.vuln_cap, p.vuln_step * float(sh.get("vuln_count", 0)))
+    ab_score = float(ab.get("confidence_score", 0)) / 100.0
+    pv, ps, pa = (float(_present(signals.get(k))) for k in PROVIDERS)
+    # Re-weight over the providers that answered, keeping the scale of a full read.
+    num = p.vt_weight * vt_score * pv + p.shodan_weight * sh_score * ps + p.abuse_weight * ab_score * pa
+    den = p.vt_weight * pv + p.shodan_weight * ps + p.abuse_weight * pa
+    risk = min(1.0, num * ((p.vt_weight + p.shodan_weight + p.abuse_weight) / den)) if den > 0 else p.degraded_risk()
+    decision = "deny" if risk >= p.deny_threshold else "flag" if risk >= p.flag_threshold else "allow"
+    reasons = {"vt": vt_score, "shodan": sh_score, "abuse": ab_score}
+    return risk, reasons, decision
+def columns(batch: list[dict]) -> SignalColumns:
+    n = len(batch)
+    vt = [s.get("virustotal", {}) for s in batch]
+    sh = [s.get("shodan", {}) for s in batch]
+    ports = [sh_i.get("open_ports", []) for sh_i in sh]
+    return SignalColumns(
+        vt_malicious=np.fromiter((float(v.get("malicious", 0)) for v in vt), float, n),
+        vt_harmless=np.fromiter((float(v.get("harmless", 0)) for v in vt), float, n),
+        vuln_count=np.fromiter((float(s.get("vuln_count", 0)) for s in sh), float, n),
+        abuse_confidence=np.fromiter((float(s.get("abuseipdb", {}).get("confidence_score", 0)) for s in batch), float, n),
+        port_rows=np.repeat(np.arange(n), [len(p) for p in ports]),
+        port_values=np.fromiter((port for p in ports for port in p), np.int64),
+        present=np.fromiter((_present(s.get(k)) for s in batch for k in PROVIDERS), float, 3 * n).reshape(n, 3),
+    )
+def score_batch(cols: SignalColumns, policy: Policy | None = None):
+    p = policy or current()
+    vt_score = cols.vt_malicious / np.maximum(1.0, cols.vt_malicious + cols.vt_harmless)
+    sh_score = np.zeros(len(cols.vt_malicious))
+    for port, penalty in p.port_penalties.items():
+        np.maximum.at(sh_score, cols.port_rows[cols.port_values == port], penalty)
+    sh_score += np.minimum(p.vuln_cap, p.vuln_step * cols.vuln_count)
+    ab_score = cols.abuse_confidence / 100.0
+    pv, ps, pa = (cols.present if cols.present is not None else np.ones((len(vt_score), 3))).T
+    num = p.vt_weight * vt_score * pv + p.shodan_weight * sh_score * ps + p.abuse_weight * ab_score * pa
+    den = p.vt_weight * pv + p.shodan_weight * ps + p.abuse_weight * pa
+    risk = np.minimum(1.0, num * np.divide(p.vt_weight + p.shodan_weight + p.abuse_weight, den, out=np.zeros_like(den), where=den > 0))
+    risk[den <= 0] = p.degraded_risk()
+    codes = (risk >= p.flag_threshold).astype(np.int8) + (risk >= p.deny_threshold)
+    reasons = {"vt": vt_score, "shodan": sh_score, "abuse": ab_score}
+    return risk, reasons, DECISIONS[codes]
+def decide(signals: dict, cached: bool = False) -> dict:
+    policy = current()
+    risk, reasons, decision = score(signals, policy)
+    return {"decision": decision, "risk_score": risk, "signals": {"reasons": reasons, **signals}, "cached": cached, "policy_version": policy.version, **_outcome(signals)}
+def decide_many(fetched: dict[str, tuple[dict, bool]]) -> dict[str, dict]:
+    policy = current()
+    batch = [signals for signals, _ in fetched.values()]
+    risk, reasons, decisions = score_batch(columns(batch), policy)
+    risk, decisions = risk.tolist(), decisions.tolist()
+    vt, sh, ab = reasons["vt"].tolist(), reasons["shodan"].tolist(), reasons["abuse"].tolist()
+    return {
+        ip: {"decision": decisions[i], "risk_score": risk[i], "signals": {"reasons": {"vt": vt[i], "shodan": sh[i], "abuse": ab[i]}, **signals}, "cached": not fresh, "policy_version": policy.version, **_outcome(signals)}
+        for i, (ip, (signals, fresh)) in enumerate(fetched.items())
+    }
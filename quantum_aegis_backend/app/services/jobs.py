@@ -0,0 +1,34 @@
+import asyncio
+from redis.exceptions import RedisError
+from rq import Queue
+from rq.exceptions import NoSuchJobError
+from rq.job import Job, JobStatus
+from app.config import settings
+from app.services import cache
+KINDS = {"enrich": "worker.jobs.enrich", "backfill": "worker.jobs.backfill_threat_checks", "rescan": "worker.jobs.rescan_stale"}
+def _queue() -> Queue:
+    from worker.worker import q
+    return q
+def _submit(kind: str, org_id: int, ips: list[str]) -> list[str]:
+    q = _queue()
+    batches = [ips[i:i + settings.job_batch_ips] for i in range(0, len(ips), settings.job_batch_ips)]
+    data = [Queue.prepare_data(KINDS[kind], (org_id, batch), timeout=settings.job_timeout_s, result_ttl=settings.job_result_ttl_s, meta={"org_id": org_id, "kind": kind, "total": len(batch), "done": 0}) for batch in batches]
+    return [job.id for job in q.enqueue_many(data)]
+async def submit(kind: str, org_id: int, ips: list[str]) -> list[str]:
+    return await asyncio.to_thread(_submit, kind, org_id, ips)
+async def rescan() -> str:
+    job = await asyncio.to_thread(_queue().enqueue, KINDS["rescan"], job_timeout=settings.job_timeout_s, result_ttl=settings.job_result_ttl_s, meta={"org_id": None, "kind": "rescan"})
+    return job.id
+async def enrich_later(org_id: int, ip: str) -> str | None:
+    if not await cache.claim(f"enrichjob:{org_id}:{ip}", settings.signal_refresh_lock_s): return None
+    try: return (await submit("enrich", org_id, [ip]))[0]
+    except RedisError: return None
+def _status(job_id: str) -> dict | None:
+    try: job = Job.fetch(job_id, connection=_queue().connection)
+    except NoSuchJobError: return None
+    status = JobStatus(job.get_status(refresh=False))
+    error = job.exc_info.strip().splitlines()[-1] if status == JobStatus.FAILED and job.exc_info else None
+    return {"id": job.id, "kind": job.meta.get("kind"), "org_id": job.meta.get("org_id"), "status": status.value, "done": job.meta.get("done"), "total": job.meta.get("total"),
+            "result": job.return_value() if status == JobStatus.FINISHED else None, "error": error, "enqueued_at": job.enqueued_at, "ended_at": job.ended_at}
+async def status(job_id: str) -> dict | None:
+    return await asyncio.to_thread(_status, job_id)
@@ -0,0 +1,73 @@
+import asyncio, base64, time
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import select
+from app.config import settings
+from app.database import SessionLocal
+from app.models import QuantumKey
+from app.services import cache, pqc
+_executor: ProcessPoolExecutor | None = None
+_active: tuple[int, str, str] | None = None
+_active_at = 0.0
+# Same ttl as _active so keys purged by the leader stop decapsulating here too.
+_keys = cache.LRU(settings.kem_keys_max, settings.kem_active_ttl_s)
+class UnknownKey(KeyError): pass
+def invalidate():
+    global _active
+    _active = None
+    _keys.clear()
+async def active_key() -> tuple[int, str, str]:
+    global _active, _active_at
+    # Rotation runs on the leader only; other processes pick the new key up within kem_active_ttl_s.
+    if _active is None or time.monotonic() - _active_at > settings.kem_active_ttl_s:
+        async with SessionLocal() as db:
+            qk = (await db.execute(select(QuantumKey).where(QuantumKey.retired_at.is_(None)).order_by(QuantumKey.rotated_at.desc()).limit(1))).scalar_one_or_none()
+        if qk is None: raise UnknownKey("no active key")
+        _active, _active_at = (qk.id, qk.alg, qk.pub), time.monotonic()
+    return _active
+async def _private(key_id: int) -> tuple[str, str, str]:
+    hit = _keys.get(key_id)
+    if hit is not None: return hit
+    async with SessionLocal() as db:
+        qk = await db.get(QuantumKey, key_id)
+    if qk is None: raise UnknownKey(key_id)
+    _keys.set(key_id, (qk.alg, qk.pub, qk.priv), settings.kem_active_ttl_s)
+    return qk.alg, qk.pub, qk.priv
+def alg_for(public_key: bytes) -> str:
+    if len(public_key) == pqc.X25519_LEN: return pqc.CLASSICAL
+    if len(public_key) == pqc.X25519_LEN + 1184: return pqc.HYBRID
+    raise ValueError("public key is neither X25519 nor X25519+ML-KEM-768")
+async def _run(fn, *args):
+    if _executor is None: return await asyncio.to_thread(fn, *args)
+    return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+def _chunks(n: int) -> list[int]:
+    parts = max(1, min(settings.kem_workers or 1, n // settings.kem_chunk_min or 1))
+    return [n // parts + (1 if i < n % parts else 0) for i in range(parts)]
+async def encapsulate(count: int, public_key: str | None = None) -> tuple[int | None, str, list[tuple[bytes, bytes]]]:
+    if public_key:
+        key_id, pub = None, public_key
+        alg = alg_for(base64.b64decode(pub))
+    else:
+        key_id, alg, pub = await active_key()
+    parts = await asyncio.gather(*(_run(pqc.encapsulate_many, key_id, alg, pub, n) for n in _chunks(count)))
+    return key_id, alg, [item for part in parts for item in part]
+async def decapsulate(items: list[tuple[int, bytes]]) -> list[bytes | None]:
+    by_key: dict[int, list[int]] = {}
+    for i, (key_id, _) in enumerate(items): by_key.setdefault(key_id, []).append(i)
+    out: list[bytes | None] = [None] * len(items)
+    jobs = []
+    for key_id, idx in by_key.items():
+        alg, pub, priv = await _private(key_id)
+        for n in _chunks(len(idx)):
+            chunk, idx = idx[:n], idx[n:]
+            jobs.append((chunk, _run(pqc.decapsulate_many, key_id, alg, pub, priv, [items[i][1] for i in chunk])))
+    for (chunk, _), secrets in zip(jobs, await asyncio.gather(*(job for _, job in jobs))):
+        for i, ss in zip(chunk, secrets): out[i] = ss
+    return out
+def start():
+    global _executor
+    if settings.kem_workers > 0: _executor = ProcessPoolExecutor(settings.kem_workers)
+async def stop():
+    global _executor
+    if _executor: _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    invalidate()
@@ -0,0 +1,93 @@
+import asyncio, logging, os, socket, uuid
+from redis.exceptions import RedisError, WatchError
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from app.config import settings
+from app.database import engine
+from app.services import cache, telemetry
+log = logging.getLogger(__name__)
+KEY = "leader:singletons"
+ADVISORY_LOCK = 0x51A6E15
+identity = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+_leader = False
+_services: tuple = ()
+_conn = None
+_task: asyncio.Task | None = None
+def is_leader() -> bool: return _leader
+async def _if_owner(op) -> bool:
+    async with cache.client().pipeline(transaction=True) as pipe:
+        try:
+            await pipe.watch(KEY)
+            if await pipe.get(KEY) != identity.encode(): return False
+            pipe.multi()
+            op(pipe)
+            await pipe.execute()
+            return True
+        except WatchError: return False
+async def _redis_hold() -> bool:
+    ttl_ms = int(settings.leader_ttl_s * 1000)
+    if _leader: return await _if_owner(lambda pipe: pipe.pexpire(KEY, ttl_ms))
+    return bool(await cache.client().set(KEY, identity, nx=True, px=ttl_ms))
+async def _pg_hold() -> bool:
+    global _conn
+    if _conn is not None:
+        await _conn.execute(text("SELECT 1"))
+        return True
+    conn = await engine.connect()
+    await conn.execution_options(isolation_level="AUTOCOMMIT")
+    if (await conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": ADVISORY_LOCK})).scalar():
+        _conn = conn
+        return True
+    await conn.close()
+    return False
+async def _release():
+    global _conn
+    try:
+        if settings.leader_election == "redis": await _if_owner(lambda pipe: pipe.delete(KEY))
+        elif _conn is not None: await _conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": ADVISORY_LOCK})
+    except (RedisError, DBAPIError, OSError): log.warning("leader release failed; the lock expires on its own")
+    if _conn is not None:
+        conn, _conn = _conn, None
+        try: await conn.close()
+        except (DBAPIError, OSError): pass
+async def _promote():
+    global _leader
+    _leader = True
+    log.info("%s is now leader", identity)
+    for svc in _services: await svc.start()
+async def _demote():
+    global _leader
+    _leader = False
+    log.info("%s stepped down", identity)
+    for svc in reversed(_services):
+        try: await svc.stop()
+        except Exception: log.exception("stopping %s failed", svc.__name__)
+async def elect():
+    try: held = await (_pg_hold() if settings.leader_election == "postgres" else _redis_hold())
+    except (RedisError, DBAPIError, OSError) as e:
+        # Without the store we cannot prove we still hold the lock, so step down and let the ttl hand it over.
+        log.warning("leader election unavailable: %s", e)
+        held = False
+        if _conn is not None: await _release()
+    if held and not _leader: await _promote()
+    elif _leader and not held: await _demote()
+async def _loop():
+    while True:
+        await asyncio.sleep(settings.leader_ttl_s / 3)
+        try: await elect()
+        except Exception: log.exception("leader election round failed")
+async def start(*services):
+    global _services, _task
+    _services = services
+    if settings.leader_election == "off": return await _promote()
+    await elect()
+    _task = asyncio.create_task(_loop())
+async def stop():
+    global _task
+    if _task:
+        _task.cancel()
+        _task = None
+    if _leader:
+        await _demote()
+        if settings.leader_election != "off": await _release()
+telemetry.Gauge("qa_leader", "1 while this process runs the singleton jobs (key rotation, log retention)", fn=lambda: {(): int(_leader)})
@@ -0,0 +1,128 @@
+import asyncio, json, logging, time
+from datetime import datetime, timezone
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.models import DecisionLog, ThreatCheck
+from app.services import rollups, telemetry
+log = logging.getLogger(__name__)
+COLUMNS = {
+    DecisionLog: ("org_id", "action", "ip", "risk_score", "reason", "created_at"),
+    ThreatCheck: ("org_id", "subject", "subject_type", "result", "malicious", "created_at"),
+}
+JSON_COLUMNS = {"reason", "result"}
+stats = {"queued": 0, "written": 0, "batches": 0, "dropped": 0, "duplicates": 0}
+_queue: asyncio.Queue | None = None
+_task: asyncio.Task | None = None
+def queue() -> asyncio.Queue:
+    global _queue
+    if _queue is None: _queue = asyncio.Queue(maxsize=settings.log_queue_max)
+    return _queue
+async def submit(model, row: dict):
+    await queue().put((model, row))
+    stats["queued"] += 1
+def decision_rows(org_id: int, decisions: dict[str, dict], threat_checks_only: bool = False) -> list[tuple]:
+    now = datetime.now(timezone.utc)
+    rows = []
+    for ip, resp in decisions.items():
+        signals = {k: v for k, v in resp["signals"].items() if k != "reasons"}
+        if not threat_checks_only:
+            rows.append((DecisionLog, {"org_id": org_id, "action": resp["decision"], "ip": ip, "risk_score": resp["risk_score"], "reason": {"ip": ip, "risk_score": resp["risk_score"], "policy_version": resp.get("policy_version"), "signals": signals}, "created_at": now, "reasons": resp["signals"].get("reasons")}))
+        rows.append((ThreatCheck, {"org_id": org_id, "subject": ip, "subject_type": "ip", "result": signals, "malicious": resp["decision"] == "deny", "created_at": now}))
+    return rows
+async def record_decisions(org_id: int, decisions: dict[str, dict]):
+    for model, row in decision_rows(org_id, decisions): await submit(model, row)
+def _insert(model, dialect: str):
+    # A repeated (org, subject, created_at) check must not sink the whole batch with it.
+    if model is ThreatCheck and dialect in ("postgresql", "sqlite"): return (postgresql.insert if dialect == "postgresql" else sqlite.insert)(model.__table__).on_conflict_do_nothing()
+    return insert(model)
+async def _insert_rows(db, model, rows: list[dict]):
+    res = await db.execute(_insert(model, db.bind.dialect.name), rows)
+    if model is ThreatCheck and res.rowcount >= 0: stats["duplicates"] += len(rows) - res.rowcount
+async def _copy(model, rows: list[dict]):
+    cols = COLUMNS[model]
+    records = [tuple(json.dumps(r[c]) if c in JSON_COLUMNS else r[c] for c in cols) for r in rows]
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        try: await raw.driver_connection.copy_records_to_table(model.__tablename__, records=records, columns=cols)
+        except Exception as e:
+            # COPY has no ON CONFLICT; it is all-or-nothing, so redo just this model with an insert that skips duplicates.
+            if model is not ThreatCheck or getattr(e, "sqlstate", None) != "23505": raise
+            async with SessionLocal() as db:
+                await _insert_rows(db, model, rows)
+                await db.commit()
+async def write(batch: list[tuple]):
+    with telemetry.stage("db_write"): await _write(batch)
+    stats["written"] += len(batch)
+    stats["batches"] += 1
+async def _write(batch: list[tuple]):
+    by_model: dict = {}
+    for model, row in batch: by_model.setdefault(model, []).append({c: row[c] for c in COLUMNS[model]})
+    decisions = [row for model, row in batch if model is DecisionLog]
+    if engine.dialect.name == "postgresql" and engine.dialect.driver == "asyncpg":
+        for model, rows in by_model.items(): await _copy(model, rows)
+        if decisions:
+            async with SessionLocal() as db:
+                await rollups.apply(db, decisions)
+                await db.commit()
+    else:
+        async with SessionLocal() as db:
+            for model, rows in by_model.items(): await _insert_rows(db, model, rows)
+            if decisions: await rollups.apply(db, decisions)
+            await db.commit()
+async def _write_with_retry(batch: list[tuple]):
+    for attempt in range(settings.log_write_retries + 1):
+        try: return await write(batch)
+        except Exception:
+            log.exception("decision log write failed (attempt %d, %d rows)", attempt + 1, len(batch))
+            await asyncio.sleep(min(5.0, 0.2 * 2 ** attempt))
+    stats["dropped"] += len(batch)
+    log.error("dropped %d decision log rows after %d attempts", len(batch), settings.log_write_retries + 1)
+async def _drain(q: asyncio.Queue, batch: list[tuple], deadline: float):
+    while len(batch) < settings.log_batch_size:
+        try: batch.append(q.get_nowait())
+        except asyncio.QueueEmpty:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0: return
+            try: batch.append(await asyncio.wait_for(q.get(), timeout))
+            except asyncio.TimeoutError: return
+async def _run():
+    q = queue()
+    while True:
+        batch = [await q.get()]
+        try: await _drain(q, batch, time.monotonic() + settings.log_flush_s)
+        except asyncio.CancelledError:
+            await _flush_rest(batch)
+            raise
+        await _write_with_retry(batch)
+        for _ in batch: q.task_done()
+async def _flush_rest(batch: list[tuple]):
+    q = queue()
+    while True:
+        try: batch.append(q.get_nowait())
+        except asyncio.QueueEmpty: break
+    for i in range(0, len(batch), settings.log_batch_size): await _write_with_retry(batch[i:i + settings.log_batch_size])
+def start():
+    global _task
+    _task = asyncio.create_task(_run())
+async def stop(timeout: float | None = None):
+    global _task, _queue
+    if _task:
+        # join() never returns once _run has died, so only wait on a live writer and only for so long.
+        if not _task.done():
+            try: await asyncio.wait_for(queue().join(), settings.graceful_timeout_s if timeout is None else timeout)
+            except asyncio.TimeoutError: log.warning("log writer did not drain within the timeout")
+        _task.cancel()
+        try: await _task
+        except asyncio.CancelledError: pass
+        except Exception: log.exception("log writer had died")
+        _task = None
+    if _queue is not None and _queue.qsize():
+        stats["dropped"] += _queue.qsize()
+        log.error("dropped %d unwritten decision log rows on shutdown", _queue.qsize())
+    _queue = None
+telemetry.Counter("qa_log_writer_rows_total", "Decision log rows by writer outcome", ("event",), fn=lambda: {k: stats[k] for k in ("queued", "written", "dropped", "duplicates")})
+telemetry.Gauge("qa_log_writer_queue_depth", "Decision log rows waiting to be written", fn=lambda: {(): queue().qsize()})
+def snapshot() -> dict:
+    return {**stats, "pending": queue().qsize()}
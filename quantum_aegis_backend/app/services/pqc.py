@@ -1,10 +1,66 @@
-﻿import base64
-from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey
+import base64, hashlib
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey, X25519PublicKey
 from cryptography.hazmat.primitives import serialization
+from kyber_py.ml_kem import ML_KEM_768
+from app.config import settings
+CLASSICAL = "X25519"
+HYBRID = "X25519+ML-KEM-768"
+X25519_LEN = 32
+COMBINER_LABEL = b"quantum-aegis/hybrid-kem/v1"
+def _raw_pub(pub) -> bytes: return pub.public_bytes(encoding=serialization.Encoding.Raw, format=serialization.PublicFormat.Raw)
+def _raw_priv(priv) -> bytes: return priv.private_bytes(encoding=serialization.Encoding.Raw, format=serialization.PrivateFormat.Raw, encryption_algorithm=serialization.NoEncryption())
 def generate_keypair():
-priv = X25519PrivateKey.generate()
-pub = priv.public_key()
-alg = "X25519"
-pub_bytes = pub.public_bytes(encoding=serialization.Encoding.Raw, format=serialization.PublicFormat.Raw)
-priv_bytes = priv.private_bytes(encoding=serialization.Encoding.Raw, format=serialization.PrivateFormat.Raw, encryption_algorithm=serialization.NoEncryption())
-return alg, base64.b64encode(pub_bytes).decode(), base64.b64encode(priv_bytes).decode()
+    priv = X25519PrivateKey.generate()
+    pub_bytes, priv_bytes = _raw_pub(priv.public_key()), _raw_priv(priv)
+    alg = CLASSICAL
+    if settings.pqc_enable:
+        ek, dk = ML_KEM_768.keygen()
+        alg, pub_bytes, priv_bytes = HYBRID, pub_bytes + ek, priv_bytes + dk
+    return alg, base64.b64encode(pub_bytes).decode(), base64.b64encode(priv_bytes).decode()
+class PublicKey:
+    def __init__(self, alg: str, pub: str):
+        raw = base64.b64decode(pub)
+        self.alg = alg
+        self.x_raw = raw[:X25519_LEN]
+        self.x = X25519PublicKey.from_public_bytes(self.x_raw)
+        self.ek = raw[X25519_LEN:] if alg == HYBRID else None
+class PrivateKey:
+    def __init__(self, alg: str, pub: str, priv: str):
+        raw = base64.b64decode(priv)
+        self.public = PublicKey(alg, pub)
+        self.x = X25519PrivateKey.from_private_bytes(raw[:X25519_LEN])
+        self.dk = raw[X25519_LEN:] if alg == HYBRID else None
+def _combine(ss_m: bytes, ss_x: bytes, ct_x: bytes, pk_x: bytes) -> bytes:
+    return hashlib.sha3_256(COMBINER_LABEL + ss_m + ss_x + ct_x + pk_x).digest()
+def encapsulate(pk: PublicKey) -> tuple[bytes, bytes]:
+    eph = X25519PrivateKey.generate()
+    ct_x = _raw_pub(eph.public_key())
+    ss_x = eph.exchange(pk.x)
+    ss_m, ct_m = ML_KEM_768.encaps(pk.ek) if pk.ek else (b"", b"")
+    return ct_x + ct_m, _combine(ss_m, ss_x, ct_x, pk.x_raw)
+def decapsulate(sk: PrivateKey, ct: bytes) -> bytes:
+    ct_x, ct_m = ct[:X25519_LEN], ct[X25519_LEN:]
+    if len(ct_x) != X25519_LEN or bool(ct_m) != bool(sk.dk): raise ValueError("ciphertext does not match key algorithm")
+    ss_x = sk.x.exchange(X25519PublicKey.from_public_bytes(ct_x))
+    ss_m = ML_KEM_768.decaps(sk.dk, ct_m) if sk.dk else b""
+    return _combine(ss_m, ss_x, ct_x, sk.public.x_raw)
+_public_cache: dict[int, PublicKey] = {}
+_private_cache: dict[int, PrivateKey] = {}
+KEY_CACHE_MAX = 16
+def _cached(cache: dict, key_id: int | None, build):
+    if key_id is None: return build()
+    key = cache.get(key_id)
+    if key is None:
+        if len(cache) >= KEY_CACHE_MAX: cache.clear()
+        key = cache[key_id] = build()
+    return key
+def encapsulate_many(key_id: int | None, alg: str, pub: str, count: int) -> list[tuple[bytes, bytes]]:
+    pk = _cached(_public_cache, key_id, lambda: PublicKey(alg, pub))
+    return [encapsulate(pk) for _ in range(count)]
+def decapsulate_many(key_id: int, alg: str, pub: str, priv: str, cts: list[bytes]) -> list[bytes | None]:
+    sk = _cached(_private_cache, key_id, lambda: PrivateKey(alg, pub, priv))
+    out = []
+    for ct in cts:
+        try: out.append(decapsulate(sk, ct))
+        except ValueError: out.append(None)
+    return out
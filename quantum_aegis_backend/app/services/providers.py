@@ -0,0 +1,148 @@
+import asyncio, time, httpx
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from app.config import settings
+from app.services import telemetry
+LIMITER_WAIT = telemetry.Histogram("qa_provider_limiter_wait_seconds", "Time spent queued on a provider rate limiter", ("provider",))
+class RateLimited(Exception): pass
+def retry_after(value: str | None, default: float = 1.0) -> float:
+    # Retry-After is either delay-seconds or an HTTP-date.
+    if not value: return default
+    try: return max(0.0, float(value))
+    except ValueError: pass
+    try: when = parsedate_to_datetime(value)
+    except (TypeError, ValueError): return default
+    if when.tzinfo is None: when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+# One provider lookup: the loop time it must finish by and how long it has queued on the limiter so far.
+class Call:
+    __slots__ = ("until", "queued")
+    def __init__(self, until: float):
+        self.until, self.queued = until, 0.0
+current_call: ContextVar[Call | None] = ContextVar("provider_call", default=None)
+class TokenBucket:
+    def __init__(self, rate_per_min: float, burst: int):
+        self.rate = rate_per_min / 60.0
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.resume_at = 0.0
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    def reserve(self, max_wait: float = float("inf")) -> float:
+        # A rate of 0 (like PLAN_LIMITS) means unlimited: only upstream Retry-After penalties apply.
+        if self.rate <= 0: wait = max(0.0, self.resume_at - time.monotonic())
+        else:
+            self._refill()
+            wait = max(0.0, (1 - self.tokens) / self.rate)
+        if wait > max_wait: raise RateLimited(f"next token in {wait:.1f}s")
+        if self.rate > 0: self.tokens -= 1
+        return wait
+    async def wait(self, seconds: float):
+        if seconds <= 0: return
+        try: await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            if self.rate > 0: self.tokens += 1
+            raise
+    async def acquire(self, max_wait: float = float("inf")) -> float:
+        # Tokens are reserved up front (tokens may go negative), so waiters queue in arrival order without a lock.
+        seconds = self.reserve(max_wait)
+        await self.wait(seconds)
+        return seconds
+    def penalize(self, seconds: float):
+        if self.rate <= 0:
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+            return
+        self._refill()
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+class CircuitBreaker:
+    def __init__(self, failures: int, cooldown_s: float):
+        self.failures = max(1, failures)
+        self.cooldown_s = cooldown_s
+        self.count = 0
+        self.opened_at: float | None = None
+        self.probing = False
+    @property
+    def state(self) -> str:
+        if self.opened_at is None: return "closed"
+        return "half_open" if self.probing or time.monotonic() - self.opened_at >= self.cooldown_s else "open"
+    def allow(self) -> bool:
+        if self.opened_at is None: return True
+        if self.probing or time.monotonic() - self.opened_at < self.cooldown_s: return False
+        self.probing = True
+        return True
+    def record(self, ok: bool):
+        self.probing = False
+        if ok:
+            self.count, self.opened_at = 0, None
+            return
+        self.count += 1
+        if self.count >= self.failures or self.opened_at is not None: self.opened_at = time.monotonic()
+    def release(self):
+        self.probing = False
+class Provider:
+    def __init__(self, name: str, base_url: str, api_key: str | None, rate_per_min: float, burst: int, headers: dict | None = None, params: dict | None = None):
+        self.name = name
+        self.limiter = limiter(name, api_key, rate_per_min, burst)
+        self.client = httpx.AsyncClient(
+            base_url=base_url, headers=headers, params=params, http2=True, timeout=settings.provider_timeout_s,
+            limits=httpx.Limits(max_connections=settings.provider_max_connections, max_keepalive_connections=settings.provider_max_connections, keepalive_expiry=settings.provider_keepalive_s),
+        )
+    async def get(self, path: str, **kw) -> httpx.Response:
+        call = current_call.get()
+        loop = asyncio.get_running_loop()
+        for _ in range(settings.provider_max_retries + 1):
+            wait = self.limiter.reserve(call.until - loop.time() if call else float("inf"))
+            if call: call.queued += wait
+            LIMITER_WAIT.observe(wait, self.name)
+            await self.limiter.wait(wait)
+            r = await self.client.get(path, **kw)
+            if r.status_code != 429: return r
+            telemetry.PROVIDER_CALLS.inc(self.name, "throttled")
+            self.limiter.penalize(retry_after(r.headers.get("retry-after")))
+        return r
+    async def aclose(self):
+        await self.client.aclose()
+NO_DATA = (400, 404, 422)
+def failure(name: str, r: httpx.Response) -> dict:
+    # "Never seen / not a routable IP" is an answer: no evidence, cached briefly like any other result.
+    if r.status_code in NO_DATA: return {"source": name, "status": r.status_code}
+    # Keep the upstream body out of logs and API responses; the status says enough.
+    return {"source": name, "error": f"upstream http {r.status_code}", "status": r.status_code}
+def upstream_fault(sig: dict) -> bool:
+    # Timeouts, transport errors (no status) and 5xx count against the breaker; a 4xx is the provider answering.
+    return "error" in sig and sig.get("status", 500) >= 500
+_buckets: dict[str, TokenBucket] = {}
+_breakers: dict[str, CircuitBreaker] = {}
+_providers: dict[str, Provider] = {}
+def limiter(name: str, api_key: str | None, rate_per_min: float, burst: int) -> TokenBucket:
+    k = f"{name}:{api_key}"
+    if k not in _buckets: _buckets[k] = TokenBucket(rate_per_min, burst)
+    return _buckets[k]
+def breaker(name: str) -> CircuitBreaker:
+    if name not in _breakers: _breakers[name] = CircuitBreaker(settings.breaker_failures, settings.breaker_cooldown_s)
+    return _breakers[name]
+def _build(name: str) -> Provider:
+    if name == "virustotal":
+        return Provider(name, settings.vt_base_url, settings.vt_api_key, settings.vt_rate_per_min, settings.vt_burst, headers={"x-apikey": settings.vt_api_key or ""})
+    if name == "shodan":
+        return Provider(name, settings.shodan_base_url, settings.shodan_api_key, settings.shodan_rate_per_min, settings.shodan_burst, params={"key": settings.shodan_api_key or ""})
+    if name == "abuseipdb":
+        return Provider(name, settings.abuse_base_url, settings.abuse_api_key, settings.abuse_rate_per_min, settings.abuse_burst, headers={"Key": settings.abuse_api_key or "", "Accept": "application/json"})
+    raise KeyError(name)
+def get(name: str) -> Provider:
+    if name not in _providers: _providers[name] = _build(name)
+    return _providers[name]
+async def startup():
+    for name in ("virustotal", "shodan", "abuseipdb"): get(name)
+async def shutdown():
+    providers = list(_providers.values())
+    _providers.clear()
+    _buckets.clear()
+    _breakers.clear()
+    for p in providers: await p.aclose()
+STATES = {"closed": 0, "half_open": 1, "open": 2}
+telemetry.Gauge("qa_provider_circuit_state", "Provider circuit breaker state (0 closed, 1 half-open, 2 open)", ("provider",), fn=lambda: {(n,): STATES[b.state] for n, b in _breakers.items()})
@@ -0,0 +1,104 @@
+import asyncio, ipaddress, logging, time
+from bisect import bisect_right
+from typing import NamedTuple
+from sqlalchemy import select
+from app.config import settings
+from app.database import SessionLocal
+from app.models import ReputationRule
+log = logging.getLogger(__name__)
+PRIVATE_RANGES = ("10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16", "127.0.0.0/8", "169.254.0.0/16", "100.64.0.0/10", "::1/128", "fc00::/7", "fe80::/10")
+class Match(NamedTuple):
+    action: str
+    cidr: str
+    source: str
+class _Table:
+    def __init__(self, segments: list[tuple[int, int, Match]]):
+        self.starts = [s for s, _, _ in segments]
+        self.ends = [e for _, e, _ in segments]
+        self.matches = [m for _, _, m in segments]
+    def lookup(self, x: int) -> Match | None:
+        i = bisect_right(self.starts, x) - 1
+        if i >= 0 and x <= self.ends[i]: return self.matches[i]
+        return None
+def _flatten(rules: list[tuple[int, int, Match]]) -> list[tuple[int, int, Match]]:
+    rules = sorted(rules, key=lambda r: (r[0], -r[1], r[2].action == "allow"))
+    out, stack, cursor = [], [], 0
+    def emit(lo: int, hi: int, rule):
+        if lo <= hi: out.append((lo, hi, rule[2]))
+    for r in rules:
+        while stack and stack[-1][1] < r[0]:
+            top = stack.pop()
+            emit(cursor, top[1], top)
+            cursor = top[1] + 1
+        if stack: emit(cursor, r[0] - 1, stack[-1])
+        stack.append(r)
+        cursor = r[0]
+    while stack:
+        top = stack.pop()
+        emit(cursor, top[1], top)
+        cursor = top[1] + 1
+    return out
+class Index:
+    def __init__(self, entries: list[tuple[str, str, str]]):
+        rules = {4: [], 6: []}
+        for cidr, action, source in entries:
+            net = ipaddress.ip_network(cidr, strict=False)
+            rules[net.version].append((int(net.network_address), int(net.broadcast_address), Match(action, str(net), source)))
+        self.size = len(rules[4]) + len(rules[6])
+        self.v4 = _Table(_flatten(rules[4]))
+        self.v6 = _Table(_flatten(rules[6]))
+        self.loaded_at = time.time()
+    def lookup(self, ip: str) -> Match | None:
+        addr = ipaddress.ip_address(ip)
+        if addr.version == 6 and addr.ipv4_mapped: addr = addr.ipv4_mapped
+        return (self.v4 if addr.version == 4 else self.v6).lookup(int(addr))
+_index = Index([])
+_task: asyncio.Task | None = None
+def lookup(ip: str) -> Match | None:
+    return _index.lookup(ip)
+def current() -> Index: return _index
+def read_file(path: str, action: str) -> list[tuple[str, str, str]]:
+    entries = []
+    with open(path) as f:
+        for line in f:
+            cidr = line.split("#", 1)[0].strip()
+            if not cidr: continue
+            try: ipaddress.ip_network(cidr, strict=False)
+            except ValueError:
+                log.warning("skipping invalid %s entry %r in %s", action, cidr, path)
+                continue
+            entries.append((cidr, action, f"file:{path}"))
+    return entries
+def _paths(value: str | None) -> list[str]:
+    return [p.strip() for p in (value or "").split(",") if p.strip()]
+def _static_entries() -> list[tuple[str, str, str]]:
+    entries = []
+    if settings.reputation_allow_private: entries += [(c, "allow", "private") for c in PRIVATE_RANGES]
+    entries += [(c, "allow", "egress") for c in _paths(settings.reputation_egress_cidrs)]
+    for path in _paths(settings.reputation_allowlist_paths): entries += read_file(path, "allow")
+    for path in _paths(settings.reputation_blocklist_paths): entries += read_file(path, "deny")
+    return entries
+async def build() -> Index:
+    entries = await asyncio.to_thread(_static_entries)
+    async with SessionLocal() as db:
+        res = await db.execute(select(ReputationRule.cidr, ReputationRule.action, ReputationRule.source))
+        entries += [(cidr, action, f"db:{source}") for cidr, action, source in res.all()]
+    return await asyncio.to_thread(Index, entries)
+async def reload() -> Index:
+    global _index
+    _index = await build()
+    return _index
+async def _loop():
+    while True:
+        await asyncio.sleep(settings.reputation_reload_s)
+        try: await reload()
+        except Exception: log.exception("reputation reload failed; keeping %d rules", _index.size)
+async def start():
+    global _task
+    await reload()
+    _task = asyncio.create_task(_loop())
+async def stop():
+    global _task
+    if _task:
+        _task.cancel()
+        _task = None
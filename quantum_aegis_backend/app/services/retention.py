@@ -0,0 +1,90 @@
+import asyncio, logging
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, select, text
+from sqlalchemy.exc import DBAPIError
+from app.config import settings
+from app.database import engine
+from app.models import DecisionLog, ThreatCheck
+from app.services import rollups, telemetry
+log = logging.getLogger(__name__)
+TABLES = (DecisionLog, ThreatCheck)
+PRUNED = telemetry.Counter("qa_log_retention_total", "Log retention work: partitions dropped and rows deleted", ("table", "action"))
+_task: asyncio.Task | None = None
+def _day(dt: datetime) -> datetime:
+    return dt.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+def partition_name(table: str, day: datetime) -> str: return f"{table}_p{day:%Y%m%d}"
+async def partitions(conn, table: str) -> list[str] | None:
+    if conn.dialect.name != "postgresql": return None
+    parent = (await conn.execute(text("SELECT c.oid FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :t"), {"t": table})).scalar_one_or_none()
+    if parent is None: return None
+    return list((await conn.execute(text("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = :p"), {"p": parent})).scalars())
+async def ensure_partitions(conn, table: str, existing: list[str], now: datetime) -> list[str]:
+    created = []
+    for i in range(settings.log_partitions_ahead + 1):
+        day = _day(now) + timedelta(days=i)
+        name = partition_name(table, day)
+        if name in existing: continue
+        try:
+            async with conn.begin_nested():
+                await conn.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"))
+        except DBAPIError as e:
+            # Overlaps the legacy partition on migration day, or rows for that day already sit in the default partition.
+            log.warning("skipping partition %s: %s", name, e.orig)
+            continue
+        created.append(name)
+    return created
+async def drop_expired(conn, table: str, existing: list[str], cutoff: datetime) -> list[str]:
+    dropped = []
+    for name in existing:
+        if name.startswith(f"{table}_p"):
+            expired = datetime.strptime(name.rsplit("_p", 1)[1], "%Y%m%d").replace(tzinfo=timezone.utc) + timedelta(days=1) <= cutoff
+        elif name == f"{table}_legacy":
+            newest = (await conn.execute(text(f"SELECT max(created_at) FROM {name}"))).scalar_one_or_none()
+            expired = newest is None or newest < cutoff
+        else: continue
+        if expired:
+            await conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+async def prune(model, cutoff: datetime) -> int:
+    total = 0
+    while True:
+        async with engine.begin() as conn:
+            ids = select(model.id).where(model.created_at < cutoff).order_by(model.id).limit(settings.log_prune_batch).scalar_subquery()
+            n = (await conn.execute(delete(model).where(model.id.in_(ids)))).rowcount
+        total += n
+        if n < settings.log_prune_batch: return total
+        await asyncio.sleep(0)
+async def run_once(now: datetime | None = None) -> dict:
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=settings.log_retention_days) if settings.log_retention_days > 0 else None
+    summary = {}
+    for model in TABLES:
+        table = model.__tablename__
+        out = summary[table] = {"created": [], "dropped": [], "deleted": 0}
+        async with engine.begin() as conn:
+            existing = await partitions(conn, table)
+            if existing is not None:
+                out["created"] = await ensure_partitions(conn, table, existing, now)
+                if cutoff: out["dropped"] = await drop_expired(conn, table, existing, cutoff)
+        if out["dropped"]: PRUNED.inc(table, "partitions_dropped", n=len(out["dropped"]))
+        if cutoff:
+            out["deleted"] = await prune(model, cutoff)
+            PRUNED.inc(table, "rows_deleted", n=out["deleted"])
+    async with engine.begin() as conn: n = (await conn.execute(rollups.expired(now.timestamp()))).rowcount
+    summary["decision_rollups"] = {"deleted": n}
+    PRUNED.inc("decision_rollups", "rows_deleted", n=n)
+    return summary
+async def _loop():
+    while True:
+        try: log.info("log maintenance: %s", await run_once())
+        except Exception: log.exception("log maintenance failed")
+        await asyncio.sleep(settings.log_maintenance_s)
+async def start():
+    global _task
+    _task = asyncio.create_task(_loop())
+async def stop():
+    global _task
+    if _task:
+        _task.cancel()
+        _task = None
@@ -0,0 +1,69 @@
+import time
+from collections import defaultdict
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from app.config import settings
+from app.models import DecisionRollup
+from app.services import cache
+GRANULARITY = {"minute": 60, "hour": 3600}
+PROVIDERS = ("vt", "shodan", "abuse")
+_memo = cache.LRU(1024, settings.dashboard_cache_s)
+def aggregate(rows: list[dict]) -> list[dict]:
+    acc: defaultdict[tuple, float] = defaultdict(float)
+    for r in rows:
+        org, ts = r["org_id"], r["created_at"].timestamp()
+        minute, hour = int(ts // 60 * 60), int(ts // 3600 * 3600)
+        acc[(org, "minute", "action", minute, r["action"])] += 1
+        acc[(org, "hour", "action", hour, r["action"])] += 1
+        if r["action"] == "deny": acc[(org, "hour", "deny_ip", hour, r["ip"])] += 1
+        if r.get("reasons"):
+            acc[(org, "hour", "provider", hour, "n")] += 1
+            for k in PROVIDERS: acc[(org, "hour", "provider", hour, k)] += float(r["reasons"].get(k, 0.0))
+    # Sorted so concurrent writers take row locks in the same order.
+    return [{"org_id": k[0], "granularity": k[1], "dimension": k[2], "bucket_start": k[3], "key": k[4], "value": v} for k, v in sorted(acc.items())]
+def upsert(rows: list[dict], dialect: str):
+    stmt = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(DecisionRollup).values(rows)
+    return stmt.on_conflict_do_update(index_elements=["org_id", "granularity", "dimension", "bucket_start", "key"], set_={"value": DecisionRollup.value + stmt.excluded.value})
+async def apply(db, decision_rows: list[dict]):
+    rows = aggregate(decision_rows)
+    for i in range(0, len(rows), 1000): await db.execute(upsert(rows[i:i + 1000], db.bind.dialect.name))
+def expired(now: float | None = None):
+    now = time.time() if now is None else now
+    hour_cutoff = now - settings.log_retention_days * 86400 if settings.log_retention_days > 0 else None
+    minute = (DecisionRollup.granularity == "minute") & (DecisionRollup.bucket_start < now - settings.rollup_minute_retention_s)
+    return delete(DecisionRollup).where(minute | ((DecisionRollup.granularity == "hour") & (DecisionRollup.bucket_start < hour_cutoff)) if hour_cutoff else minute)
+def _bucket(ts: float, granularity: str) -> int:
+    size = GRANULARITY[granularity]
+    return int(ts // size * size)
+async def _memoized(key: tuple, load):
+    hit = _memo.get(key)
+    if hit is not None: return hit
+    val = await load()
+    _memo.set(key, val, settings.dashboard_cache_s)
+    return val
+def _range(org_id: int, granularity: str, dimension: str, since: float, until: float):
+    return (DecisionRollup.org_id == org_id, DecisionRollup.granularity == granularity, DecisionRollup.dimension == dimension,
+            DecisionRollup.bucket_start >= _bucket(since, granularity), DecisionRollup.bucket_start <= _bucket(until, granularity))
+async def timeline(db, org_id: int, granularity: str, since: float, until: float) -> list[dict]:
+    async def load():
+        res = await db.execute(select(DecisionRollup.bucket_start, DecisionRollup.key, DecisionRollup.value).where(*_range(org_id, granularity, "action", since, until)).order_by(DecisionRollup.bucket_start))
+        buckets: dict[int, dict] = {}
+        for start, action, n in res.all(): buckets.setdefault(start, {"bucket_start": start, "allow": 0, "flag": 0, "deny": 0})[action] = int(n)
+        return list(buckets.values())
+    return await _memoized(("timeline", org_id, granularity, _bucket(since, granularity), _bucket(until, granularity)), load)
+async def top_denied(db, org_id: int, since: float, until: float, limit: int) -> list[dict]:
+    async def load():
+        total = func.sum(DecisionRollup.value).label("n")
+        res = await db.execute(select(DecisionRollup.key, total).where(*_range(org_id, "hour", "deny_ip", since, until)).group_by(DecisionRollup.key).order_by(total.desc(), DecisionRollup.key).limit(limit))
+        return [{"ip": ip, "count": int(n)} for ip, n in res.all()]
+    return await _memoized(("top_denied", org_id, _bucket(since, "hour"), _bucket(until, "hour"), limit), load)
+async def providers(db, org_id: int, since: float, until: float, weights: dict[str, float]) -> dict:
+    async def load():
+        res = await db.execute(select(DecisionRollup.key, func.sum(DecisionRollup.value)).where(*_range(org_id, "hour", "provider", since, until)).group_by(DecisionRollup.key))
+        sums = dict(res.all())
+        n = int(sums.get("n", 0))
+        mean = {k: sums.get(k, 0.0) / n if n else 0.0 for k in PROVIDERS}
+        weighted = {k: weights[k] * mean[k] for k in PROVIDERS}
+        total = sum(weighted.values())
+        return {"decisions": n, "mean_score": mean, "share": {k: v / total if total else 0.0 for k, v in weighted.items()}}
+    return await _memoized(("providers", org_id, _bucket(since, "hour"), _bucket(until, "hour"), tuple(weights.items())), load)
@@ -0,0 +1,151 @@
+import asyncio, time
+import httpx
+from redis.exceptions import RedisError
+from app.config import settings
+from app.schemas import PROVIDER_SIGNALS
+from app.services import cache, intel_vt, intel_shodan, intel_abuse, providers, telemetry
+REPORTS = {"virustotal": intel_vt.ip_report, "shodan": intel_shodan.ip_report, "abuseipdb": intel_abuse.ip_report}
+_pending: set[tuple[str, str]] = set()
+_tasks: set[asyncio.Task] = set()
+def soft_ttl(provider: str) -> float:
+    return {"virustotal": settings.vt_signal_ttl_s, "shodan": settings.shodan_signal_ttl_s, "abuseipdb": settings.abuse_signal_ttl_s}[provider]
+def hard_ttl(provider: str) -> int:
+    return int(soft_ttl(provider) * settings.signal_stale_factor)
+def ttl(provider: str, sig: dict) -> int:
+    return min(settings.negative_ttl_s, hard_ttl(provider)) if "status" in sig else hard_ttl(provider)
+def key(provider: str, ip: str) -> str: return f"sig:{provider}:{ip}"
+def failed(provider: str, reason: str) -> dict: return {"source": provider, "error": reason}
+def compact(provider: str, sig: dict) -> dict:
+    # Stored, scored, logged and served as-is, so trim provider payloads to the schema once here.
+    return PROVIDER_SIGNALS[provider].model_validate(sig).model_dump(exclude_none=True)
+async def _hedged(provider: str, ip: str) -> dict:
+    first = asyncio.create_task(REPORTS[provider](ip))
+    tasks = {first}
+    try:
+        if settings.provider_hedge_after_s <= 0: return await first
+        done, _ = await asyncio.wait(tasks, timeout=settings.provider_hedge_after_s)
+        if not done:
+            telemetry.PROVIDER_CALLS.inc(provider, "hedged")
+            tasks.add(asyncio.create_task(REPORTS[provider](ip)))
+        pending = tasks
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if not pending or (t.exception() is None and "error" not in t.result()): return t.result()
+    finally:
+        for t in tasks: t.cancel()
+async def _bounded(coro, call: providers.Call, deadline: float):
+    # The provider deadline covers upstream time only; time queued on our own limiter extends it (up to the request deadline).
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            left = t0 + min(deadline, settings.provider_deadline_s + call.queued) - loop.time()
+            if left <= 0: raise asyncio.TimeoutError
+            done, _ = await asyncio.wait({task}, timeout=left)
+            if done: return task.result()
+    finally: task.cancel()
+async def _report(provider: str, ip: str, deadline: float) -> dict:
+    breaker = providers.breaker(provider)
+    if deadline <= 0:
+        telemetry.PROVIDER_CALLS.inc(provider, "skipped")
+        return failed(provider, "request deadline exceeded")
+    if not breaker.allow():
+        telemetry.PROVIDER_CALLS.inc(provider, "short_circuit")
+        return failed(provider, "circuit open")
+    t0 = time.perf_counter()
+    call = providers.Call(asyncio.get_running_loop().time() + deadline)
+    token = providers.current_call.set(call)
+    try: sig = await _bounded(_hedged(provider, ip), call, deadline)
+    except providers.RateLimited:
+        # Our own limiter, not the provider: queueing past the request deadline says nothing about its health.
+        telemetry.PROVIDER_CALLS.inc(provider, "rate_limited")
+        breaker.release()
+        return failed(provider, "rate limited locally")
+    except (asyncio.TimeoutError, httpx.TimeoutException):
+        telemetry.PROVIDER_CALLS.inc(provider, "timeout")
+        sig = failed(provider, "timeout")
+    except Exception as e:
+        telemetry.PROVIDER_CALLS.inc(provider, "exception")
+        sig = failed(provider, f"{type(e).__name__}: {e}")
+    except BaseException:
+        breaker.release()
+        raise
+    else: telemetry.PROVIDER_CALLS.inc(provider, "error" if "error" in sig else "ok")
+    finally:
+        providers.current_call.reset(token)
+        telemetry.PROVIDER_SECONDS.observe(time.perf_counter() - t0, provider)
+    breaker.record(not providers.upstream_fault(sig))
+    return sig
+async def _load(provider: str, ip: str, deadline: float = float("inf")):
+    sig = await _report(provider, ip, deadline)
+    if "error" not in sig:
+        sig = compact(provider, sig)
+        await cache.setex(key(provider, ip), {"v": sig, "at": time.time()}, ttl(provider, sig))
+    return sig, True
+async def refresh(provider: str, ip: str) -> dict:
+    try: return (await _load(provider, ip))[0]
+    finally: _pending.discard((provider, ip))
+def _spawn(coro):
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+async def _enqueue_refresh(stale: list[tuple[str, str]]):
+    from worker.worker import q
+    for provider, ip in stale:
+        if not await cache.claim(f"sigrefresh:{provider}:{ip}", settings.signal_refresh_lock_s):
+            _pending.discard((provider, ip))
+            continue
+        try:
+            await asyncio.to_thread(q.enqueue, "worker.jobs.refresh_signal", provider, ip)
+            _pending.discard((provider, ip))
+        except RedisError:
+            _spawn(refresh(provider, ip))
+def _schedule_refresh(stale: list[tuple[str, str]]):
+    stale = [s for s in stale if s not in _pending]
+    if not stale: return
+    _pending.update(stale)
+    _spawn(_enqueue_refresh(stale))
+async def _lookup(ips: list[str]) -> tuple[dict, list[tuple[str, str]]]:
+    pairs = [(provider, ip) for ip in ips for provider in REPORTS]
+    found, missing, stale = {}, [], []
+    now = time.time()
+    with telemetry.stage("cache_lookup"): entries = await cache.mget([key(p, ip) for p, ip in pairs])
+    for (provider, ip), entry in zip(pairs, entries):
+        if entry is None:
+            missing.append((provider, ip))
+            continue
+        found[(provider, ip)] = entry["v"]
+        if now - entry["at"] > soft_ttl(provider): stale.append((provider, ip))
+    if stale: _schedule_refresh(stale)
+    return found, missing
+async def peek_many(ips: list[str]) -> dict[str, tuple[dict, list[str]]]:
+    found, missing = await _lookup(ips)
+    out = {ip: ({}, []) for ip in ips}
+    for (provider, ip), sig in found.items(): out[ip][0][provider] = sig
+    for provider, ip in missing: out[ip][1].append(provider)
+    return out
+async def fetch_many(ips: list[str], concurrency: int, budget_s: float | None = None) -> dict[str, tuple[dict, bool]]:
+    found, missing = await _lookup(ips)
+    sem = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    until = loop.time() + (settings.request_deadline_s if budget_s is None else budget_s)
+    async def load(provider: str, ip: str):
+        async with sem:
+            return await cache.coalesce(key(provider, ip), lambda: _load(provider, ip, until - loop.time()))
+    fresh = set()
+    with telemetry.stage("providers"): loaded = await asyncio.gather(*(load(p, ip) for p, ip in missing)) if missing else []
+    for (provider, ip), (sig, is_fresh) in zip(missing, loaded):
+        found[(provider, ip)] = sig
+        if is_fresh: fresh.add(ip)
+    return {ip: ({p: found[(p, ip)] for p in REPORTS}, ip in fresh) for ip in ips}
+async def warm(ips: list[str]) -> int:
+    entries = await cache.mget([key(p, ip) for ip in ips for p in REPORTS])
+    return sum(e is not None for e in entries)
+async def drain(timeout: float):
+    if not _tasks: return
+    _, pending = await asyncio.wait(set(_tasks), timeout=timeout)
+    for task in pending: task.cancel()
+async def fetch(ip: str) -> tuple[dict, bool]:
+    return (await fetch_many([ip], len(REPORTS)))[ip]
@@ -0,0 +1,116 @@
+import sys, threading, time
+from bisect import bisect_left
+from collections import Counter as Tally
+from contextlib import contextmanager
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_registry: list = []
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in zip(names, values)]
+    if extra: parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+class Metric:
+    kind = "untyped"
+    def __init__(self, name: str, help: str, labels: tuple = (), fn=None):
+        self.name, self.help, self.labels, self.fn = name, help, labels, fn
+        self.series: dict[tuple, float] = {}
+        _registry.append(self)
+    def samples(self):
+        series = self.series
+        if self.fn: series = {k if isinstance(k, tuple) else (k,): v for k, v in self.fn().items()}
+        for values, v in series.items(): yield self.name, _labels(self.labels, values), v
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{labels} {value}" for name, labels, value in self.samples()]
+        return "\n".join(lines)
+class Counter(Metric):
+    kind = "counter"
+    def inc(self, *labels, n: float = 1):
+        self.series[labels] = self.series.get(labels, 0) + n
+class Gauge(Metric):
+    kind = "gauge"
+    def set(self, value: float, *labels): self.series[labels] = value
+    def inc(self, *labels, n: float = 1): self.series[labels] = self.series.get(labels, 0) + n
+    def dec(self, *labels, n: float = 1): self.inc(*labels, n=-n)
+class Histogram(Metric):
+    kind = "histogram"
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+    def observe(self, value: float, *labels):
+        s = self.series.get(labels)
+        if s is None: s = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        s[0][bisect_left(self.buckets, value)] += 1
+        s[1] += value
+        s[2] += 1
+    def samples(self):
+        for values, (counts, total, n) in self.series.items():
+            acc = 0
+            for bound, c in zip((*self.buckets, "+Inf"), counts):
+                acc += c
+                yield f"{self.name}_bucket", _labels(self.labels, values, f'le="{bound}"'), acc
+            yield f"{self.name}_sum", _labels(self.labels, values), total
+            yield f"{self.name}_count", _labels(self.labels, values), n
+def render() -> str:
+    return "\n".join(m.render() for m in _registry) + "\n"
+REQUEST_SECONDS = Histogram("qa_http_request_seconds", "HTTP request latency", ("route", "method", "status"))
+IN_FLIGHT = Gauge("qa_http_requests_in_flight", "HTTP requests currently being served")
+STAGE_SECONDS = Histogram("qa_stage_seconds", "Time spent per ip_check pipeline stage", ("stage",))
+PROVIDER_SECONDS = Histogram("qa_provider_seconds", "Intel provider call latency", ("provider",))
+PROVIDER_CALLS = Counter("qa_provider_calls_total", "Intel provider calls by outcome", ("provider", "outcome"))
+@contextmanager
+def stage(name: str):
+    t0 = time.perf_counter()
+    try: yield
+    finally: STAGE_SECONDS.observe(time.perf_counter() - t0, name)
+class InstrumentMiddleware:
+    def __init__(self, app):
+        self.app = app
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http": return await self.app(scope, receive, send)
+        t0, status = time.perf_counter(), 500
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start": status = message["status"]
+            await send(message)
+        IN_FLIGHT.inc()
+        try: await self.app(scope, receive, send_status)
+        finally:
+            IN_FLIGHT.dec()
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(time.perf_counter() - t0, getattr(route, "path", "unmatched"), scope["method"], status)
+class SamplingProfiler:
+    def __init__(self, hz: float, max_stacks: int = 5000):
+        self.interval = 1.0 / hz
+        self.max_stacks = max_stacks
+        self.stacks: Tally = Tally()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._target: int | None = None
+    def start(self, thread_id: int | None = None):
+        self._target = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="qa-profiler", daemon=True)
+        self._thread.start()
+    def stop(self):
+        self._stop.set()
+        if self._thread: self._thread.join(1.0)
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None: continue
+            stack = []
+            while frame is not None:
+                stack.append(f"{frame.f_code.co_filename.rsplit('/', 1)[-1]}:{frame.f_code.co_name}")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            if key in self.stacks or len(self.stacks) < self.max_stacks: self.stacks[key] += 1
+            self.samples += 1
+    def collapsed(self, top: int = 200) -> str:
+        return "\n".join(f"{stack} {n}" for stack, n in self.stacks.most_common(top)) + "\n"
+    def reset(self):
+        self.stacks.clear()
+        self.samples = 0
+profiler: SamplingProfiler | None = None
@@ -0,0 +1,22 @@
+import logging, time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select
+from app.config import settings
+from app.database import SessionLocal
+from app.models import DecisionLog
+from app.services import auth, kem, signals
+log = logging.getLogger(__name__)
+async def recent_ips(limit: int, window_s: int) -> list[str]:
+    since = datetime.now(timezone.utc) - timedelta(seconds=window_s)
+    async with SessionLocal() as db:
+        q = select(DecisionLog.ip).where(DecisionLog.created_at >= since, DecisionLog.ip.is_not(None)).group_by(DecisionLog.ip).order_by(func.max(DecisionLog.created_at).desc()).limit(limit)
+        return list((await db.execute(q)).scalars())
+async def run() -> dict:
+    t0 = time.perf_counter()
+    out = {"api_keys": await auth.warm(settings.auth_cache_max), "signals": 0}
+    if settings.warm_ips > 0: out["signals"] = await signals.warm(await recent_ips(settings.warm_ips, settings.warm_window_s))
+    try: await kem.active_key()
+    except kem.UnknownKey: pass
+    out["seconds"] = round(time.perf_counter() - t0, 3)
+    log.info("warmed local caches: %s", out)
+    return out
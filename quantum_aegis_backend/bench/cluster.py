@@ -0,0 +1,75 @@
+import argparse, asyncio, json, os, platform, signal, sqlite3, subprocess, sys, tempfile, threading, time
+from datetime import datetime, timezone
+import fakeredis, httpx
+from bench.load import ROOT, drive, free_port, git_rev, ip_pool, ip_stream
+def shared_redis(real: bool) -> str:
+    if real: return os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+    server = fakeredis.TcpFakeServer(("127.0.0.1", 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{server.server_address[1]}/0"
+async def wait_workers(url: str, n: int, timeout: float) -> tuple[float, dict[int, bool]]:
+    seen: dict[int, bool] = {}
+    first = None
+    deadline = time.monotonic() + timeout
+    # No keep-alive, so every probe is a new accept and can land on any worker.
+    async with httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=0)) as client:
+        while time.monotonic() < deadline:
+            try:
+                body = (await client.get(url)).json()
+                seen[body["pid"]] = body["leader"]
+                if first is None: first = time.monotonic()
+                if len(seen) >= n: return first, seen
+            except (httpx.HTTPError, ValueError, KeyError): await asyncio.sleep(0.05)
+    raise RuntimeError(f"only {len(seen)}/{n} workers answered {url}")
+async def run_one(args, workers: int, redis_url: str) -> dict:
+    workdir = tempfile.mkdtemp(prefix="qa-cluster-")
+    port = free_port()
+    env = {**os.environ, "DATABASE_URL": f"sqlite+aiosqlite:///{workdir}/cluster.db", "REDIS_URL": redis_url, "AUTH_REQUIRED": "false", "LEADER_ELECTION": "redis"}
+    t0 = time.monotonic()
+    proc = subprocess.Popen([sys.executable, "-m", "app", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--graceful-timeout", str(args.graceful_timeout), "--log-level", "warning"], cwd=ROOT, env=env)
+    try:
+        first, pids = await wait_workers(f"http://127.0.0.1:{port}/healthz", workers, args.startup_timeout)
+        all_ready = time.monotonic()
+        await asyncio.sleep(1.0)
+        _, pids = await wait_workers(f"http://127.0.0.1:{port}/healthz", workers, args.startup_timeout)
+        bodies = [{"ip": ip} for ip in ip_stream("hot", args.requests, ip_pool(args.pool_size, args.seed), args.seed)]
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            if args.warmup: await drive(client, "warmup", "POST", "/intel/ip-check", bodies[:args.warmup], args.concurrency, args.warmup)
+            load = await drive(client, f"ip-check/{workers}w", "POST", "/intel/ip-check", bodies, args.concurrency, args.requests)
+    finally:
+        t_stop = time.monotonic()
+        proc.send_signal(signal.SIGTERM)
+        code = proc.wait(args.graceful_timeout + 30)
+    with sqlite3.connect(f"{workdir}/cluster.db") as db: logged = db.execute("SELECT count(*) FROM decision_logs").fetchone()[0]
+    cores = min(workers, os.cpu_count() or 1)
+    return {
+        "workers": workers, "first_ready_s": round(first - t0, 3), "all_ready_s": round(all_ready - t0, 3), "leaders": sum(pids.values()),
+        "rps": load["rps"], "rps_per_core": round(load["rps"] / cores, 1), "p50_ms": load["p50_ms"], "p99_ms": load["p99_ms"], "errors": load["errors"],
+        "shutdown_s": round(time.monotonic() - t_stop, 3), "exit_code": code, "decision_logs": logged,
+    }
+async def run(args) -> dict:
+    redis_url = shared_redis(args.real_redis)
+    results = [await run_one(args, n, redis_url) for n in args.workers]
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    return {"meta": {"timestamp": datetime.now(timezone.utc).isoformat(), "git_rev": git_rev(), "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(), "config": config}, "results": results}
+def main():
+    parser = argparse.ArgumentParser(description="Startup time, leader election and per-core throughput of python -m app with N workers")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--pool-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--graceful-timeout", type=float, default=30.0)
+    parser.add_argument("--real-redis", action="store_true", help="use REDIS_URL instead of an in-process fake Redis server")
+    parser.add_argument("--out")
+    args = parser.parse_args()
+    report = asyncio.run(run(args))
+    for r in report["results"]:
+        print(f"{r['workers']:>2} workers  ready {r['first_ready_s']:>6.2f}s/{r['all_ready_s']:>6.2f}s  leaders {r['leaders']}  {r['rps']:>8.1f} req/s  {r['rps_per_core']:>8.1f}/core  p99 {r['p99_ms']:>8.2f}ms  stop {r['shutdown_s']:>5.2f}s  errors {r['errors']}")
+    if args.out:
+        with open(args.out, "w") as f: json.dump(report, f, indent=2)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import argparse, json, os, platform, time
+from concurrent.futures import ProcessPoolExecutor
+from app.config import settings
+from app.services import pqc
+def _ops(fn, seconds: float) -> tuple[int, float]:
+    n, t0 = 0, time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        fn()
+        n += 1
+    return n, time.perf_counter() - t0
+def single_core(alg: str, pub: str, priv: str, seconds: float) -> dict:
+    pk, sk = pqc.PublicKey(alg, pub), pqc.PrivateKey(alg, pub, priv)
+    ct, _ = pqc.encapsulate(pk)
+    out = {}
+    for name, fn in (("keygen", pqc.generate_keypair), ("encapsulate", lambda: pqc.encapsulate(pk)), ("decapsulate", lambda: pqc.decapsulate(sk, ct)), ("parse_keys", lambda: pqc.PrivateKey(alg, pub, priv))):
+        n, elapsed = _ops(fn, seconds)
+        out[name] = {"ops": n, "ops_per_s": round(n / elapsed, 1), "us_per_op": round(elapsed / n * 1e6, 1)}
+    return out
+def _encaps_chunk(args) -> int:
+    key_id, alg, pub, count = args
+    return len(pqc.encapsulate_many(key_id, alg, pub, count))
+def pool(alg: str, pub: str, workers: int, total: int, chunk: int) -> dict:
+    with ProcessPoolExecutor(workers) as ex:
+        list(ex.map(_encaps_chunk, [(1, alg, pub, 1)] * workers))
+        t0 = time.perf_counter()
+        done = sum(ex.map(_encaps_chunk, [(1, alg, pub, chunk)] * (total // chunk)))
+        elapsed = time.perf_counter() - t0
+    return {"workers": workers, "ops": done, "ops_per_s": round(done / elapsed, 1), "ops_per_s_per_core": round(done / elapsed / workers, 1)}
+def main():
+    parser = argparse.ArgumentParser(description="Hybrid KEM throughput per core")
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--total", type=int, default=2000)
+    parser.add_argument("--chunk", type=int, default=50)
+    parser.add_argument("--classical", action="store_true", help="benchmark X25519 only")
+    parser.add_argument("--out")
+    args = parser.parse_args()
+    settings.pqc_enable = not args.classical
+    alg, pub, priv = pqc.generate_keypair()
+    report = {"meta": {"alg": alg, "python": platform.python_version(), "cpus": os.cpu_count()}, "single_core": single_core(alg, pub, priv, args.seconds), "pool_encapsulate": pool(alg, pub, args.workers, args.total, args.chunk)}
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f: json.dump(report, f, indent=2)
+if __name__ == "__main__":
+    main()
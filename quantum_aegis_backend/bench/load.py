@@ -0,0 +1,129 @@
+import argparse, asyncio, json, os, platform, random, secrets, socket, subprocess, sys, tempfile, time
+from datetime import datetime, timezone
+from pathlib import Path
+import httpx
+import numpy as np
+ROOT = Path(__file__).resolve().parent.parent
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+def ip_pool(size: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}" for _ in range(size)]
+def ip_stream(dist: str, n: int, pool: list[str], seed: int, hot_size: int = 100, hot_share: float = 0.9, zipf_a: float = 1.2) -> list[str]:
+    rng = np.random.default_rng(seed)
+    if dist == "uniform":
+        idx = rng.integers(0, len(pool), n)
+    elif dist == "hot":
+        hot = rng.random(n) < hot_share
+        idx = np.where(hot, rng.integers(0, hot_size, n), rng.integers(0, len(pool), n))
+    elif dist == "zipf":
+        idx = (rng.zipf(zipf_a, n) - 1) % len(pool)
+    else:
+        raise ValueError(dist)
+    return [pool[i] for i in idx]
+def summarize(name: str, latencies: list[float], errors: int, elapsed: float) -> dict:
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]).tolist()
+    return {"name": name, "requests": len(latencies), "errors": errors, "seconds": round(elapsed, 3), "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "p99_ms": round(p99, 3), "max_ms": round(float(ms.max()), 3)}
+async def drive(client: httpx.AsyncClient, name: str, method: str, path: str, bodies: list | None, concurrency: int, requests: int) -> dict:
+    latencies, errors, cursor = [], 0, 0
+    async def worker():
+        nonlocal errors, cursor
+        while cursor < requests:
+            i = cursor
+            cursor += 1
+            t0 = time.perf_counter()
+            try:
+                r = await client.request(method, path, json=bodies[i % len(bodies)] if bodies else None)
+                ok = r.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - t0)
+            if not ok: errors += 1
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, latencies, errors, time.perf_counter() - t0)
+async def wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code < 500: return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up")
+def spawn(module: str, port: int, env: dict, extra: list[str] | None = None) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-m", module, "--port", str(port), *(extra or [])], cwd=ROOT, env={**os.environ, **env})
+def git_rev() -> str | None:
+    try: return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError): return None
+async def run(args) -> dict:
+    standin_port, app_port = free_port(), free_port()
+    workdir = tempfile.mkdtemp(prefix="qa-bench-")
+    standin_url = f"http://127.0.0.1:{standin_port}"
+    app_env = {
+        "DATABASE_URL": f"sqlite+aiosqlite:///{workdir}/bench.db",
+        "VT_API_KEY": "bench", "SHODAN_API_KEY": "bench", "ABUSEIPDB_API_KEY": "bench",
+        "VT_BASE_URL": standin_url, "SHODAN_BASE_URL": standin_url, "ABUSEIPDB_BASE_URL": standin_url,
+        "VT_RATE_PER_MIN": "1e9", "SHODAN_RATE_PER_MIN": "1e9", "ABUSEIPDB_RATE_PER_MIN": "1e9",
+        "VT_BURST": "1000000", "SHODAN_BURST": "1000000", "ABUSEIPDB_BURST": "1000000",
+        "PROVIDER_MAX_CONNECTIONS": str(max(20, args.concurrency * 2)),
+    }
+    standin_env = {"STANDIN_LATENCY_MS": str(args.latency_ms), "STANDIN_JITTER_MS": str(args.jitter_ms), "STANDIN_ERROR_RATE": str(args.error_rate)}
+    api_key = secrets.token_hex(24)
+    procs = [spawn("bench.standin", standin_port, standin_env), spawn("bench.serve", app_port, app_env, ["--api-key", api_key, *(["--real-redis"] if args.real_redis else [])])]
+    try:
+        await wait_ready(f"{standin_url}/docs")
+        await wait_ready(f"http://127.0.0.1:{app_port}/healthz")
+        pool = ip_pool(args.pool_size, args.seed)
+        results = []
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", limits=limits, timeout=60, headers={"X-API-Key": api_key}) as client:
+            for dist in args.distributions:
+                bodies = [{"ip": ip} for ip in ip_stream(dist, args.requests, pool, args.seed)]
+                if args.warmup: await drive(client, "warmup", "POST", "/intel/ip-check", bodies[:args.warmup], args.concurrency, args.warmup)
+                results.append(await drive(client, f"ip-check/{dist}", "POST", "/intel/ip-check", bodies, args.concurrency, args.requests))
+            results.append(await drive(client, "metrics", "GET", "/metrics", None, args.concurrency, args.requests))
+    finally:
+        for p in procs:
+            p.terminate()
+            p.wait(10)
+    config = {k: v for k, v in vars(args).items() if k not in ("out", "compare")}
+    return {"meta": {"timestamp": datetime.now(timezone.utc).isoformat(), "git_rev": git_rev(), "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(), "config": config}, "results": results}
+def compare(report: dict, baseline: dict) -> list[str]:
+    old = {r["name"]: r for r in baseline["results"]}
+    lines = []
+    for r in report["results"]:
+        b = old.get(r["name"])
+        if not b: continue
+        deltas = " ".join(f"{k}={(r[k] - b[k]) / b[k] * 100:+.1f}%" for k in ("rps", "p50_ms", "p95_ms", "p99_ms") if b[k])
+        lines.append(f"{r['name']:<20} {deltas}")
+    return lines
+def main():
+    parser = argparse.ArgumentParser(description="Load test /intel/ip-check and /metrics against local provider stand-ins")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--distributions", nargs="+", default=["hot", "uniform", "zipf"], choices=["hot", "uniform", "zipf"])
+    parser.add_argument("--pool-size", type=int, default=100000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--real-redis", action="store_true")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to diff against")
+    args = parser.parse_args()
+    report = asyncio.run(run(args))
+    for r in report["results"]:
+        print(f"{r['name']:<20} {r['rps']:>9.1f} req/s  p50 {r['p50_ms']:>8.2f}ms  p95 {r['p95_ms']:>8.2f}ms  p99 {r['p99_ms']:>8.2f}ms  errors {r['errors']}")
+    if args.compare:
+        with open(args.compare) as f: print("\n".join(compare(report, json.load(f))))
+    if args.out:
+        with open(args.out, "w") as f: json.dump(report, f, indent=2)
+if __name__ == "__main__":
+    main()
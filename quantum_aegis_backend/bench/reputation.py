@@ -0,0 +1,40 @@
+import argparse, json, os, platform, random, time
+from app.services.reputation import Index
+def rules(n: int, rng: random.Random) -> list[tuple[str, str, str]]:
+    return [(f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.0/24", "deny", "feed") for _ in range(n)]
+def ips(n: int, rng: random.Random) -> list[str]:
+    return [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}" for _ in range(n)]
+def lookups(index: Index, sample: list[str], rounds: int) -> dict:
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for ip in sample: index.lookup(ip)
+        best = min(best, time.perf_counter() - t0)
+    return {"lookups": len(sample), "us_per_lookup": round(best / len(sample) * 1e6, 2), "lookups_per_s": round(len(sample) / best, 1)}
+def main():
+    parser = argparse.ArgumentParser(description="Reputation index build time and per-lookup latency")
+    parser.add_argument("--rules", type=int, default=50_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--budget-us", type=float, default=50.0, help="exit non-zero when a lookup is slower than this")
+    parser.add_argument("--out")
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    entries = rules(args.rules, rng)
+    t0 = time.perf_counter()
+    index = Index(entries)
+    build = time.perf_counter() - t0
+    hits = [cidr.replace(".0/24", f".{rng.randint(0, 255)}") for cidr, _, _ in rng.sample(entries, min(len(entries), args.lookups))]
+    report = {
+        "meta": {"python": platform.python_version(), "cpus": os.cpu_count(), "rules": args.rules, "segments_v4": len(index.v4.starts)},
+        "build_s": round(build, 3),
+        "random": lookups(index, ips(args.lookups, rng), args.rounds),
+        "hits": lookups(index, hits, args.rounds),
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f: json.dump(report, f, indent=2)
+    if max(report["random"]["us_per_lookup"], report["hits"]["us_per_lookup"]) > args.budget_us: raise SystemExit(f"lookup slower than {args.budget_us}us")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse, json, os, platform, random, time
+import numpy as np
+from app.services import decision_engine
+def random_signals(rng: random.Random) -> dict:
+    return {
+        "virustotal": {"malicious": rng.randint(0, 20), "harmless": rng.randint(0, 80)},
+        "shodan": {"open_ports": rng.sample([22, 80, 443, 445, 3389], rng.randint(0, 3)), "vuln_count": rng.randint(0, 8)},
+        "abuseipdb": {"confidence_score": rng.randint(0, 100)},
+    }
+def tiled(cols: decision_engine.SignalColumns, times: int) -> decision_engine.SignalColumns:
+    n = len(cols.vt_malicious)
+    return decision_engine.SignalColumns(*(np.tile(c, times) for c in cols[:4]), np.concatenate([cols.port_rows + n * k for k in range(times)]), np.tile(cols.port_values, times), np.tile(cols.present, (times, 1)))
+def best(fn, rounds: int) -> float:
+    out = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        out = min(out, time.perf_counter() - t0)
+    return out
+def main():
+    parser = argparse.ArgumentParser(description="Vectorised score_batch throughput against row-by-row score()")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--budget-s", type=float, default=2.0, help="exit non-zero when one score_batch call takes longer than this")
+    parser.add_argument("--out")
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    batch = [random_signals(rng) for _ in range(args.distinct)]
+    big = tiled(decision_engine.columns(batch), max(1, args.rows // args.distinct))
+    rows = len(big.vt_malicious)
+    vectorised = best(lambda: decision_engine.score_batch(big), args.rounds)
+    scalar = best(lambda: [decision_engine.score(s) for s in batch], args.rounds)
+    columns = best(lambda: decision_engine.columns(batch), args.rounds)
+    report = {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__, "cpus": os.cpu_count(), "rows": rows},
+        "score_batch": {"seconds": round(vectorised, 4), "rows_per_s": round(rows / vectorised, 1)},
+        "columns": {"rows_per_s": round(len(batch) / columns, 1)},
+        "score_row_by_row": {"rows_per_s": round(len(batch) / scalar, 1)},
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f: json.dump(report, f, indent=2)
+    if vectorised > args.budget_s: raise SystemExit(f"score_batch over {rows} rows took {vectorised:.2f}s (budget {args.budget_s}s)")
+if __name__ == "__main__":
+    main()
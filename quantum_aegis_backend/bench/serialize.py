@@ -0,0 +1,81 @@
+import argparse, asyncio, json, os, platform, time
+import fakeredis, httpx, orjson
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+from app.routers import intel
+from app.schemas import DecisionResponse
+from app.services import cache, log_writer
+class LegacyDecisionResponse(BaseModel):
+    decision: str
+    risk_score: float = Field(ge=0, le=1)
+    signals: dict
+    cached: bool = False
+    policy_version: str | None = None
+    provisional: bool = False
+    job_id: str | None = None
+    missing: list[str] = []
+def _cpu_us(fn, n: int) -> float:
+    t0 = time.process_time()
+    for _ in range(n): fn()
+    return round((time.process_time() - t0) / n * 1e6, 2)
+def legacy_hit(raw: str) -> LegacyDecisionResponse:
+    # The pre-batch ip-check hit path: json.dumps'd model_dump() in Redis, re-validated into the response model.
+    return LegacyDecisionResponse(**{**json.loads(raw), "cached": True})
+def encode(resp: dict, n: int) -> dict:
+    memo = cache.LRU(1, 60)
+    memo.set("hit", orjson.dumps({**resp, "cached": True}), 60)
+    raw = json.dumps(LegacyDecisionResponse(**resp).model_dump())
+    return {
+        "legacy_json_model_jsonable_json": _cpu_us(lambda: JSONResponse(jsonable_encoder(legacy_hit(raw))).body, n),
+        "typed_model_dump_json": _cpu_us(lambda: DecisionResponse(**resp).model_dump_json(), n),
+        "orjson_dict": _cpu_us(lambda: orjson.dumps(resp), n),
+        "preserialized_hit": _cpu_us(lambda: memo.get("hit"), n),
+    }
+def bench_app(legacy_redis) -> FastAPI:
+    app = FastAPI()
+    @app.post("/legacy", response_model=LegacyDecisionResponse)
+    async def legacy(ip: str):
+        raw = await legacy_redis.get(f"ipcache:{ip}")
+        if raw: return legacy_hit(raw)
+        resp = LegacyDecisionResponse(**await intel._decide_one(ip, 1)).model_dump()
+        await legacy_redis.setex(f"ipcache:{ip}", 86400, json.dumps(resp))
+        return LegacyDecisionResponse(**resp)
+    @app.post("/lean", response_model=DecisionResponse)
+    async def lean(ip: str):
+        return intel._json(await intel._respond_one(ip, 1, True))
+    return app
+async def requests(n: int, ips: list[str]) -> tuple[dict, dict]:
+    cache._redis = fakeredis.FakeAsyncRedis()
+    sample = await intel._decide_one(ips[0], 1)
+    out = {}
+    app = bench_app(fakeredis.FakeAsyncRedis(decode_responses=True))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://bench") as client:
+        for route in ("legacy", "lean"):
+            for ip in ips: assert (await client.post(f"/{route}", params={"ip": ip})).status_code == 200
+            t0, w0 = time.process_time(), time.perf_counter()
+            for i in range(n): await client.post(f"/{route}", params={"ip": ips[i % len(ips)]})
+            out[route] = {"cpu_us_per_request": round((time.process_time() - t0) / n * 1e6, 1), "requests_per_s": round(n / (time.perf_counter() - w0), 1)}
+    return out, sample
+def main():
+    parser = argparse.ArgumentParser(description="Per-request CPU of the ip-check response path on warm caches")
+    parser.add_argument("--encode-ops", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--ips", type=int, default=50)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+    async def record(org_id, decisions): pass
+    log_writer.record_decisions = record
+    ips = [f"198.51.100.{i}" for i in range(args.ips)]
+    request, resp = asyncio.run(requests(args.requests, ips))
+    report = {
+        "meta": {"python": platform.python_version(), "cpus": os.cpu_count(), "response_bytes": len(orjson.dumps(resp))},
+        "encode_cpu_us": encode(resp, args.encode_ops),
+        "request": request,
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f: json.dump(report, f, indent=2)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import argparse, asyncio
+import uvicorn
+async def seed_key(key: str):
+    from app.database import SessionLocal, engine, migrate
+    from app.models import APIKey, Org
+    from app.security import hash_api_key
+    await migrate()
+    async with SessionLocal() as db:
+        org = Org(name="bench", plan="enterprise")
+        db.add(org)
+        await db.flush()
+        db.add(APIKey(org_id=org.id, key_hash=hash_api_key(key)))
+        await db.commit()
+    await engine.dispose()
+def main():
+    parser = argparse.ArgumentParser(description="Run app.main:app for benchmarks")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--real-redis", action="store_true", help="use REDIS_URL instead of an in-process fake")
+    parser.add_argument("--api-key", help="seed an unlimited bench org with this API key")
+    args = parser.parse_args()
+    from app.main import app
+    if not args.real_redis:
+        import fakeredis
+        from rq import Queue
+        from app.services import cache
+        from worker import worker
+        cache._redis = fakeredis.FakeAsyncRedis()
+        worker.q = Queue("threat-jobs", connection=fakeredis.FakeRedis())
+    if args.api_key: asyncio.run(seed_key(args.api_key))
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import argparse, asyncio, os, random
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+LATENCY_MS = float(os.getenv("STANDIN_LATENCY_MS", "20"))
+JITTER_MS = float(os.getenv("STANDIN_JITTER_MS", "5"))
+ERROR_RATE = float(os.getenv("STANDIN_ERROR_RATE", "0"))
+app = FastAPI(title="intel provider stand-in")
+async def _respond(body: dict):
+    await asyncio.sleep(max(0.0, random.gauss(LATENCY_MS, JITTER_MS)) / 1000)
+    if random.random() < ERROR_RATE: return JSONResponse({"error": "stand-in failure"}, status_code=503)
+    return body
+def _octet(ip: str) -> int:
+    try: return int(ip.rsplit(".", 1)[-1])
+    except ValueError: return 0
+@app.get("/api/v3/ip_addresses/{ip}")
+async def virustotal(ip: str):
+    return await _respond({"data": {"attributes": {"last_analysis_stats": {"malicious": _octet(ip) % 7, "harmless": 70}}}})
+@app.get("/shodan/host/{ip}")
+async def shodan(ip: str):
+    ports = [22, 80, 443] if _octet(ip) % 2 == 0 else [445]
+    return await _respond({"ports": ports, "vulns": {f"CVE-{i}": {} for i in range(_octet(ip) % 4)}})
+@app.get("/api/v2/check")
+async def abuseipdb(ipAddress: str):
+    return await _respond({"data": {"abuseConfidenceScore": _octet(ipAddress) % 101, "totalReports": _octet(ipAddress) % 13}})
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
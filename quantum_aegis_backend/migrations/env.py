@@ -0,0 +1,19 @@
+import asyncio
+from alembic import context
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.config import settings
+from app.database import Base, engine_options
+from app import models  # noqa: F401
+target_metadata = Base.metadata
+def run_offline():
+    context.configure(url=settings.database_url, target_metadata=target_metadata, literal_binds=True, render_as_batch=True)
+    with context.begin_transaction(): context.run_migrations()
+def _migrate(conn):
+    context.configure(connection=conn, target_metadata=target_metadata, render_as_batch=conn.dialect.name == "sqlite")
+    with context.begin_transaction(): context.run_migrations()
+async def run_online():
+    engine = create_async_engine(settings.database_url, **engine_options(settings.database_url))
+    async with engine.connect() as conn: await conn.run_sync(_migrate)
+    await engine.dispose()
+if context.is_offline_mode(): run_offline()
+else: asyncio.run(run_online())
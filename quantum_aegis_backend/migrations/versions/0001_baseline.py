@@ -0,0 +1,69 @@
+"""baseline schema (what create_all built before migrations)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+def upgrade():
+    op.create_table("orgs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(120), nullable=False),
+        sa.Column("plan", sa.String(50), nullable=False))
+    op.create_index("ix_orgs_name", "orgs", ["name"], unique=True)
+    op.create_table("api_keys",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("org_id", sa.Integer(), sa.ForeignKey("orgs.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("key_hash", sa.String(64), nullable=False),
+        sa.Column("active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False))
+    op.create_index("ix_api_keys_key_hash", "api_keys", ["key_hash"], unique=True)
+    op.create_table("quantum_keys",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("alg", sa.String(50), nullable=False),
+        sa.Column("pub", sa.String(4096), nullable=False),
+        sa.Column("priv", sa.String(4096), nullable=False),
+        sa.Column("rotated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("retired_at", sa.DateTime(timezone=True), nullable=True))
+    op.create_index("ix_quantum_keys_retired_at", "quantum_keys", ["retired_at"])
+    op.create_table("threat_checks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("org_id", sa.Integer(), sa.ForeignKey("orgs.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("subject", sa.String(256), nullable=False),
+        sa.Column("subject_type", sa.String(30), nullable=False),
+        sa.Column("result", sa.JSON(), nullable=False),
+        sa.Column("malicious", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("org_id", "subject", "subject_type", "created_at"))
+    op.create_table("decision_logs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("org_id", sa.Integer(), sa.ForeignKey("orgs.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("action", sa.String(30), nullable=False),
+        sa.Column("reason", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False))
+    op.create_table("counters",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("live_threats", sa.BigInteger(), nullable=False),
+        sa.Column("threats_blocked_today", sa.BigInteger(), nullable=False),
+        sa.Column("ai_decisions_hour", sa.BigInteger(), nullable=False),
+        sa.Column("quantum_keys_active", sa.Integer(), nullable=False))
+    op.create_table("counter_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(50), nullable=False),
+        sa.Column("window_start", sa.BigInteger(), nullable=False),
+        sa.Column("value", sa.BigInteger(), nullable=False),
+        sa.UniqueConstraint("name", "window_start"))
+    op.create_table("reputation_rules",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("cidr", sa.String(64), nullable=False),
+        sa.Column("action", sa.String(10), nullable=False),
+        sa.Column("source", sa.String(60), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False))
+def downgrade():
+    for table in ("reputation_rules", "counter_rollups", "counters", "decision_logs", "threat_checks", "quantum_keys", "api_keys", "orgs"):
+        op.drop_table(table)
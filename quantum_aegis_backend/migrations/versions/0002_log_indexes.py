@@ -0,0 +1,27 @@
+"""index decision_logs / threat_checks by time and org
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+INDEXES = [
+    ("ix_decision_logs_org_id_created_at", "decision_logs", ["org_id", "created_at"]),
+    ("ix_decision_logs_created_at", "decision_logs", ["created_at"]),
+    ("ix_threat_checks_org_id_created_at", "threat_checks", ["org_id", "created_at"]),
+    ("ix_threat_checks_created_at", "threat_checks", ["created_at"]),
+    ("ix_api_keys_org_id", "api_keys", ["org_id"]),
+]
+def upgrade():
+    concurrent = op.get_context().dialect.name == "postgresql"
+    for name, table, cols in INDEXES:
+        if concurrent:
+            with op.get_context().autocommit_block(): op.create_index(name, table, cols, postgresql_concurrently=True, if_not_exists=True)
+        else:
+            op.create_index(name, table, cols, if_not_exists=True)
+def downgrade():
+    for name, table, _ in INDEXES: op.drop_index(name, table_name=table)
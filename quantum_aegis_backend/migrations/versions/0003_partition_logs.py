@@ -0,0 +1,45 @@
+"""range-partition decision_logs / threat_checks by day on PostgreSQL
+
+Existing rows stay where they are: the old table is attached as the
+<table>_legacy partition covering everything before tomorrow, so the
+migration builds one (id, created_at) unique index per table instead of
+copying history. Daily partitions after that are created ahead of time
+and dropped on expiry by app.services.retention. No-op on other dialects.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from datetime import datetime, timedelta, timezone
+from alembic import op
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+TABLES = {
+    "decision_logs": ["ix_decision_logs_org_id_created_at", "ix_decision_logs_created_at"],
+    "threat_checks": ["ix_threat_checks_org_id_created_at", "ix_threat_checks_created_at"],
+}
+INDEX_COLUMNS = {"org_id_created_at": "org_id, created_at", "created_at": "created_at"}
+def _partition(table: str, indexes: list[str], cutoff: datetime):
+    legacy = f"{table}_legacy"
+    op.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    for ix in indexes: op.execute(f"ALTER INDEX {ix} RENAME TO {ix.replace(table, legacy)}")
+    constraints = [f"{table}_pkey", f"{table}_org_id_fkey"] + ([f"{table}_org_id_subject_subject_type_created_at_key"] if table == "threat_checks" else [])
+    for name in constraints: op.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT {name} TO {name.replace(table, legacy, 1)}")
+    op.execute(f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)")
+    op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id, created_at)")
+    op.execute(f"ALTER TABLE {table} ADD FOREIGN KEY (org_id) REFERENCES orgs (id) ON DELETE CASCADE")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    if table == "threat_checks": op.execute(f"ALTER TABLE {table} ADD UNIQUE (org_id, subject, subject_type, created_at)")
+    for ix in indexes: op.execute(f"CREATE INDEX {ix} ON {table} ({INDEX_COLUMNS[ix.removeprefix(f'ix_{table}_')]})")
+    op.execute(f"CREATE UNIQUE INDEX {legacy}_id_created_at ON {legacy} (id, created_at)")
+    op.execute(f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{cutoff.isoformat()}')")
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+def upgrade():
+    if op.get_context().dialect.name != "postgresql": return
+    cutoff = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    for table, indexes in TABLES.items(): _partition(table, indexes, cutoff)
+def downgrade():
+    if op.get_context().dialect.name != "postgresql": return
+    raise RuntimeError("0003 is not reversible in place; dump and reload decision_logs/threat_checks into plain tables instead")
@@ -0,0 +1,37 @@
+"""queryable decision_logs columns and decision_rollups
+
+Rows logged before this revision keep ip/risk_score NULL (they stay in
+reason JSON) and are only reachable through org/decision/time filters.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+def upgrade():
+    with op.batch_alter_table("decision_logs") as batch:
+        batch.add_column(sa.Column("ip", sa.String(45), nullable=True))
+        batch.add_column(sa.Column("risk_score", sa.Float(), nullable=True))
+    op.create_index("ix_decision_logs_org_id_ip_created_at", "decision_logs", ["org_id", "ip", "created_at"])
+    op.create_index("ix_decision_logs_org_id_action_created_at", "decision_logs", ["org_id", "action", "created_at"])
+    op.create_table("decision_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("org_id", sa.Integer(), nullable=False),
+        sa.Column("granularity", sa.String(8), nullable=False),
+        sa.Column("dimension", sa.String(16), nullable=False),
+        sa.Column("bucket_start", sa.BigInteger(), nullable=False),
+        sa.Column("key", sa.String(64), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.UniqueConstraint("org_id", "granularity", "dimension", "bucket_start", "key"))
+def downgrade():
+    op.drop_table("decision_rollups")
+    op.drop_index("ix_decision_logs_org_id_action_created_at", table_name="decision_logs")
+    op.drop_index("ix_decision_logs_org_id_ip_created_at", table_name="decision_logs")
+    with op.batch_alter_table("decision_logs") as batch:
+        batch.drop_column("risk_score")
+        batch.drop_column("ip")
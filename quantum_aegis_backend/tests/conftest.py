@@ -0,0 +1,38 @@
+import os, tempfile
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/test.db")
+import asyncio
+import fakeredis
+import pytest
+from sqlalchemy import text
+from app.database import Base, engine
+from app.services import cache, counters
+@pytest.fixture
+def run():
+    # Runs a test coroutine against a freshly built schema in its own event loop.
+    def run(coro, create=True, setup=None, teardown=None):
+        async def wrapped():
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+                await conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+                if create: await conn.run_sync(Base.metadata.create_all)
+            if setup: await setup()
+            try: return await coro()
+            finally:
+                if teardown: await teardown()
+                await engine.dispose()
+        return asyncio.run(wrapped())
+    return run
+@pytest.fixture
+def fake_redis():
+    cache._redis = fakeredis.FakeAsyncRedis()
+    cache.local.clear()
+    yield cache._redis
+    cache.local.clear()
+@pytest.fixture
+def fresh_counters():
+    counters._pending.clear()
+    counters._gauges.clear()
+    counters._snapshot, counters._windows = {}, {}
+    yield
+    counters._pending.clear()
+    counters._gauges.clear()
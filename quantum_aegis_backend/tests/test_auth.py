@@ -0,0 +1,120 @@
+import asyncio, time
+import jwt, pytest
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError as RedisConnectionError
+from app.config import settings
+from app.database import SessionLocal
+from app.models import APIKey, Org
+from app.security import create_api_key, hash_api_key, jwt_encode
+from app.services import auth, cache
+@pytest.fixture(autouse=True)
+def fresh(fake_redis, monkeypatch):
+    auth._cache.clear()
+    monkeypatch.setitem(settings.plan_limits, "essential", {"rate_per_min": 3, "daily_quota": 5})
+async def _org_with_key(plan: str = "essential") -> tuple[int, int, str]:
+    key = create_api_key()
+    async with SessionLocal() as db:
+        org = Org(name=f"org-{key[:6]}", plan=plan)
+        db.add(org)
+        await db.flush()
+        row = APIKey(org_id=org.id, key_hash=hash_api_key(key))
+        db.add(row)
+        await db.commit()
+        return org.id, row.id, key
+def test_keys_are_stored_hashed_and_lookups_are_cached(run, monkeypatch):
+    async def go():
+        org_id, key_id, key = await _org_with_key()
+        async with SessionLocal() as db:
+            assert (await db.get(APIKey, key_id)).key_hash == hash_api_key(key) != key
+        loads = []
+        real = auth._load_key
+        monkeypatch.setattr(auth, "_load_key", lambda digest: loads.append(digest) or real(digest))
+        for _ in range(5): assert (await auth.authenticate(key)).org_id == org_id
+        assert len(loads) == 1
+        for _ in range(3):
+            with pytest.raises(HTTPException) as e: await auth.authenticate("not-a-key")
+            assert e.value.status_code == 401
+        assert len(loads) == 2
+    run(go)
+def test_warm_preloads_active_keys(run, monkeypatch):
+    async def go():
+        org_id, key_id, key = await _org_with_key("pro")
+        warmed = await auth.warm(100)
+        async def no_db(digest): raise AssertionError("warm key hit the database")
+        monkeypatch.setattr(auth, "_load_key", no_db)
+        return warmed, await auth.authenticate(key), org_id, key_id
+    warmed, principal, org_id, key_id = run(go)
+    assert warmed >= 1 and principal == auth.Principal(org_id, "pro", key_id, ("intel",))
+def test_revoke_invalidates_local_and_peer_caches(run):
+    async def go():
+        org_id, key_id, key = await _org_with_key()
+        await auth.authenticate(key)
+        await auth.start()
+        await asyncio.sleep(0.05)
+        peer = f"key:{hash_api_key('peer')}"
+        auth._cache.set(peer, auth.Principal(org_id, "essential", 99, ("intel",)), 60)
+        await cache.client().publish(auth.CHANNEL, hash_api_key("peer"))
+        assert await auth.revoke(key_id, org_id)
+        await asyncio.sleep(0.05)
+        await auth.stop()
+        assert auth._cache.get(peer) is None
+        with pytest.raises(HTTPException): await auth.authenticate(key)
+        assert not await auth.revoke(key_id, org_id)
+    run(go)
+def test_jwt_roundtrip_and_rejections(run):
+    async def go():
+        org_id, _, _ = await _org_with_key("pro")
+        principal = await auth.authenticate(jwt_encode(str(org_id), ["intel"]))
+        assert principal == auth.Principal(org_id, "pro", None, ("intel",))
+        admin = await auth.authenticate(jwt_encode("ops", ["admin"]))
+        with pytest.raises(HTTPException) as e: await auth.require(admin)
+        assert e.value.status_code == 403
+        expired = jwt.encode({"iss": settings.jwt_issuer, "aud": settings.jwt_audience, "sub": str(org_id), "exp": int(time.time()) - 5}, settings.jwt_secret, algorithm="HS256")
+        forged = jwt.encode({"iss": settings.jwt_issuer, "aud": settings.jwt_audience, "sub": str(org_id), "exp": int(time.time()) + 60}, "wrong", algorithm="HS256")
+        for token in (expired, forged, jwt_encode("404", ["intel"])):
+            with pytest.raises(HTTPException) as e: await auth.authenticate(token)
+            assert e.value.status_code == 401
+    run(go)
+def test_rate_limit_and_quota_are_enforced_per_org():
+    async def go():
+        a = auth.Principal(1, "essential", None, ("intel",))
+        b = auth.Principal(2, "essential", None, ("intel",))
+        await auth.charge(a, 3)
+        with pytest.raises(auth.QuotaExceeded) as e: await auth.charge(a)
+        assert e.value.limit == "rate limit" and 0 < e.value.retry_after <= 60
+        async def next_minute(): await cache.client().delete(*[k async for k in cache.client().scan_iter("rl:2:*")])
+        await auth.charge(b, 3)
+        await next_minute()
+        await auth.charge(b, 2)
+        await next_minute()
+        with pytest.raises(auth.QuotaExceeded) as e: await auth.charge(b)
+        assert e.value.limit == "daily quota"
+        await auth.charge(auth.Principal(3, "enterprise", None, ("intel",)), 10 ** 6)
+    asyncio.run(go())
+def test_quota_fails_open_when_redis_is_down(monkeypatch):
+    async def broken(*a, **k): raise RedisConnectionError("down")
+    monkeypatch.setattr(cache._redis.pipeline(transaction=False).__class__, "execute", broken)
+    asyncio.run(auth.charge(auth.Principal(1, "essential", None, ("intel",)), 100))
+def test_kem_routes_need_kem_scope():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    client = TestClient(app)
+    routes = [("/kem/encapsulate", {"public_key": "!"}), ("/kem/encapsulate/batch", {"count": 1, "public_key": "!"}), ("/kem/decapsulate", {"key_id": 1, "ciphertext": "!"}), ("/kem/decapsulate/batch", {"items": [{"key_id": 1, "ciphertext": "!"}]})]
+    for path, body in routes:
+        assert client.post(path, json=body).status_code == 401
+        assert client.post(path, json=body, headers={"Authorization": f"Bearer {jwt_encode('ops', ['intel'])}"}).status_code == 403
+        for scope in ("kem", "admin"):
+            assert client.post(path, json=body, headers={"Authorization": f"Bearer {jwt_encode('ops', [scope])}"}).status_code == 422
+def test_admin_routes_reject_missing_and_unscoped_credentials():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    client = TestClient(app)
+    routes = [("POST", "/reputation/rules", {"cidr": "0.0.0.0/0", "action": "allow"}), ("POST", "/reputation/reload", None), ("POST", "/policy/reload", None),
+              ("POST", "/policy/rescore", None), ("POST", "/keys/rotate", None), ("GET", "/metrics/profile", None), ("POST", "/orgs", {"name": "x"})]
+    for method, path, body in routes:
+        res = client.request(method, path, json=body)
+        assert res.status_code == 401 and res.headers["www-authenticate"] == "Bearer", path
+        res = client.request(method, path, json=body, headers={"Authorization": f"Bearer {jwt_encode('ops', ['intel', 'kem'])}"})
+        assert res.status_code == 403 and res.json()["detail"] == "admin scope required", path
+    res = client.get("/metrics/profile", headers={"Authorization": f"Bearer {jwt_encode('ops', ['admin'])}"})
+    assert res.status_code == 404
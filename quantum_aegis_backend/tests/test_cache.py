@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from app.services import cache
+@pytest.fixture(autouse=True)
+def fresh_cache(fake_redis):
+    for k in cache.stats: cache.stats[k] = 0
+def test_concurrent_misses_share_one_load():
+    calls = 0
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"decision": "deny", "risk_score": 0.9}, True
+    async def go():
+        return await asyncio.gather(*(cache.coalesce("sig:vt:1.2.3.4", loader) for _ in range(50)))
+    res = asyncio.run(go())
+    assert calls == 1
+    assert [fresh for _, fresh in res].count(True) == 1
+    assert all(val == {"decision": "deny", "risk_score": 0.9} for val, _ in res)
+    assert cache.stats["coalesced"] == 49
+def test_local_tier_serves_repeat_lookups_without_redis():
+    async def go():
+        await cache.setex("k", {"a": [1, 2]}, ttl=60)
+        await cache._redis.flushall()
+        return await cache.get("k")
+    assert asyncio.run(go()) == {"a": [1, 2]}
+    assert cache.stats["local_hits"] == 1
+def test_redis_tier_backfills_local():
+    async def go():
+        await cache._redis.set("k", cache.pack({"v": 1}))
+        first = await cache.get("k")
+        second = await cache.get("k")
+        return first, second
+    assert asyncio.run(go()) == ({"v": 1}, {"v": 1})
+    assert cache.stats["redis_hits"] == 1 and cache.stats["local_hits"] == 1
+def test_mget_mixes_tiers():
+    async def go():
+        await cache.setex("a", 1, ttl=60)
+        await cache._redis.set("b", cache.pack(2))
+        return await cache.mget(["a", "b", "c"])
+    assert asyncio.run(go()) == [1, 2, None]
+def test_lru_evicts_oldest_and_expires():
+    lru = cache.LRU(maxsize=2, ttl=60)
+    lru.set("a", 1, 60)
+    lru.set("b", 2, 60)
+    lru.get("a")
+    lru.set("c", 3, 60)
+    assert lru.get("b") is None and lru.get("a") == 1
+    lru.set("d", 4, -1)
+    assert lru.get("d") is None
+def test_loader_error_propagates_to_followers():
+    async def loader():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+    async def go():
+        return await asyncio.gather(*(cache.coalesce("x", loader) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(go()))
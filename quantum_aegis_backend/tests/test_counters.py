@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+from sqlalchemy import select
+from app.database import SessionLocal
+from app.models import CounterRollup, Counters
+from app.services import counters
+pytestmark = pytest.mark.usefixtures("fresh_counters")
+def test_concurrent_increments_are_not_lost(run):
+    async def go():
+        await counters.flush()
+        async def hit():
+            for _ in range(100):
+                counters.record_decisions(["deny", "allow"])
+                await asyncio.sleep(0)
+        flusher = asyncio.create_task(counters.flush())
+        await asyncio.gather(*(hit() for _ in range(20)), flusher)
+        await counters.flush()
+        async with SessionLocal() as db:
+            return (await db.execute(select(Counters))).scalars().all(), counters.snapshot()
+    rows, snap = run(go)
+    assert len(rows) == 1
+    assert rows[0].ai_decisions_hour == 4000 and rows[0].threats_blocked_today == 2000
+    assert snap["ai_decisions_hour"] == 4000 and snap["threats_blocked_today"] == 2000
+def test_windows_reset_and_totals_accumulate(run):
+    async def go():
+        start = counters.window_start("ai_decisions_hour")
+        counters._pending[("ai_decisions_hour", start - 3600)] += 50
+        counters.incr("ai_decisions_hour", 3)
+        counters.incr("quantum_keys_active", 2)
+        await counters.flush()
+        async with SessionLocal() as db:
+            rollups = dict((await db.execute(select(CounterRollup.window_start, CounterRollup.value).where(CounterRollup.name == "ai_decisions_hour"))).all())
+        return start, rollups, counters.snapshot()
+    start, rollups, snap = run(go)
+    assert rollups == {start - 3600: 50, start: 3}
+    assert snap["ai_decisions_hour"] == 3
+    assert snap["quantum_keys_active"] == Counters.__table__.c.quantum_keys_active.default.arg + 2
+def test_snapshot_includes_unflushed_deltas():
+    counters._snapshot = {"ai_decisions_hour": 10, "threats_blocked_today": 1, "live_threats": 0, "quantum_keys_active": 0}
+    counters._windows = {k: counters.window_start(k) for k in counters.WINDOWS}
+    counters.record_decisions(["deny"])
+    assert counters.snapshot()["ai_decisions_hour"] == 11
+    assert counters.snapshot()["threats_blocked_today"] == 2
+    counters._windows = {k: 0 for k in counters.WINDOWS}
+    assert counters.snapshot()["ai_decisions_hour"] == 1
+def test_gauges_are_written_once_and_read_back_from_the_shared_row(run):
+    async def go():
+        counters.set_gauge("quantum_keys_active", 2)
+        assert counters.snapshot()["quantum_keys_active"] == 2
+        await counters.flush()
+        async with SessionLocal() as db:
+            await db.execute(Counters.__table__.update().values(quantum_keys_active=3))
+            await db.commit()
+        await counters.flush()
+        return counters.snapshot()["quantum_keys_active"]
+    assert run(go) == 3 and not counters._gauges
@@ -0,0 +1,75 @@
+import json, os, random, time
+import numpy as np
+import pytest
+from app.config import settings
+from app.services import decision_engine
+from app.services.decision_engine import Policy
+def _random_signals(rng: random.Random) -> dict:
+    return {
+        "virustotal": {"malicious": rng.randint(0, 20), "harmless": rng.randint(0, 80)},
+        "shodan": {"open_ports": rng.sample([22, 80, 443, 445, 3389], rng.randint(0, 3)), "vuln_count": rng.randint(0, 8)},
+        "abuseipdb": {"confidence_score": rng.randint(0, 100)},
+    }
+@pytest.fixture
+def policy_file(tmp_path):
+    path = tmp_path / "policy.json"
+    saved = settings.scoring_policy_path, settings.scoring_policy_reload_s
+    settings.scoring_policy_path, settings.scoring_policy_reload_s = str(path), 0
+    yield path
+    settings.scoring_policy_path, settings.scoring_policy_reload_s = saved
+    decision_engine.activate(decision_engine.DEFAULT_POLICY)
+def test_default_policy_matches_original_weights():
+    risk, reasons, decision = decision_engine.score({"virustotal": {"malicious": 7, "harmless": 63}, "shodan": {"open_ports": [445], "vuln_count": 2}, "abuseipdb": {"confidence_score": 85}})
+    assert risk == pytest.approx(0.5 * 0.1 + 0.3 * 0.7 + 0.2 * 0.85)
+    assert reasons == {"vt": 0.1, "shodan": 0.7, "abuse": 0.85}
+    assert decision == "flag"
+    assert decision_engine.score({}) == (0.3, {"vt": 0.0, "shodan": 0.0, "abuse": 0.0}, "flag")
+def test_missing_providers_are_reweighted():
+    abuse_only = {"abuseipdb": {"confidence_score": 85}}
+    risk, _, decision = decision_engine.score({**abuse_only, "virustotal": {"error": "timeout"}})
+    assert risk == pytest.approx(0.85) and decision == "deny"
+    assert decision_engine.decide(abuse_only)["missing"] == ["virustotal", "shodan"]
+def test_no_provider_answers_fails_closed():
+    down = {p: {"source": p, "error": "timeout"} for p in decision_engine.PROVIDERS}
+    resp = decision_engine.decide(down)
+    assert resp["decision"] == "flag" and resp["degraded"] and resp["missing"] == list(decision_engine.PROVIDERS)
+    assert resp["risk_score"] == decision_engine.current().flag_threshold
+    assert not decision_engine.decide({"abuseipdb": {"confidence_score": 0}})["degraded"]
+    strict = Policy(version="strict", degraded_decision="deny")
+    risk, _, decisions = decision_engine.score_batch(decision_engine.columns([down, {}, _random_signals(random.Random(2))]), strict)
+    assert decisions.tolist()[:2] == ["deny", "deny"] and risk[0] == strict.deny_threshold
+    assert decision_engine.score(down, strict)[2] == "deny"
+    many = decision_engine.decide_many({"192.0.2.1": (down, True)})
+    assert many["192.0.2.1"]["decision"] == "flag" and many["192.0.2.1"]["degraded"]
+def test_batch_matches_scalar_scoring():
+    rng = random.Random(7)
+    batch = [_random_signals(rng) for _ in range(2000)] + [{}, {"virustotal": {"error": "x"}}, {"shodan": {"vuln_count": 3}, "abuseipdb": {"error": "x"}}]
+    policy = Policy(version="t", port_penalties={445: 0.5, 3389: 0.4}, deny_threshold=0.5)
+    risk, reasons, decisions = decision_engine.score_batch(decision_engine.columns(batch), policy)
+    for i, signals in enumerate(batch):
+        r, why, d = decision_engine.score(signals, policy)
+        assert risk[i] == r and decisions[i] == d
+        assert reasons["shodan"][i] == why["shodan"]
+def test_policy_hot_reload(policy_file):
+    policy_file.write_text(json.dumps({"version": "v2", "deny_threshold": 0.1, "port_penalties": {"22": 1.0}}))
+    assert decision_engine.current().version == "v2"
+    assert decision_engine.current().port_penalties == {22: 1.0}
+    assert decision_engine.score({"shodan": {"open_ports": [22]}})[2] == "deny"
+    policy_file.write_text("{not json")
+    os.utime(policy_file, (time.time() + 5, time.time() + 5))
+    assert decision_engine.current().version == "v2"
+    policy_file.write_text(json.dumps({"version": "v3"}))
+    os.utime(policy_file, (time.time() + 10, time.time() + 10))
+    assert decision_engine.current().version == "v3"
+    assert decision_engine.get_policy("v2").deny_threshold == 0.1
+def test_score_batch_on_tiled_columns_matches_score_row_by_row():
+    rng = random.Random(1)
+    batch = [_random_signals(rng) for _ in range(200)]
+    cols = decision_engine.columns(batch)
+    big = decision_engine.SignalColumns(*(np.tile(c, 50) for c in cols[:4]), np.concatenate([cols.port_rows + 200 * k for k in range(50)]), np.tile(cols.port_values, 50))
+    risk, reasons, decisions = decision_engine.score_batch(big)
+    assert len(risk) == 10_000
+    for i in range(len(risk)):
+        r, why, d = decision_engine.score(batch[i % 200])
+        assert risk[i] == r and decisions[i] == d
+        assert all(reasons[k][i] == why[k] for k in why)
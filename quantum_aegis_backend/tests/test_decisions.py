@@ -0,0 +1,69 @@
+import functools
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from app.database import SessionLocal, engine
+from app.models import DecisionLog, DecisionRollup, Org
+from app.routers import decisions
+from app.services import auth, log_writer, rollups
+async def _seed():
+    async with SessionLocal() as db:
+        db.add_all([Org(id=1, name="one"), Org(id=2, name="two")])
+        await db.commit()
+    rollups._memo.clear()
+@pytest.fixture
+def run(run): return functools.partial(run, setup=_seed)
+def _resp(decision: str, vt: float, shodan: float = 0.0) -> dict:
+    return {"decision": decision, "risk_score": 0.5, "signals": {"reasons": {"vt": vt, "shodan": shodan, "abuse": 0.0}}, "policy_version": "p1"}
+async def _page(db, **kw):
+    kw = {"ip": None, "decision": None, "since": None, "until": None, "limit": 100, "cursor": None, "include_signals": False, "org_id": None, "principal": auth.ANONYMOUS, **kw}
+    return await decisions.history(db=db, **kw)
+def test_keyset_pages_are_stable_across_equal_timestamps(run):
+    async def go():
+        base = datetime(2026, 10, 1, tzinfo=timezone.utc)
+        async with SessionLocal() as db:
+            db.add_all([DecisionLog(org_id=1, action="deny" if i % 3 == 0 else "allow", ip=f"10.0.0.{i % 4}", risk_score=0.1, reason={}, created_at=base + timedelta(seconds=i // 5)) for i in range(25)])
+            db.add_all([DecisionLog(org_id=2, action="deny", ip="10.0.0.0", risk_score=0.9, reason={}, created_at=base) for _ in range(5)])
+            await db.commit()
+            everything = (await _page(db)).results
+            seen, cursor = [], None
+            while True:
+                page = await _page(db, limit=7, cursor=cursor)
+                seen += page.results
+                cursor = page.next_cursor
+                if cursor is None: break
+            denied = await _page(db, decision="deny", ip="10.0.0.0")
+            window = await _page(db, since=base + timedelta(seconds=1), until=base + timedelta(seconds=3))
+            with pytest.raises(HTTPException): await _page(db, cursor="!!")
+            with pytest.raises(HTTPException): await _page(db, org_id=2)
+        return everything, seen, denied, window
+    everything, seen, denied, window = run(go)
+    assert len(everything) == 25 and [r.id for r in seen] == [r.id for r in everything]
+    assert [(r.created_at, r.id) for r in everything] == sorted(((r.created_at, r.id) for r in everything), reverse=True)
+    assert {(r.ip, r.decision) for r in denied.results} == {("10.0.0.0", "deny")} and denied.count == 3
+    assert window.count == 10
+def test_rollups_accumulate_across_batches_and_expire(run):
+    async def go():
+        a = {"10.9.0.1": _resp("deny", 1.0), "10.9.0.2": _resp("allow", 0.0, 0.5)}
+        b = {"10.9.0.1": _resp("deny", 1.0), "10.9.0.3": _resp("flag", 0.5)}
+        await log_writer.write(log_writer.decision_rows(1, a))
+        await log_writer.write(log_writer.decision_rows(1, b))
+        await log_writer.write(log_writer.decision_rows(2, b))
+        await log_writer.write(log_writer.decision_rows(1, a, threat_checks_only=True))
+        async with SessionLocal() as db:
+            tl = await decisions.timeline(granularity="minute", since=None, until=None, org_id=None, principal=auth.ANONYMOUS, db=db)
+            top = await decisions.top_denied(since=None, until=None, limit=5, org_id=None, principal=auth.ANONYMOUS, db=db)
+            prov = await decisions.providers(since=None, until=None, org_id=None, principal=auth.ANONYMOUS, db=db)
+            logged = (await db.execute(select(DecisionLog.ip, DecisionLog.risk_score).where(DecisionLog.org_id == 1))).all()
+        async with engine.begin() as conn: await conn.execute(rollups.expired(datetime.now(timezone.utc).timestamp() + 3 * 86400))
+        async with SessionLocal() as db:
+            left = dict((await db.execute(select(DecisionRollup.granularity, func.count()).group_by(DecisionRollup.granularity))).all())
+        return tl, top, prov, logged, left
+    tl, top, prov, logged, left = run(go)
+    assert [sum(b[k] for b in tl) for k in ("allow", "flag", "deny")] == [1, 1, 2]
+    assert top == [{"ip": "10.9.0.1", "count": 2}]
+    assert prov["decisions"] == 4 and prov["mean_score"]["vt"] == pytest.approx(2.5 / 4) and prov["mean_score"]["shodan"] == pytest.approx(0.5 / 4)
+    assert prov["share"]["vt"] == pytest.approx(0.5 * 2.5 / (0.5 * 2.5 + 0.3 * 0.5))
+    assert sorted(logged) == [("10.9.0.1", 0.5), ("10.9.0.1", 0.5), ("10.9.0.2", 0.5), ("10.9.0.3", 0.5)]
+    assert "minute" not in left and left["hour"] > 0
@@ -0,0 +1,75 @@
+import asyncio
+import orjson
+import pytest
+from app.routers import intel
+from app.schemas import DecisionResponse
+from app.services import counters, log_writer, providers, reputation, signals
+@pytest.fixture(autouse=True)
+def backends(fake_redis, monkeypatch):
+    intel._responses.clear()
+    providers._breakers.clear()
+    async def record(org_id, decisions): pass
+    monkeypatch.setattr(log_writer, "record_decisions", record)
+    calls = []
+    real = signals.fetch
+    async def fetch(ip):
+        calls.append(ip)
+        return await real(ip)
+    monkeypatch.setattr(signals, "fetch", fetch)
+    return calls
+def test_repeat_checks_are_served_pre_serialized(backends):
+    async def go():
+        return [await intel._respond_one("8.8.8.3", 1, True) for _ in range(3)]
+    first, second, third = asyncio.run(go())
+    assert backends == ["8.8.8.3"] and second is third
+    fresh, hit = DecisionResponse.model_validate_json(first), DecisionResponse.model_validate_json(second)
+    assert not fresh.cached and hit.cached and hit.decision == fresh.decision
+    assert hit.signals.abuseipdb.confidence_score == 85 and hit.signals.reasons.abuse == 0.85
+    assert orjson.loads(second) == {**orjson.loads(first), "cached": True}
+def test_partial_and_provisional_answers_are_not_memoised(backends, monkeypatch):
+    async def down(ip): raise RuntimeError("down")
+    monkeypatch.setitem(signals.REPORTS, "shodan", down)
+    async def go():
+        partial = orjson.loads(await intel._respond_one("8.8.4.4", 1, True))
+        await intel._respond_one("8.8.4.4", 1, True)
+        return partial
+    assert asyncio.run(go())["missing"] == ["shodan"]
+    assert backends == ["8.8.4.4", "8.8.4.4"] and len(intel._responses) == 0
+def test_batch_endpoint_dedupes_keeps_order_and_counts_cached(monkeypatch):
+    import httpx
+    from app.config import settings
+    from app.main import app
+    monkeypatch.setattr(settings, "auth_required", False)
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://test") as client:
+            first = await client.post("/intel/ip-check/batch", json={"ips": ["8.8.8.8", "2001:DB8::1", " 8.8.8.8", "2001:db8::1"]})
+            second = await client.post("/intel/ip-check/batch", json={"ips": ["9.9.9.9", "2001:db8::1", "9.9.9.9"]})
+            bad = [await client.post("/intel/ip-check/batch", json={"ips": ips}) for ips in ([], ["8.8.8.8", "not-an-ip"], ["10.0.0.1"] * (settings.batch_max_ips + 1))]
+        return first, second, bad
+    first, second, bad = asyncio.run(go())
+    assert first.status_code == 200 and first.headers["content-type"] == "application/json"
+    body = first.json()
+    assert body["count"] == 2 and body["cached"] == 0 and list(body["results"]) == ["8.8.8.8", "2001:db8::1"]
+    again = second.json()
+    assert again["count"] == 2 and again["cached"] == 1 and list(again["results"]) == ["9.9.9.9", "2001:db8::1"]
+    assert not again["results"]["9.9.9.9"]["cached"] and again["results"]["2001:db8::1"]["cached"]
+    assert again["results"]["2001:db8::1"]["decision"] == body["results"]["2001:db8::1"]["decision"]
+    assert [r.status_code for r in bad] == [422, 422, 422]
+def test_served_signals_are_trimmed_to_the_schema(backends, monkeypatch):
+    async def vt(ip): return {"source": "virustotal", "malicious": 2, "harmless": 60, "timeout": 1, "type-unsupported": 0}
+    monkeypatch.setitem(signals.REPORTS, "virustotal", vt)
+    async def go(): return [await intel._respond_one("8.8.8.5", 1, True) for _ in range(2)]
+    fresh, hit = asyncio.run(go())
+    for body in (fresh, hit):
+        served = orjson.loads(body)["signals"]
+        assert served["virustotal"] == {"source": "virustotal", "malicious": 2, "harmless": 60, "suspicious": 0, "undetected": 0}
+        assert served == DecisionResponse.model_validate_json(body).signals.model_dump(exclude_none=True)
+def test_local_allows_and_denies_are_all_counted_and_logged(backends, fresh_counters, monkeypatch):
+    monkeypatch.setattr(reputation, "_index", reputation.Index([("10.8.0.0/16", "allow", "egress"), ("203.0.113.0/24", "deny", "feed")]))
+    logged = {}
+    async def record(org_id, decisions): logged.update(decisions)
+    monkeypatch.setattr(log_writer, "record_decisions", record)
+    async def go(): return [orjson.loads(await intel._respond_one(ip, 1, True))["decision"] for ip in ("10.8.1.1", "203.0.113.9", "10.8.1.1")]
+    assert asyncio.run(go()) == ["allow", "deny", "allow"]
+    assert backends == [] and sorted(logged) == ["10.8.1.1", "203.0.113.9"]
+    assert counters.snapshot()["ai_decisions_hour"] == 3 and counters.snapshot()["threats_blocked_today"] == 1
@@ -0,0 +1,93 @@
+import asyncio, time
+import fakeredis, pytest
+from rq import Queue, SimpleWorker
+from sqlalchemy import func, select
+from app.config import settings
+from app.database import Base, SessionLocal, engine
+from app.models import DecisionLog, ThreatCheck
+from app.routers import intel
+from app.services import cache, jobs, reputation, signals
+from worker import worker
+@pytest.fixture(autouse=True)
+def backends(monkeypatch):
+    async def reset():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        await engine.dispose()
+    asyncio.run(reset())
+    server = fakeredis.FakeServer()
+    cache._redis = fakeredis.FakeAsyncRedis(server=server)
+    cache.local.clear()
+    monkeypatch.setattr(worker, "q", Queue("threat-jobs", connection=fakeredis.FakeRedis(server=server)))
+    calls = []
+    def fake_report(provider):
+        async def report(ip):
+            calls.append((provider, ip))
+            return {"source": provider, "malicious": 9, "harmless": 1, "confidence_score": 100} if ip.startswith("6.6.") else {"source": provider}
+        return report
+    monkeypatch.setattr(signals, "REPORTS", {p: fake_report(p) for p in signals.REPORTS})
+    monkeypatch.setattr(settings, "job_batch_ips", 2)
+    monkeypatch.setattr(settings, "job_chunk_ips", 1)
+    yield calls
+    cache.local.clear()
+def _work():
+    SimpleWorker([worker.q], connection=worker.q.connection).work(burst=True)
+def _count(model, **where) -> int:
+    async def go():
+        async with SessionLocal() as db:
+            stmt = select(func.count()).select_from(model)
+            for k, v in where.items(): stmt = stmt.where(getattr(model, k) == v)
+            return (await db.execute(stmt)).scalar_one()
+    return asyncio.run(go())
+def test_enrich_batches_ips_into_jobs_and_logs_decisions(backends):
+    ids = jobs._submit("enrich", 7, ["6.6.6.6", "1.1.1.1", "2.2.2.2"])
+    assert len(ids) == 2 and jobs._status(ids[0])["status"] == "queued"
+    _work()
+    first, second = (jobs._status(i) for i in ids)
+    assert first["status"] == second["status"] == "finished"
+    assert first["org_id"] == 7 and first["done"] == first["total"] == 2
+    assert first["result"]["decisions"] == {"6.6.6.6": "deny", "1.1.1.1": "allow"}
+    assert len(backends) == 3 * len(signals.REPORTS)
+    assert _count(DecisionLog, org_id=7) == 3 and _count(ThreatCheck, org_id=7, malicious=True) == 1
+    assert jobs._status("missing") is None
+def test_backfill_only_writes_missing_threat_checks(backends):
+    jobs._submit("backfill", 3, ["1.1.1.1"])
+    _work()
+    [job_id] = jobs._submit("backfill", 3, ["1.1.1.1", "2.2.2.2"])
+    _work()
+    assert jobs._status(job_id)["result"] | {"decisions": None} == {"total": 2, "done": 2, "written": 1, "skipped": 1, "decisions": None}
+    assert _count(ThreatCheck, org_id=3) == 2 and _count(DecisionLog) == 0
+def test_rescan_refreshes_only_stale_entries_and_continues(backends, monkeypatch):
+    monkeypatch.setattr(settings, "rescan_scan_count", 2)
+    now, r = time.time(), worker.q.connection
+    for i in range(6):
+        age = signals.soft_ttl("shodan") + 10 if i % 2 else 0
+        r.set(signals.key("shodan", f"9.9.9.{i}"), cache.pack({"v": {}, "at": now - age}))
+    r.set("sigrefresh:shodan:9.9.9.1", b"1")
+    job_id = asyncio.run(jobs.rescan())
+    _work()
+    summaries = [jobs._status(job_id)["result"]]
+    while "next_job" in summaries[-1]: summaries.append(jobs._status(summaries[-1]["next_job"])["result"])
+    assert len(summaries) > 1 and sum(s["scanned"] for s in summaries) == 6
+    assert sorted(backends) == [("shodan", f"9.9.9.{i}") for i in (1, 3, 5)]
+def test_provisional_decision_does_not_wait_for_providers(backends, monkeypatch):
+    queued = []
+    async def enrich_later(org_id, ip):
+        queued.append((org_id, ip))
+        return "job-1"
+    monkeypatch.setattr(jobs, "enrich_later", enrich_later)
+    monkeypatch.setattr(reputation, "lookup", lambda ip: None)
+    async def go():
+        first = await intel._decide_one("6.6.6.6", 5, wait=False)
+        await cache.setex(signals.key("virustotal", "6.6.6.6"), {"v": {"malicious": 9, "harmless": 1}, "at": time.time()}, 60)
+        await cache.setex(signals.key("shodan", "6.6.6.6"), {"v": {}, "at": time.time()}, 60)
+        partial = await intel._decide_one("6.6.6.6", 5, wait=False)
+        await cache.setex(signals.key("abuseipdb", "6.6.6.6"), {"v": {}, "at": time.time()}, 60)
+        return first, partial, await intel._decide_one("6.6.6.6", 5, wait=False)
+    first, partial, complete = asyncio.run(go())
+    assert not backends
+    assert first["provisional"] and first["job_id"] == "job-1" and first["decision"] == "flag" and first["degraded"]
+    assert partial["provisional"] and partial["risk_score"] > 0
+    assert not complete.get("provisional") and complete["risk_score"] == partial["risk_score"]
+    assert queued == [(5, "6.6.6.6"), (5, "6.6.6.6")]
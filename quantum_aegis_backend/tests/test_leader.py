@@ -0,0 +1,52 @@
+import asyncio
+import redis.asyncio
+import pytest
+from app.config import settings
+from app.services import cache, leader
+class Service:
+    __name__ = "svc"
+    def __init__(self): self.events = []
+    async def start(self): self.events.append("start")
+    async def stop(self): self.events.append("stop")
+@pytest.fixture(autouse=True)
+def redis_election(fake_redis, monkeypatch):
+    monkeypatch.setattr(settings, "leader_election", "redis")
+    monkeypatch.setattr(settings, "leader_ttl_s", 60)
+    yield
+    leader._leader = False
+def test_single_leader_hands_over_and_releases():
+    svc = Service()
+    async def go():
+        await leader.start(svc)
+        states = [leader.is_leader(), await cache.client().pttl(leader.KEY) > 0]
+        await cache.client().set(leader.KEY, "someone-else")
+        await leader.elect()
+        states.append(leader.is_leader())
+        await cache.client().delete(leader.KEY)
+        await leader.elect()
+        states.append(leader.is_leader())
+        await leader.stop()
+        return states, await cache.client().get(leader.KEY)
+    states, key = asyncio.run(go())
+    assert states == [True, True, False, True]
+    assert svc.events == ["start", "stop", "start", "stop"] and key is None
+def test_steps_down_when_redis_is_unreachable(monkeypatch):
+    svc = Service()
+    async def go():
+        await leader.start(svc)
+        monkeypatch.setattr(cache, "_redis", redis.asyncio.Redis(port=1, socket_connect_timeout=0.2))
+        await leader.elect()
+        held = leader.is_leader()
+        await leader.stop()
+        return held
+    assert asyncio.run(go()) is False
+    assert svc.events == ["start", "stop"]
+def test_off_mode_always_leads(monkeypatch):
+    monkeypatch.setattr(settings, "leader_election", "off")
+    svc = Service()
+    async def go():
+        await leader.start(svc)
+        held = leader.is_leader()
+        await leader.stop()
+        return held
+    assert asyncio.run(go()) and svc.events == ["start", "stop"]
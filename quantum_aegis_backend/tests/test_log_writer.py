@@ -0,0 +1,59 @@
+import asyncio
+from sqlalchemy import func, select
+from app.config import settings
+from app.database import SessionLocal
+from app.models import DecisionLog, ThreatCheck
+from app.services import log_writer
+def _resp(decision: str) -> dict:
+    return {"decision": decision, "risk_score": 0.7, "signals": {"reasons": {"vt": 1.0}, "virustotal": {"malicious": 3}}, "cached": False, "policy_version": "p1"}
+def test_records_are_batched_and_drained_on_stop(run, monkeypatch):
+    monkeypatch.setattr(settings, "log_batch_size", 100)
+    monkeypatch.setattr(settings, "log_flush_s", 5)
+    async def go():
+        batches_before = log_writer.stats["batches"]
+        log_writer.start()
+        await log_writer.record_decisions(1, {f"10.1.0.{i}": _resp("deny" if i % 2 else "allow") for i in range(250)})
+        await log_writer.stop()
+        async with SessionLocal() as db:
+            logs = (await db.execute(select(func.count(DecisionLog.id)))).scalar()
+            malicious = (await db.execute(select(func.count(ThreatCheck.id)).where(ThreatCheck.malicious))).scalar()
+            reason = (await db.execute(select(DecisionLog.reason).limit(1))).scalar()
+        return logs, malicious, reason, log_writer.stats["batches"] - batches_before
+    logs, malicious, reason, batches = run(go)
+    assert logs == 250 and malicious == 125
+    assert batches == 5
+    assert reason == {"ip": "10.1.0.0", "risk_score": 0.7, "policy_version": "p1", "signals": {"virustotal": {"malicious": 3}}}
+def test_full_queue_applies_backpressure(run, monkeypatch):
+    monkeypatch.setattr(settings, "log_queue_max", 4)
+    async def go():
+        blocked = asyncio.create_task(log_writer.record_decisions(1, {f"10.2.0.{i}": _resp("allow") for i in range(5)}))
+        await asyncio.sleep(0.05)
+        was_blocked = not blocked.done()
+        log_writer.start()
+        await asyncio.wait_for(blocked, 2)
+        await log_writer.stop()
+        return was_blocked
+    assert run(go)
+def test_duplicate_threat_checks_are_skipped_not_dropped(run):
+    async def go():
+        before = dict(log_writer.stats)
+        rows = log_writer.decision_rows(1, {"10.3.0.1": _resp("deny")})
+        rows += [r for r in rows if r[0] is ThreatCheck]
+        await log_writer._write_with_retry(rows)
+        async with SessionLocal() as db:
+            checks = (await db.execute(select(func.count(ThreatCheck.id)))).scalar()
+            logs = (await db.execute(select(func.count(DecisionLog.id)))).scalar()
+        return checks, logs, {k: log_writer.stats[k] - before[k] for k in ("written", "dropped", "duplicates")}
+    checks, logs, delta = run(go)
+    assert (checks, logs) == (1, 1)
+    assert delta == {"written": 3, "dropped": 0, "duplicates": 1}
+def test_stop_returns_when_the_writer_has_died(run):
+    async def go():
+        dropped = log_writer.stats["dropped"]
+        log_writer.start()
+        log_writer._task.cancel()
+        await asyncio.sleep(0)
+        await log_writer.record_decisions(1, {"10.4.0.1": _resp("allow")})
+        await asyncio.wait_for(log_writer.stop(), 2)
+        return log_writer.stats["dropped"] - dropped
+    assert run(go) == 2
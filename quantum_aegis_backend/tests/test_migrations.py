@@ -0,0 +1,62 @@
+import asyncio, functools
+import pytest
+from datetime import datetime, timedelta, timezone
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import func, inspect, insert, select, text
+from app.config import settings
+from app.database import Base, alembic_config, engine, migrate
+from app.models import DecisionLog, Org
+from app.services import retention
+async def _diff() -> list:
+    async with engine.connect() as conn:
+        diff = await conn.run_sync(lambda c: compare_metadata(MigrationContext.configure(c), Base.metadata))
+    return [d for d in diff if not (d[0] == "remove_table" and d[1].name == "alembic_version")]
+async def _indexes(table: str) -> set[str]:
+    async with engine.connect() as conn:
+        return await conn.run_sync(lambda c: {ix["name"] for ix in inspect(c).get_indexes(table)})
+@pytest.fixture
+def run(run): return functools.partial(run, create=False)
+def test_migrations_build_the_model_schema(run):
+    async def go():
+        await migrate()
+        assert await _diff() == []
+        assert {"ix_decision_logs_org_id_created_at", "ix_decision_logs_created_at"} <= await _indexes("decision_logs")
+    run(go)
+def test_create_all_databases_are_stamped_then_upgraded(run):
+    async def go():
+        await asyncio.to_thread(command.upgrade, alembic_config(), "0001")
+        async with engine.begin() as conn: await conn.execute(text("DROP TABLE alembic_version"))
+        assert "ix_threat_checks_created_at" not in await _indexes("threat_checks")
+        await migrate()
+        assert "ix_threat_checks_created_at" in await _indexes("threat_checks")
+        assert await _diff() == []
+    run(go)
+def test_retention_prunes_old_rows_in_batches(run, monkeypatch):
+    monkeypatch.setattr(settings, "log_retention_days", 30)
+    monkeypatch.setattr(settings, "log_prune_batch", 3)
+    now = datetime.now(timezone.utc)
+    async def go():
+        async with engine.begin() as conn: await conn.run_sync(Base.metadata.create_all)
+        async with engine.begin() as conn:
+            await conn.execute(insert(Org).values(id=1, name="acme", plan="essential"))
+            await conn.execute(insert(DecisionLog), [{"org_id": 1, "action": "allow", "reason": {}, "created_at": now - timedelta(days=d)} for d in (1, 5, 29, 31, 40, 50, 60, 90)])
+        summary = await retention.run_once(now)
+        async with engine.connect() as conn:
+            left = (await conn.execute(select(func.count()).select_from(DecisionLog))).scalar_one()
+        return summary, left
+    summary, left = run(go)
+    assert summary["decision_logs"] == {"created": [], "dropped": [], "deleted": 5}
+    assert left == 3
+def test_current_create_all_databases_are_stamped_at_head(run):
+    async def go():
+        async with engine.begin() as conn: await conn.run_sync(Base.metadata.create_all)
+        await migrate()
+        await migrate()
+        async with engine.connect() as conn:
+            version = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar_one()
+        assert await _diff() == []
+        return version
+    assert run(go) == ScriptDirectory.from_config(alembic_config()).get_current_head()
@@ -0,0 +1,25 @@
+import pytest
+from app.config import settings
+from app.services import pqc
+@pytest.mark.parametrize("hybrid", [True, False])
+def test_roundtrip(monkeypatch, hybrid):
+    monkeypatch.setattr(settings, "pqc_enable", hybrid)
+    alg, pub, priv = pqc.generate_keypair()
+    assert alg == (pqc.HYBRID if hybrid else pqc.CLASSICAL)
+    ct, ss = pqc.encapsulate(pqc.PublicKey(alg, pub))
+    assert len(ct) == 32 + (1088 if hybrid else 0) and len(ss) == 32
+    assert pqc.decapsulate(pqc.PrivateKey(alg, pub, priv), ct) == ss
+def test_tampered_ciphertext_yields_different_secret():
+    alg, pub, priv = pqc.generate_keypair()
+    ct, ss = pqc.encapsulate(pqc.PublicKey(alg, pub))
+    tampered = ct[:40] + bytes([ct[40] ^ 1]) + ct[41:]
+    assert pqc.decapsulate(pqc.PrivateKey(alg, pub, priv), tampered) != ss
+def test_batch_helpers_cache_parsed_keys_and_flag_bad_ciphertexts():
+    pqc._public_cache.clear()
+    pqc._private_cache.clear()
+    alg, pub, priv = pqc.generate_keypair()
+    pairs = pqc.encapsulate_many(7, alg, pub, 3)
+    assert pqc.encapsulate_many(7, alg, "ignored-once-cached", 1)
+    secrets = pqc.decapsulate_many(7, alg, pub, priv, [ct for ct, _ in pairs] + [b"short"])
+    assert secrets[:3] == [ss for _, ss in pairs] and secrets[3] is None
+    assert list(pqc._public_cache) == [7] and list(pqc._private_cache) == [7]
@@ -0,0 +1,149 @@
+import asyncio, json, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app.config import settings
+from app.services import providers, intel_vt, intel_shodan, intel_abuse
+class StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    peers: set = set()
+    hits: list = []
+    throttle: int = 0
+    status: int = 200
+    retry_after: str = "0"
+    def do_GET(self):
+        StandIn.peers.add(self.client_address)
+        StandIn.hits.append((self.path, dict(self.headers)))
+        if StandIn.status != 200: return self._send(StandIn.status, {"error": "No information available for that IP.", "debug": "internal-host-7"})
+        if StandIn.throttle:
+            StandIn.throttle -= 1
+            return self._send(429, {}, {"Retry-After": StandIn.retry_after})
+        if self.path.startswith("/api/v3/ip_addresses/"):
+            body = {"data": {"attributes": {"last_analysis_stats": {"malicious": 3, "harmless": 60}}}}
+        elif self.path.startswith("/shodan/host/"):
+            body = {"ports": [445, 3389], "vulns": {"CVE-2017-0144": {}}}
+        else:
+            body = {"data": {"abuseConfidenceScore": 90, "totalReports": 7}}
+        self._send(200, body)
+    def _send(self, status: int, body: dict, headers: dict | None = None):
+        raw = json.dumps(body).encode()
+        self.send_response(status)
+        for k, v in (headers or {}).items(): self.send_header(k, v)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+    def log_message(self, *args): pass
+@pytest.fixture
+def stand_in():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{srv.server_address[1]}"
+    saved = settings.model_dump()
+    StandIn.peers, StandIn.hits, StandIn.throttle, StandIn.status, StandIn.retry_after = set(), [], 0, 200, "0"
+    settings.vt_api_key, settings.shodan_api_key, settings.abuse_api_key = "vt-key", "sh-key", "ab-key"
+    settings.vt_base_url = settings.shodan_base_url = settings.abuse_base_url = url
+    settings.vt_rate_per_min = settings.shodan_rate_per_min = settings.abuse_rate_per_min = 6000
+    settings.vt_burst = settings.shodan_burst = settings.abuse_burst = 100
+    yield url
+    for k, v in saved.items(): setattr(settings, k, v)
+    srv.shutdown()
+    srv.server_close()
+def run(coro):
+    async def wrapped():
+        try: return await coro
+        finally: await providers.shutdown()
+    return asyncio.run(wrapped())
+def test_reports_parse_provider_payloads(stand_in):
+    async def go():
+        return await asyncio.gather(intel_vt.ip_report("8.8.8.8"), intel_shodan.ip_report("8.8.8.8"), intel_abuse.ip_report("8.8.8.8"))
+    vt, sh, ab = run(go())
+    assert vt == {"source": "virustotal", "malicious": 3, "harmless": 60}
+    assert sh == {"source": "shodan", "open_ports": [445, 3389], "vuln_count": 1}
+    assert ab == {"source": "abuseipdb", "confidence_score": 90, "total_reports": 7}
+    headers = {path.split("?")[0]: h for path, h in StandIn.hits}
+    assert headers["/api/v3/ip_addresses/8.8.8.8"]["x-apikey"] == "vt-key"
+    assert headers["/api/v2/check"]["Key"] == "ab-key"
+    assert any("key=sh-key" in path for path, _ in StandIn.hits)
+def test_client_reuses_connections(stand_in):
+    async def go():
+        for _ in range(10): await intel_vt.ip_report("1.1.1.1")
+    run(go())
+    assert len(StandIn.hits) == 10
+    assert len(StandIn.peers) == 1
+def test_limiter_queues_instead_of_failing(stand_in):
+    settings.vt_rate_per_min, settings.vt_burst = 600, 2
+    async def go():
+        t0 = time.monotonic()
+        res = await asyncio.gather(*(intel_vt.ip_report("1.1.1.1") for _ in range(5)))
+        return res, time.monotonic() - t0
+    res, elapsed = run(go())
+    assert all("error" not in r for r in res)
+    assert elapsed >= 0.25
+def test_upstream_429_is_retried(stand_in):
+    StandIn.throttle = 1
+    assert run(intel_vt.ip_report("1.1.1.1"))["malicious"] == 3
+    assert len(StandIn.hits) == 2
+def test_upstream_429_with_an_http_date_retry_after_is_retried(stand_in):
+    from email.utils import format_datetime
+    from datetime import datetime, timedelta, timezone
+    StandIn.throttle, StandIn.retry_after = 1, format_datetime(datetime.now(timezone.utc) - timedelta(seconds=5), usegmt=True)
+    assert run(intel_vt.ip_report("1.1.1.1"))["malicious"] == 3
+    assert len(StandIn.hits) == 2
+    assert 25 < providers.retry_after(format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)) <= 30
+    assert providers.retry_after("7") == 7.0 and providers.retry_after(None) == 1.0 and providers.retry_after("soon") == 1.0
+def test_token_bucket_burst_then_rate():
+    async def go():
+        bucket = providers.TokenBucket(rate_per_min=1200, burst=3)
+        t0 = time.monotonic()
+        for _ in range(3): await bucket.acquire()
+        burst = time.monotonic() - t0
+        for _ in range(4): await bucket.acquire()
+        return burst, time.monotonic() - t0
+    burst, total = asyncio.run(go())
+    assert burst < 0.05
+    assert total >= 0.18
+def test_token_bucket_zero_rate_is_unlimited():
+    async def go():
+        bucket = providers.TokenBucket(rate_per_min=0, burst=1)
+        t0 = time.monotonic()
+        for _ in range(100): await bucket.acquire()
+        free = time.monotonic() - t0
+        bucket.penalize(0.1)
+        await bucket.acquire()
+        return free, time.monotonic() - t0 - free
+    free, penalized = asyncio.run(go())
+    assert free < 0.05
+    assert penalized >= 0.09
+def test_local_limiter_wait_is_not_charged_to_the_provider(stand_in):
+    from app.services import signals
+    settings.vt_rate_per_min, settings.vt_burst = 60, 1
+    settings.provider_deadline_s, settings.breaker_failures = 0.3, 1
+    async def go():
+        return await asyncio.gather(*(signals._report("virustotal", f"1.1.1.{i}", 1.5) for i in range(3)))
+    first, queued, limited = run(go())
+    assert "error" not in first and "error" not in queued
+    assert limited == {"source": "virustotal", "error": "rate limited locally"}
+    assert len(StandIn.hits) == 2
+def test_rate_limited_lookups_leave_the_breaker_closed(stand_in):
+    from app.services import signals
+    settings.vt_rate_per_min, settings.vt_burst, settings.breaker_failures = 4, 1, 1
+    async def go():
+        res = [await signals._report("virustotal", f"2.2.2.{i}", 0.5) for i in range(3)]
+        return res, providers.breaker("virustotal").state
+    res, state = run(go())
+    assert [r.get("error") for r in res] == [None, "rate limited locally", "rate limited locally"]
+    assert state == "closed"
+def test_4xx_answers_do_not_trip_the_breaker_but_5xx_do(stand_in):
+    from app.services import signals
+    settings.breaker_failures = 2
+    async def go():
+        StandIn.status = 404
+        missing = [await signals._report("shodan", f"3.3.3.{i}", 5) for i in range(5)]
+        after_404 = providers.breaker("shodan").state
+        StandIn.status = 503
+        down = [await signals._report("shodan", f"3.3.4.{i}", 5) for i in range(3)]
+        return missing, after_404, down, providers.breaker("shodan").state
+    missing, after_404, down, after_503 = run(go())
+    assert missing[-1] == {"source": "shodan", "status": 404}
+    assert after_404 == "closed" and len(StandIn.hits) == 5 + 2
+    assert down[0]["error"] == "upstream http 503" and down[-1]["error"] == "circuit open" and after_503 == "open"
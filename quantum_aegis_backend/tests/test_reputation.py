@@ -0,0 +1,49 @@
+import ipaddress, random
+from app.services.reputation import Index, read_file
+def _brute(entries, ip):
+    addr = ipaddress.ip_address(ip)
+    best = None
+    for net, action in entries:
+        if addr.version == net.version and addr in net:
+            key = (net.prefixlen, action == "allow")
+            if best is None or key > best[0]: best = (key, action, str(net))
+    return best and (best[1], best[2])
+def test_most_specific_rule_wins_and_allow_breaks_ties():
+    index = Index([("10.0.0.0/8", "deny", "a"), ("10.1.0.0/16", "allow", "b"), ("10.1.2.0/24", "deny", "c"), ("10.1.2.0/24", "allow", "d")])
+    assert index.lookup("10.9.9.9").cidr == "10.0.0.0/8"
+    assert index.lookup("10.1.9.9").action == "allow"
+    assert index.lookup("10.1.2.3").source == "d"
+    assert index.lookup("11.0.0.1") is None
+def test_ipv6_and_mapped_addresses():
+    index = Index([("2001:db8::/32", "deny", "feed"), ("2001:db8:1::/48", "allow", "egress"), ("192.0.2.0/24", "deny", "feed")])
+    assert index.lookup("2001:db8:ffff::1").action == "deny"
+    assert index.lookup("2001:db8:1::42").action == "allow"
+    assert index.lookup("2001:db9::1") is None
+    assert index.lookup("::ffff:192.0.2.5").action == "deny"
+def test_matches_brute_force_on_random_nested_rules():
+    rng = random.Random(3)
+    entries = []
+    for _ in range(400):
+        plen = rng.choice([8, 12, 16, 20, 24, 28, 32])
+        net = ipaddress.ip_network(f"{rng.choice([10, 172, 192])}.{rng.randint(0, 3)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}/{plen}", strict=False)
+        entries.append((str(net), rng.choice(["allow", "deny"]), "r"))
+    index = Index(entries)
+    nets = [(ipaddress.ip_network(c), a) for c, a, _ in entries]
+    for _ in range(1000):
+        ip = f"{rng.choice([10, 172, 192])}.{rng.randint(0, 3)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}"
+        m = index.lookup(ip)
+        assert (m and (m.action, m.cidr)) == _brute(nets, ip)
+def test_large_index_matches_set_membership():
+    rng = random.Random(5)
+    nets = {f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.0/24" for _ in range(50_000)}
+    index = Index([(net, "deny", "feed") for net in nets])
+    ips = [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}" for _ in range(20_000)]
+    ips += [net.replace(".0/24", f".{rng.randint(0, 255)}") for net in rng.sample(sorted(nets), 2_000)]
+    for ip in ips:
+        m = index.lookup(ip)
+        net = ip.rsplit(".", 1)[0] + ".0/24"
+        assert (m.cidr if m else None) == (net if net in nets else None)
+def test_read_file_skips_comments_and_garbage(tmp_path):
+    path = tmp_path / "block.txt"
+    path.write_text("# feed\n198.51.100.0/24\n\nnot-an-ip\n2001:db8::1 # host\n")
+    assert [c for c, _, _ in read_file(str(path), "deny")] == ["198.51.100.0/24", "2001:db8::1"]
@@ -0,0 +1,67 @@
+import asyncio, functools, time
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, select
+from app import scheduler
+from app.database import SessionLocal
+from app.models import QuantumKey
+from app.services import cache, counters, kem
+async def _keys():
+    async with SessionLocal() as db:
+        return (await db.execute(select(QuantumKey).order_by(QuantumKey.id))).scalars().all()
+@pytest.fixture
+def run(run, fresh_counters): return functools.partial(run, teardown=scheduler.stop)
+def test_start_rotates_when_no_active_key_and_pool_fills(run):
+    async def go():
+        await scheduler.start()
+        for _ in range(100):
+            if scheduler._pool.full() and await _keys(): break
+            await asyncio.sleep(0.02)
+        return await _keys(), scheduler._pool.qsize(), counters.snapshot()["quantum_keys_active"]
+    keys, pooled, active = run(go)
+    assert len(keys) == 1 and keys[0].retired_at is None
+    assert pooled == scheduler.settings.keypool_size
+    assert active == 1
+def test_rotation_retires_previous_and_purges_expired(run):
+    async def go():
+        old = datetime.now(timezone.utc) - timedelta(days=1)
+        async with SessionLocal() as db:
+            db.add(QuantumKey(alg="X25519", pub="p", priv="s", rotated_at=old, retired_at=old))
+            await db.commit()
+        first = await scheduler.rotate_keys()
+        second = await scheduler.rotate_keys()
+        return first, second, await _keys()
+    first, second, keys = run(go)
+    assert [k.id for k in keys] == [first.id, second.id]
+    assert keys[0].retired_at is not None and keys[1].retired_at is None
+    assert counters.snapshot()["quantum_keys_active"] == 1
+def test_take_keypair_prefers_precomputed_pool(run):
+    async def go():
+        scheduler._pool = asyncio.Queue()
+        await scheduler._pool.put(("X25519", "pooled-pub", "pooled-priv"))
+        return await scheduler.take_keypair(), await scheduler.take_keypair()
+    pooled, generated = run(go)
+    assert pooled[1] == "pooled-pub"
+    assert generated[0].startswith("X25519") and generated[1] != "pooled-pub"
+def test_private_key_cache_expires_so_purged_keys_stop_decapsulating(run, monkeypatch):
+    monkeypatch.setattr(kem, "_keys", cache.LRU(2, 0.05))
+    async def go():
+        qk = await scheduler.rotate_keys()
+        assert (await kem._private(qk.id))[1] == qk.pub
+        async with SessionLocal() as db:
+            await db.execute(delete(QuantumKey))
+            await db.commit()
+        assert (await kem._private(qk.id))[1] == qk.pub
+        time.sleep(0.06)
+        with pytest.raises(kem.UnknownKey): await kem._private(qk.id)
+    run(go)
+def test_generate_without_executor_runs_off_the_event_loop(monkeypatch):
+    import threading
+    threads = []
+    def keypair():
+        threads.append(threading.current_thread())
+        return ("X25519", "pub", "priv")
+    monkeypatch.setattr(scheduler, "generate_keypair", keypair)
+    assert scheduler._executor is None
+    assert asyncio.run(scheduler.take_keypair()) == ("X25519", "pub", "priv")
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,118 @@
+import asyncio, time
+import fakeredis
+import pytest
+from rq import Queue
+from app.config import settings
+from app.services import cache, decision_engine, providers, signals
+from worker import worker
+@pytest.fixture(autouse=True)
+def fake_backends(fake_redis, monkeypatch):
+    providers._breakers.clear()
+    monkeypatch.setattr(worker, "q", Queue("threat-jobs", connection=fakeredis.FakeRedis(), is_async=False))
+    calls = []
+    counted = {"virustotal": "malicious", "shodan": "vuln_count", "abuseipdb": "total_reports"}
+    def fake_report(provider):
+        async def report(ip):
+            calls.append((provider, ip))
+            return {"source": provider, counted[provider]: len(calls)}
+        return report
+    monkeypatch.setattr(signals, "REPORTS", {p: fake_report(p) for p in signals.REPORTS})
+    yield calls
+def test_each_provider_cached_separately(fake_backends):
+    async def go():
+        first = await signals.fetch("9.9.9.9")
+        await cache.delete(signals.key("shodan", "9.9.9.9"))
+        second = await signals.fetch("9.9.9.9")
+        third = await signals.fetch("9.9.9.9")
+        return first, second, third
+    first, second, third = asyncio.run(go())
+    assert first[1] and second[1] and not third[1]
+    assert [p for p, _ in fake_backends] == ["virustotal", "shodan", "abuseipdb", "shodan"]
+    assert second[0]["virustotal"] == first[0]["virustotal"]
+    assert second[0]["shodan"] != first[0]["shodan"]
+def test_stale_entry_served_and_refreshed_in_background(fake_backends, monkeypatch):
+    refreshed = []
+    monkeypatch.setattr("worker.jobs.refresh_signal", lambda p, ip: refreshed.append((p, ip)))
+    async def go():
+        old = {"v": {"source": "abuseipdb", "total_reports": 0}, "at": time.time() - signals.soft_ttl("abuseipdb") - 1}
+        await cache.setex(signals.key("abuseipdb", "8.8.4.4"), old, ttl=60)
+        res, fresh = await signals.fetch("8.8.4.4")
+        await asyncio.gather(*signals._tasks)
+        return res, fresh
+    res, fresh = asyncio.run(go())
+    assert res["abuseipdb"] == {"source": "abuseipdb", "total_reports": 0}
+    assert fresh
+    assert refreshed == [("abuseipdb", "8.8.4.4")]
+    assert not signals._pending
+def test_warm_loads_redis_entries_into_the_local_tier(fake_backends):
+    async def go():
+        await signals.fetch("4.4.4.4")
+        cache.local.clear()
+        warmed = await signals.warm(["4.4.4.4", "4.4.4.5"])
+        return warmed, cache.local.get(signals.key("shodan", "4.4.4.4"))
+    warmed, local = asyncio.run(go())
+    assert warmed == 3 and local["v"]["source"] == "shodan"
+def test_errors_are_not_cached(fake_backends, monkeypatch):
+    async def failing(ip): return {"source": "virustotal", "error": "quota"}
+    monkeypatch.setitem(signals.REPORTS, "virustotal", failing)
+    async def go():
+        await signals.fetch("7.7.7.7")
+        return await cache.get(signals.key("virustotal", "7.7.7.7"))
+    assert asyncio.run(go()) is None
+def test_no_data_answers_are_cached_briefly_and_not_missing(fake_backends, monkeypatch):
+    monkeypatch.setattr(settings, "negative_ttl_s", 120)
+    async def unscanned(ip):
+        fake_backends.append(("shodan", ip))
+        return {"source": "shodan", "status": 404}
+    monkeypatch.setitem(signals.REPORTS, "shodan", unscanned)
+    async def go():
+        first = await signals.fetch("7.7.7.8")
+        second = await signals.fetch("7.7.7.8")
+        return first, second, await cache.client().ttl(signals.key("shodan", "7.7.7.8"))
+    (first, fresh), (second, again), ttl = asyncio.run(go())
+    assert fresh and not again and [p for p, _ in fake_backends].count("shodan") == 1
+    assert second["shodan"] == {"source": "shodan", "status": 404, "open_ports": [], "vuln_count": 0}
+    assert 0 < ttl <= 120 and decision_engine.decide(second)["missing"] == []
+def test_slow_and_failing_providers_are_bounded_and_scored_without(fake_backends, monkeypatch):
+    monkeypatch.setattr(settings, "provider_deadline_s", 0.1)
+    monkeypatch.setattr(settings, "breaker_failures", 2)
+    monkeypatch.setattr(settings, "breaker_cooldown_s", 0.3)
+    async def hang(ip):
+        fake_backends.append(("virustotal", ip))
+        await asyncio.sleep(10)
+    async def boom(ip): raise RuntimeError("upstream reset")
+    monkeypatch.setitem(signals.REPORTS, "virustotal", hang)
+    monkeypatch.setitem(signals.REPORTS, "shodan", boom)
+    async def go():
+        t0 = time.perf_counter()
+        first, _ = await signals.fetch("6.6.6.1")
+        elapsed = time.perf_counter() - t0
+        await signals.fetch("6.6.6.2")
+        calls = len(fake_backends)
+        short, _ = await signals.fetch("6.6.6.3")
+        shorted = len(fake_backends) == calls + 1
+        await asyncio.sleep(0.35)
+        monkeypatch.setitem(signals.REPORTS, "virustotal", signals.REPORTS["abuseipdb"])
+        recovered, _ = await signals.fetch("6.6.6.4")
+        return first, elapsed, short, shorted, recovered
+    first, elapsed, short, shorted, recovered = asyncio.run(go())
+    assert elapsed < 1.0
+    assert first["virustotal"]["error"] == "timeout" and "RuntimeError" in first["shodan"]["error"]
+    resp = decision_engine.decide(first)
+    assert resp["missing"] == ["virustotal", "shodan"] and resp["signals"]["abuseipdb"] == first["abuseipdb"]
+    assert short["virustotal"]["error"] == "circuit open" and shorted
+    assert "error" not in recovered["virustotal"] and providers.breaker("virustotal").state == "closed"
+def test_hedged_request_wins_over_a_slow_first_attempt(fake_backends, monkeypatch):
+    monkeypatch.setattr(settings, "provider_hedge_after_s", 0.05)
+    attempts = []
+    async def tail(ip):
+        attempts.append(ip)
+        if len(attempts) == 1: await asyncio.sleep(5)
+        return {"source": "virustotal", "malicious": len(attempts)}
+    monkeypatch.setitem(signals.REPORTS, "virustotal", tail)
+    async def go():
+        t0 = time.perf_counter()
+        res, _ = await signals.fetch("5.5.5.5")
+        return res, time.perf_counter() - t0
+    res, elapsed = asyncio.run(go())
+    assert res["virustotal"]["malicious"] == 2 and elapsed < 1.0
@@ -0,0 +1,74 @@
+import asyncio, json
+import pytest
+from app.routers import intel
+from app.config import settings
+from app.services import auth
+async def _body(*chunks):
+    for chunk in chunks:
+        await asyncio.sleep(0)
+        yield chunk
+def collect(*chunks):
+    async def go():
+        return [json.loads(line) async for out in intel._stream(_body(*chunks), auth.ANONYMOUS) for line in out.splitlines()]
+    return sorted(asyncio.run(go()), key=lambda r: r["seq"])
+@pytest.fixture
+def calls(monkeypatch):
+    seen = []
+    async def decide(ip, org_id):
+        seen.append(ip)
+        await asyncio.sleep(0.01)
+        return {"decision": "allow", "risk_score": 0.0, "cached": False}
+    async def charge(principal, cost): pass
+    monkeypatch.setattr(intel, "_decide_one", decide)
+    monkeypatch.setattr(auth, "charge", charge)
+    return seen
+def test_lines_split_across_chunks_and_errors_keep_seq(calls):
+    rows = collect(b'{"ip": "8.8.8.8"}\n"1.1.', b'1.1"\nbogus\n\n9.9.9.9')
+    assert [r["seq"] for r in rows] == [1, 2, 3, 4]
+    assert [r.get("ip") for r in rows] == ["8.8.8.8", "1.1.1.1", None, "9.9.9.9"]
+    assert "error" in rows[2]
+def test_duplicates_share_one_decision(calls):
+    rows = collect(b"8.8.8.8\n" * 50 + b"2001:DB8::1\n2001:db8:0::1\n")
+    assert len(rows) == 52 and all(r["decision"] == "allow" for r in rows)
+    assert sorted(calls) == ["2001:db8::1", "8.8.8.8"]
+def test_dedupe_window_is_bounded(calls, monkeypatch):
+    monkeypatch.setattr(settings, "stream_dedupe_window", 2)
+    monkeypatch.setattr(settings, "stream_concurrency", 1)
+    collect(b"1.1.1.1\n2.2.2.2\n3.3.3.3\n1.1.1.1\n")
+    assert calls.count("1.1.1.1") == 2
+def test_overlong_line_ends_stream(calls, monkeypatch):
+    monkeypatch.setattr(settings, "stream_max_line", 16)
+    rows = collect(b"8.8.8.8\n", b"x" * 32)
+    assert rows[0]["ip"] == "8.8.8.8" and "exceeds" in rows[-1]["error"]
+def test_mounted_route_interleaves_results_and_reports_quota_errors(calls, monkeypatch):
+    from app.main import app
+    monkeypatch.setattr(settings, "auth_required", False)
+    charged = []
+    async def charge(principal, cost):
+        charged.append(cost)
+        if len(charged) == 3: raise auth.QuotaExceeded("daily quota", 60)
+    monkeypatch.setattr(auth, "charge", charge)
+    chunks = [b"1.1.1.1\n", b"2.2.2.2\n", b"3.3.3.3\n", b"4.4.4.4\n"]
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http", "path": "/intel/ip-check/stream", "raw_path": b"/intel/ip-check/stream",
+             "root_path": "", "query_string": b"", "headers": [(b"host", b"test"), (b"content-type", b"application/x-ndjson")], "client": ("127.0.0.1", 1), "server": ("test", 80)}
+    events, rows, started = [], [], []
+    async def go():
+        async def receive():
+            i = len([e for e in events if e[0] == "in"])
+            # Hold each chunk back until the previous line's result has been streamed out.
+            async def answered():
+                while len(rows) < i: await asyncio.sleep(0.005)
+            await asyncio.wait_for(answered(), 2)
+            events.append(("in", i))
+            return {"type": "http.request", "body": chunks[i], "more_body": i + 1 < len(chunks)}
+        async def send(message):
+            if message["type"] == "http.response.start": started.append(message["status"])
+            for line in message.get("body", b"").splitlines():
+                rows.append(json.loads(line))
+                events.append(("out", rows[-1]["seq"]))
+        await asyncio.wait_for(app(scope, receive, send), 5)
+    asyncio.run(go())
+    assert started == [200]
+    assert events == [("in", 0), ("out", 1), ("in", 1), ("out", 2), ("in", 2), ("out", 3)]
+    assert [r.get("ip") for r in rows[:2]] == ["1.1.1.1", "2.2.2.2"] and rows[2] == {"seq": 3, "error": "daily quota exceeded"}
+    assert calls == ["1.1.1.1", "2.2.2.2"]
@@ -0,0 +1,28 @@
+import time
+from app.services import telemetry
+def test_histogram_renders_cumulative_buckets():
+    h = telemetry.Histogram("qa_test_seconds", "test", ("stage",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.1, 0.5, 3.0): h.observe(v, "x")
+    text = h.render()
+    assert 'qa_test_seconds_bucket{stage="x",le="0.1"} 2' in text
+    assert 'qa_test_seconds_bucket{stage="x",le="1.0"} 3' in text
+    assert 'qa_test_seconds_bucket{stage="x",le="+Inf"} 4' in text
+    assert 'qa_test_seconds_count{stage="x"} 4' in text
+    assert "# TYPE qa_test_seconds histogram" in text
+def test_callback_metrics_and_label_escaping():
+    c = telemetry.Counter("qa_test_total", "test", ("event",), fn=lambda: {'a"b': 2})
+    assert 'qa_test_total{event="a\\"b"} 2' in c.render()
+    g = telemetry.Gauge("qa_test_ratio", "test", fn=lambda: {(): 0.5})
+    assert "qa_test_ratio 0.5" in g.render()
+def test_stage_timer_records_duration():
+    with telemetry.stage("unit-test"): time.sleep(0.01)
+    counts, total, n = telemetry.STAGE_SECONDS.series[("unit-test",)]
+    assert n == 1 and total >= 0.01
+def test_sampling_profiler_collects_stacks():
+    prof = telemetry.SamplingProfiler(hz=500)
+    prof.start()
+    deadline = time.monotonic() + 0.2
+    while time.monotonic() < deadline: sum(range(1000))
+    prof.stop()
+    assert prof.samples > 0
+    assert "test_telemetry.py:test_sampling_profiler_collects_stacks" in prof.collapsed()
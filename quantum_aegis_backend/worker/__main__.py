@@ -0,0 +1,17 @@
+import argparse, logging
+from rq import SimpleWorker
+from rq.worker_pool import WorkerPool
+from app.config import settings
+from worker.worker import q, redis
+def main():
+    parser = argparse.ArgumentParser(description="Run RQ workers for threat-jobs")
+    parser.add_argument("--processes", type=int, default=settings.worker_processes)
+    parser.add_argument("--burst", action="store_true", help="exit once the queue is empty")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.processes > 1:
+        WorkerPool([q], connection=redis, num_workers=args.processes, worker_class=SimpleWorker).start(burst=args.burst)
+    else:
+        SimpleWorker([q], connection=redis).work(burst=args.burst)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import asyncio, time
+from rq import get_current_job
+from sqlalchemy import select
+from app.config import settings
+from app.database import SessionLocal
+from app.models import ThreatCheck
+from app.services import cache, counters, decision_engine, log_writer, signals
+_loop: asyncio.AbstractEventLoop | None = None
+def _run(coro):
+    global _loop
+    if _loop is None or _loop.is_closed(): _loop = asyncio.new_event_loop()
+    try: return _loop.run_until_complete(coro)
+    finally: _loop.run_until_complete(cache.disconnect())
+def _progress(**meta):
+    job = get_current_job()
+    if job is None: return
+    job.meta.update(meta)
+    job.save_meta()
+def _chunks(ips: list[str]):
+    for i in range(0, len(ips), settings.job_chunk_ips): yield ips[i:i + settings.job_chunk_ips]
+async def _enrich(org_id: int, ips: list[str]) -> dict:
+    summary = {"total": len(ips), "done": 0, "decisions": {}}
+    for chunk in _chunks(ips):
+        scored = decision_engine.decide_many(await signals.fetch_many(chunk, settings.job_concurrency, settings.job_timeout_s))
+        await log_writer.write(log_writer.decision_rows(org_id, scored))
+        counters.record_decisions([r["decision"] for r in scored.values()])
+        summary["decisions"].update({ip: r["decision"] for ip, r in scored.items()})
+        summary["done"] += len(chunk)
+        _progress(done=summary["done"])
+    await counters.flush()
+    return summary
+async def _backfill(org_id: int, ips: list[str]) -> dict:
+    summary = {"total": len(ips), "done": 0, "written": 0, "skipped": 0}
+    for chunk in _chunks(ips):
+        async with SessionLocal() as db:
+            seen = set((await db.execute(select(ThreatCheck.subject).where(ThreatCheck.org_id == org_id, ThreatCheck.subject_type == "ip", ThreatCheck.subject.in_(chunk)))).scalars())
+        todo = [ip for ip in chunk if ip not in seen]
+        if todo:
+            scored = decision_engine.decide_many(await signals.fetch_many(todo, settings.job_concurrency, settings.job_timeout_s))
+            await log_writer.write(log_writer.decision_rows(org_id, scored, threat_checks_only=True))
+        summary["written"] += len(todo)
+        summary["skipped"] += len(chunk) - len(todo)
+        summary["done"] += len(chunk)
+        _progress(done=summary["done"])
+    return summary
+async def _rescan(cursor: int) -> dict:
+    r = cache.client()
+    cursor, keys = await r.scan(cursor, match="sig:*", count=settings.rescan_scan_count)
+    raws = await r.mget(keys) if keys else []
+    now, stale = time.time(), []
+    for k, raw in zip(keys, raws):
+        if raw is None: continue
+        _, provider, ip = k.decode().split(":", 2)
+        if provider in signals.REPORTS and now - cache.unpack(raw)["at"] > signals.soft_ttl(provider): stale.append((provider, ip))
+    sem = asyncio.Semaphore(settings.job_concurrency)
+    async def refresh(provider: str, ip: str):
+        async with sem: return await signals.refresh(provider, ip)
+    refreshed = await asyncio.gather(*(refresh(p, ip) for p, ip in stale), return_exceptions=True)
+    return {"cursor": cursor, "scanned": len(keys), "stale": len(stale), "failed": sum(isinstance(x, Exception) or "error" in x for x in refreshed)}
+def refresh_signal(provider: str, ip: str) -> dict:
+    return _run(signals.refresh(provider, ip))
+def enrich(org_id: int, ips: list[str]) -> dict:
+    return _run(_enrich(org_id, ips))
+def backfill_threat_checks(org_id: int, ips: list[str]) -> dict:
+    return _run(_backfill(org_id, ips))
+def rescan_stale(cursor: int = 0) -> dict:
+    from worker.worker import q
+    summary = _run(_rescan(cursor))
+    if summary["cursor"]: summary["next_job"] = q.enqueue("worker.jobs.rescan_stale", summary["cursor"], job_timeout=settings.job_timeout_s, result_ttl=settings.job_result_ttl_s).id
+    return summary